@@ -0,0 +1,207 @@
+#bench_lexer.py
+# 词法分析性能基准：python -m Compilers.bench_lexer
+import glob
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Compilers.lexer.manual_lexer import lexical_analysis, keywords, KEYWORD_TABLE
+from Compilers.lexer import auto_lexer
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+from Compilers.lexer.auto_lexer import analyze as auto_analyze
+from Compilers.lexer.parallel_lexer import parallel_lexical_analysis
+from Compilers.lexer.batch_lexer import lex_many
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test', 'example')
+
+
+def load_corpus(pattern: str = '*.txt', repeat: int = 200) -> str:
+    """把 test/example 下匹配的用例拼接后重复 repeat 次，作为基准输入"""
+    parts = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLE_DIR, pattern))):
+        with open(path, encoding='utf-8') as f:
+            parts.append(f.read().lstrip('\ufeff'))
+    return '\n'.join(parts) * repeat
+
+
+def best_of(fn, *args, rounds: int = 3) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_scanners():
+    """对比手写分支版与 DFA 表驱动版的吞吐量（字符/秒）"""
+    print("== 词法分析吞吐量 ==")
+    for label, pattern in (('语法用例(无错误)', '语法*.txt'), ('全部用例', '*.txt')):
+        source = load_corpus(pattern)
+        for name, fn in (('手写分支', lexical_analysis), ('DFA 表驱动', dfa_lexical_analysis)):
+            seconds = best_of(fn, source)
+            print(f"{label:<14} {name:<10} {len(source):>9} 字符  {len(source) / seconds:>14,.0f} 字符/秒")
+
+
+def bench_span_tokens(repeat: int = 300):
+    """
+    区间模式（spans=True，只存种别码与区间）与普通 (种别码, 词素) 列表对比：
+    区间模式另外记录了位置信息，仍不应慢于不记录位置的普通模式
+    """
+    print("== DFA 区间模式 ==")
+    source = load_corpus('*.txt', repeat)
+    t_plain = best_of(dfa_lexical_analysis, source, rounds=10)
+    t_positions = best_of(dfa_lexical_analysis, source, True, rounds=10)
+    t_spans = best_of(dfa_lexical_analysis, source, False, True, rounds=10)
+    print(f"(种别码, 词素) 列表        {t_plain * 1000:>8.1f} ms")
+    print(f"(种别码, 词素) 列表 + 位置 {t_positions * 1000:>8.1f} ms")
+    print(f"SpanTokens（含位置）       {t_spans * 1000:>8.1f} ms  x{t_plain / t_spans:.2f}")
+
+
+def bench_error_dense():
+    """错误密集的输入：每行一个非法单词，检验诊断信息的行号定位不再随文件大小退化"""
+    print("== 错误密集输入 ==")
+    for lines in (5000, 20000, 80000):
+        source = "x = 12a;\n" * lines
+        for name, fn in (('手写分支', lexical_analysis), ('DFA 表驱动', dfa_lexical_analysis)):
+            seconds = best_of(fn, source, rounds=1)
+            print(f"{lines:>6} 行  {name:<10} {seconds * 1000:>9.1f} ms  {len(source) / seconds:>14,.0f} 字符/秒")
+
+
+# 自动词法分析器的病态输入：长数字串、长操作符串、未闭合字符串/注释等容易引起正则回溯的情形
+PATHOLOGICAL_INPUTS = {
+    '超长数字': lambda n: '9' * n,
+    '数字后接字母': lambda n: '1' * n + 'e+',
+    '超长小数': lambda n: '1.' + '2' * n + '.',
+    '连续 +': lambda n: '+' * n,
+    '间隔 +': lambda n: '+ ' * n,
+    '未闭合字符串': lambda n: '"' + 'a' * n,
+    '未闭合字符串(转义)': lambda n: '"' + '\\a' * n,
+    '未闭合字符常量': lambda n: "'" + 'a' * n,
+    '重复的未闭合注释': lambda n: '/*a' * (n // 3),
+}
+
+
+def bench_auto_pathological(size: int = 100_000, growth: int = 4, max_ratio: float = 2.5):
+    """
+    自动词法分析器在病态输入上的耗时：输入扩大 growth 倍时，耗时增长不得超过 growth * max_ratio 倍，
+    即断言整体为线性（回溯导致的平方退化会使比值接近 growth 的平方）。
+    """
+    print("== 自动词法分析：病态输入 ==")
+    for name, make in PATHOLOGICAL_INPUTS.items():
+        small = best_of(auto_analyze, make(size))
+        large = best_of(auto_analyze, make(size * growth))
+        ratio = large / max(small, 1e-6)
+        print(f"{name:<14} {size:>7} 字符 {small * 1000:>8.2f} ms  {size * growth:>7} 字符 {large * 1000:>8.2f} ms  x{ratio:.1f}")
+        assert ratio < growth * max_ratio, f"{name}: 耗时增长 {ratio:.1f} 倍，不是线性"
+
+
+def identifier_heavy_source(count: int = 200_000, seed: int = 0) -> str:
+    """以标识符与关键字为主的输入：约一半关键字、一半随机标识符"""
+    rng = random.Random(seed)
+    words = list(keywords) + list(auto_lexer.REGEX_KEYWORDS)
+    letters = 'abcdefghijklmnopqrstuvwxyz_'
+    parts = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            parts.append(rng.choice(words))
+        else:
+            parts.append(''.join(rng.choice(letters) for _ in range(rng.randint(1, 10))))
+    return ' '.join(parts)
+
+
+def bench_keywords():
+    """关键字识别：旧做法（两次字典查找 / 正则关键字分支）与 KeywordTable 单次查表对比"""
+    print("== 关键字识别 ==")
+    source = identifier_heavy_source()
+    words = source.split()
+
+    def manual_old():
+        for word in words:
+            if word in keywords:
+                keywords[word]
+
+    def manual_new():
+        get = KEYWORD_TABLE.get
+        for word in words:
+            get(word)
+
+    # 旧的自动词法分析：IDENT 之前先试关键字交替式
+    legacy_tokens = list(auto_lexer.TOKENS)
+    legacy_tokens.insert([name for name, _ in legacy_tokens].index('IDENT'), (
+        'KEYWORD', r'\b(?:' + '|'.join(auto_lexer.REGEX_KEYWORDS) + r')\b'))
+    legacy_pattern = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in legacy_tokens), re.ASCII)
+
+    def auto_old():
+        for m in legacy_pattern.finditer(source):
+            if m.lastgroup == 'IDENT':
+                auto_lexer.KEYWORDS.get(m.group())
+
+    def auto_new():
+        get = auto_lexer.KEYWORD_TABLE.get
+        for m in auto_lexer.MASTER_PATTERN.finditer(source):
+            if m.lastgroup == 'IDENT':
+                get(m.group())
+
+    for label, old, new in (('手写: 查表', manual_old, manual_new), ('自动: 扫描+查表', auto_old, auto_new)):
+        t_old, t_new = best_of(old), best_of(new)
+        print(f"{label:<12} {len(words):>7} 词  旧 {t_old * 1000:>8.1f} ms  新 {t_new * 1000:>8.1f} ms  x{t_old / t_new:.2f}")
+    seconds = best_of(auto_lexer.analyze, source)
+    print(f"自动词法分析整体 {len(source) / seconds:>14,.0f} 字符/秒")
+
+
+def bench_parallel(repeat: int = 1000, worker_counts=(1, 2, 4, 8)):
+    """多进程词法分析：按 1/2/4/8 个子进程对比串行 lexical_analysis，并校验结果一致"""
+    print(f"== 多进程词法分析（CPU 核数 {os.cpu_count()}） ==")
+    source = load_corpus(repeat=repeat)
+    expected = lexical_analysis(source)
+    serial = best_of(lexical_analysis, source)
+    print(f"串行          {len(source):>9} 字符  {serial * 1000:>9.1f} ms")
+    for workers in worker_counts:
+        # 进程池在计时之外创建并预热，计时只包含切分、扫描与合并
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(abs, range(workers)))
+            assert parallel_lexical_analysis(source, workers, executor) == expected
+            seconds = best_of(parallel_lexical_analysis, source, workers, executor)
+        print(f"{workers} 个子进程    {len(source):>9} 字符  {seconds * 1000:>9.1f} ms  x{serial / seconds:.2f}")
+
+
+def snippet_corpus(count: int = 10_000) -> list:
+    """把用例按行切开，取 count 段非空的单行代码作为短源代码"""
+    lines = [line for line in load_corpus(repeat=1).splitlines() if line.strip()]
+    return [lines[k % len(lines)] for k in range(count)]
+
+
+def bench_many(count: int = 10_000, workers: int = 4):
+    """大量短源代码：逐段调用 Compiler.run_lexical_analysis 与 lex_many（单进程 / 进程池）对比"""
+    from Compilers.compiler import Compiler
+    print(f"== 批量词法分析（{count} 段） ==")
+    snippets = snippet_corpus(count)
+    compiler = Compiler()
+
+    def per_call():
+        return [compiler.run_lexical_analysis(snippet) for snippet in snippets]
+
+    expected = per_call()
+    assert list(lex_many(snippets)) == [(list(tokens), errors) for tokens, errors in expected]
+    t_loop = best_of(per_call)
+    t_batch = best_of(lex_many, snippets)
+    print(f"逐段调用            {t_loop * 1000:>9.1f} ms")
+    print(f"lex_many            {t_batch * 1000:>9.1f} ms  x{t_loop / t_batch:.2f}")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(abs, range(workers)))
+        t_pool = best_of(lex_many, snippets, executor)
+    print(f"lex_many {workers} 个子进程  {t_pool * 1000:>9.1f} ms  x{t_loop / t_pool:.2f}")
+
+
+if __name__ == '__main__':
+    bench_scanners()
+    bench_span_tokens()
+    bench_error_dense()
+    bench_auto_pathological()
+    bench_keywords()
+    bench_parallel()
+    bench_many()
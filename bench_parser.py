@@ -0,0 +1,380 @@
+#bench_parser.py
+# 语法分析性能基准：python -m Compilers.bench_parser
+import os
+import random
+import re
+import tempfile
+import tracemalloc
+
+from Compilers.bench_lexer import best_of, load_corpus
+from Compilers.compiler import Compiler
+from Compilers.ll_parser.core.grammar_cache import load_or_build, build_compiled
+from Compilers.ll_parser.core.grammar_oop import Grammar, clear_transform_cache
+from Compilers.ll_parser.core.first_follow import (
+    compute_first, compute_follow, compute_first_fixpoint, compute_follow_fixpoint, first_bits, follow_bits,
+    build_grammar_sets,
+)
+from Compilers.ll_parser.core.parse_table import build_parse_table
+from Compilers.ll_parser.core.ll_main import parse_with_tree
+from Compilers.ll_parser.core.rd_codegen import load_generated_parser, parse_generated
+from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+
+CFG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'll_parser', 'examples', 'CFG.txt')
+
+
+def bench_startup(rounds: int = 20):
+    """启动耗时：每次重新 finalize + 构建分析表、读取磁盘缓存、进程内共享 CompiledGrammar 三者对比"""
+    print("== 文法与分析表启动耗时 ==")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t_build = best_of(build_compiled, CFG_PATH, 'Program', rounds=rounds)
+        load_or_build(CFG_PATH, cache_dir=cache_dir)
+        t_cached = best_of(lambda: load_or_build(CFG_PATH, cache_dir=cache_dir), rounds=rounds)
+        size = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+    print(f"重新构建            {t_build * 1000:>8.2f} ms")
+    print(f"读取缓存 ({size} 字节) {t_cached * 1000:>8.2f} ms  x{t_build / t_cached:.1f}")
+    t_compiler = best_of(Compiler, rounds=rounds)
+    print(f"Compiler()（共享）  {t_compiler * 1000:>8.3f} ms")
+
+
+def synthetic_grammar(n_prods: int = 5000, per_head: int = 5, n_terms: int = 200, seed: int = 0) -> Grammar:
+    """
+    随机生成的大文法：每个非终结符 per_head 条产生式，右部多引用编号更大的非终结符，
+    形成很长的依赖链（固定点迭代需要多轮才能把集合传到链首），约 1/10 的产生式为 ε
+    """
+    rng = random.Random(seed)
+    n_heads = n_prods // per_head
+    terms = [f't{k}' for k in range(n_terms)]
+    g = Grammar()
+    for k in range(n_heads):
+        for _ in range(per_head):
+            if rng.random() < 0.1:
+                g.add_prod(f'N{k}', ['ε'])
+                continue
+            body = []
+            for _ in range(rng.randint(1, 4)):
+                if rng.random() < 0.6:
+                    body.append(f'N{min(n_heads - 1, k + rng.randint(0, 20))}')
+                else:
+                    body.append(rng.choice(terms))
+            g.add_prod(f'N{k}', body)
+    g.finalize(eliminate_lr=False, left_fact=False, remove_useless=False)
+    return g
+
+
+def bench_first_follow(n_prods: int = 5000):
+    """FIRST/FOLLOW：朴素固定点迭代与依赖图 + 位集传播对比"""
+    print(f"== FIRST/FOLLOW（{n_prods} 条产生式） ==")
+    g = synthetic_grammar(n_prods)
+    first = compute_first(g)
+    assert first == compute_first_fixpoint(g)
+    assert compute_follow(g, first, 'N0') == compute_follow_fixpoint(g, first, 'N0')
+    for label, fn_first, fn_follow in (('固定点迭代', compute_first_fixpoint, compute_follow_fixpoint),
+                                       ('依赖图+位集', compute_first, compute_follow)):
+        t_first = best_of(fn_first, g)
+        t_follow = best_of(fn_follow, g, first, 'N0')
+        print(f"{label:<10} FIRST {t_first * 1000:>9.1f} ms  FOLLOW {t_follow * 1000:>9.1f} ms")
+
+
+def legacy_parse_table(grammar: Grammar, start_symbol: str):
+    """整数编号之前的建表方式：FIRST/FOLLOW 为字符串集合，每条产生式按符号名逐个求 FIRST 并做集合运算"""
+    firsts = compute_first_fixpoint(grammar)
+    follows = compute_follow_fixpoint(grammar, firsts, start_symbol)
+    table = {}
+    for head, prods in grammar.productions.items():
+        for prod in prods:
+            first_set = set()
+            for symbol in prod.body:
+                if symbol == 'ε' or symbol in grammar.terminals:
+                    first_set.add(symbol)
+                    break
+                first_set |= firsts[symbol] - {'ε'}
+                if 'ε' not in firsts[symbol]:
+                    break
+            else:
+                first_set.add('ε')
+            for terminal in first_set - {'ε'}:
+                table.setdefault((head, terminal), prod)
+            if 'ε' in first_set:
+                for terminal in follows[head]:
+                    table.setdefault((head, terminal), prod)
+    return table, firsts, follows
+
+
+def _allocated(fn, *args) -> int:
+    """fn(*args) 的返回值仍然存活时占用的内存（字节）"""
+    tracemalloc.start()
+    result = fn(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_table_construction(n_prods: int = 5000):
+    """建表：字符串集合（旧）与整数编号 + 位集（finalize 时分配编号）对比耗时与 FIRST/FOLLOW 内存"""
+    print(f"== 分析表构建（{n_prods} 条产生式） ==")
+    g = synthetic_grammar(n_prods)
+    table, _, _ = build_parse_table(g, 'N0')
+    assert {k: repr(p) for k, p in table.items()} == {k: repr(p) for k, p in legacy_parse_table(g, 'N0')[0].items()}
+
+    def sets():
+        first = compute_first_fixpoint(g)
+        return first, compute_follow_fixpoint(g, first, 'N0')
+
+    def bits():
+        first = first_bits(g)
+        return first, follow_bits(g, first, 'N0')
+
+    t_old = best_of(legacy_parse_table, g, 'N0')
+    t_new = best_of(build_parse_table, g, 'N0')
+    print(f"建表耗时    字符串集合 {t_old * 1000:>8.1f} ms  整数位集 {t_new * 1000:>8.1f} ms  x{t_old / t_new:.1f}")
+    m_old, m_new = _allocated(sets), _allocated(bits)
+    print(f"FIRST/FOLLOW 内存  字符串集合 {m_old / 1024:>8.0f} KB  整数位集 {m_new / 1024:>8.0f} KB  x{m_old / m_new:.1f}")
+
+
+def bench_item_lookahead(n_prods: int = 5000):
+    """
+    每个 (产生式, 点位置) 的向前看集合查询：按字符串集合逐符号合并（旧）与 GrammarSets 预先算好的位集对比，
+    后者另计一次性的预计算耗时
+    """
+    g = synthetic_grammar(n_prods)
+    items = [(k, prod, dot) for k, prod in enumerate(g.all_prods()) for dot in range(len(prod.body) + 1)]
+    print(f"== 点位置向前看集合（{len(items)} 个项目） ==")
+    first = compute_first_fixpoint(g)
+    follow = compute_follow_fixpoint(g, first, 'N0')
+    nonterminals = g.nonterminals
+
+    def by_sets():
+        for _, prod, dot in items:
+            result = set()
+            for sym in prod.body[dot:]:
+                if sym == 'ε':
+                    continue
+                if sym not in nonterminals:
+                    result.add(sym)
+                    break
+                result |= first[sym] - {'ε'}
+                if 'ε' not in first[sym]:
+                    break
+            else:
+                result |= follow[prod.head]
+
+    sets = build_grammar_sets(g, 'N0')
+
+    def by_items():
+        lookahead_at = sets.lookahead_at
+        for k, prod, dot in items:
+            lookahead_at(k, prod.head_id, dot)
+
+    t_build = best_of(build_grammar_sets, g, 'N0')
+    t_old, t_new = best_of(by_sets), best_of(by_items)
+    print(f"逐符号合并 {t_old * 1000:>8.1f} ms  预计算查询 {t_new * 1000:>8.1f} ms  x{t_old / t_new:.1f}"
+          f"  （预计算 {t_build * 1000:.1f} ms）")
+
+
+def legacy_left_factor(grammar: Grammar):
+    """
+    字典树之前的左公因子提取：每次只按首符号提取一组，随即整体重建产生式并从头开始，
+    较长的公共前缀因此逐个符号地产生 A'、A''…… 链（遇到空右部 [] 时会抛出 IndexError）
+    """
+    while True:
+        changed = False
+        bodies_map = {A: [p.body for p in ps] for A, ps in grammar.productions.items()}
+        for A, bodies in bodies_map.items():
+            groups = {}
+            for b in bodies:
+                groups.setdefault(b[0] if b else 'ε', []).append(b)
+            for key, group in groups.items():
+                if key != 'ε' and len(group) > 1:
+                    Aprime = A + "'"
+                    while Aprime in bodies_map:
+                        Aprime += "'"
+                    bodies_map[A] = [b for b in bodies if b[0] != key] + [[key, Aprime]]
+                    bodies_map[Aprime] = [(b[1:] or ['ε']) for b in group]
+                    changed = True
+                    break
+            if changed:
+                break
+        if not changed:
+            break
+        grammar._rebuild_from_bodies(bodies_map)
+
+
+def prefix_grammar(n_heads: int = 200, per_head: int = 12, seed: int = 0) -> Grammar:
+    """每个非终结符的右部取自一棵随机前缀树，彼此共享长短不一的公共前缀（未 finalize）"""
+    rng = random.Random(seed)
+    g = Grammar()
+    for k in range(n_heads):
+        stems = [[f't{rng.randrange(8)}' for _ in range(rng.randint(1, 6))] for _ in range(3)]
+        for _ in range(per_head):
+            body = rng.choice(stems)[:rng.randint(1, 6)] + [f't{rng.randrange(8)}', f'N{(k + 1) % n_heads}']
+            g.add_prod(f'N{k}', body)
+    return g
+
+
+def bench_left_factoring(n_heads: int = 100):
+    """左公因子提取：逐组提取并整体重建（旧）与字典树一遍提取对比耗时、新增非终结符数与分析表大小"""
+    print(f"== 左公因子提取（{n_heads} 个非终结符） ==")
+    for label, factor in (('逐组重建', legacy_left_factor), ('字典树', Grammar._left_factor_all)):
+        def run():
+            g = prefix_grammar(n_heads)
+            factor(g)
+            return g
+        elapsed = best_of(run)
+        g = run()
+        g.finalize(eliminate_lr=False, left_fact=False)
+        table, _, _ = build_parse_table(g, 'N0')
+        print(f"{label:<6} {elapsed * 1000:>8.1f} ms  非终结符 {len(g.nonterminals):>5}  "
+              f"产生式 {len(g.all_prods()):>5}  分析表 {len(table):>6} 格")
+
+
+def recursive_grammar(n_groups: int = 300, seed: int = 0) -> Grammar:
+    """
+    含间接左递归的大文法（未 finalize）：每组 4 个非终结符沿左角构成环 G_k_0 → G_k_1 … → G_k_3 → G_k_0，
+    组与组之间右递归相连；另有同样多的不可达非终结符，以及同样多推导不出终结符串的非终结符
+    """
+    rng = random.Random(seed)
+    g = Grammar()
+    for k in range(n_groups):
+        nxt = [f'G{k + 1}_0'] if k + 1 < n_groups else []
+        for j in range(4):
+            head = f'G{k}_{j}'
+            g.add_prod(head, [f'G{k}_{(j + 1) % 4}', f't{rng.randrange(20)}'])
+            g.add_prod(head, [f't{rng.randrange(20)}'] + nxt)
+            g.add_prod(head, [f'D{k}', f't{rng.randrange(20)}'])
+        g.add_prod(f'D{k}', [f'D{k}', f't{rng.randrange(20)}'])
+        g.add_prod(f'U{k}', [f'u{k}', f'G{k}_0'])
+    return g
+
+
+def bench_grammar_transforms(n_groups: int = 300):
+    """finalize 的文法变换：间接左递归消除 + 删除无用符号的效果，以及变换缓存命中前后的耗时"""
+    print(f"== 文法变换（{n_groups * 4} 个左递归非终结符） ==")
+    for label, remove_useless in (('保留无用符号', False), ('删除无用符号', True)):
+        g = recursive_grammar(n_groups)
+        g.finalize(remove_useless=remove_useless)
+        table, _, _ = build_parse_table(g, 'G0_0')
+        print(f"{label}  非终结符 {len(g.nonterminals):>5}  终结符 {len(g.terminals):>5}  "
+              f"产生式 {len(g.all_prods()):>5}  分析表 {len(table):>6} 格")
+
+    def cold():
+        clear_transform_cache()
+        recursive_grammar(n_groups).finalize()
+
+    def warm():
+        recursive_grammar(n_groups).finalize()
+
+    t_build = best_of(recursive_grammar, n_groups)
+    t_cold, t_warm = best_of(cold) - t_build, best_of(warm) - t_build
+    print(f"finalize  未命中缓存 {t_cold * 1000:>7.1f} ms  命中缓存 {t_warm * 1000:>7.1f} ms  x{t_cold / t_warm:.1f}")
+
+
+def bench_parse_throughput(repeat: int = 200):
+    """语法分析吞吐量（token/秒）：字典分析表（元组键）与稠密分析表（整数编号）对比，三种 token 形式"""
+    source = load_corpus('语法*.txt', repeat)
+    compiled = Compiler().compiled
+    dict_table = dict(compiled.table)  # 不是 compiled.table 本身，因而走字典查表路径
+    tokens, errors = lexical_analysis(source)
+    assert not errors
+    pairs = list(zip(tokens_to_terminals(tokens), [lexeme for _, lexeme in tokens]))
+    spans, _ = dfa_lexical_analysis(source, spans=True)
+    n_tokens = len(tokens)
+    print(f"== 语法分析吞吐量（{n_tokens} 个 token） ==")
+    for label, toks, codes in (('(终结符, 词素)', pairs, False), ('(种别码, 词素)', tokens, True),
+                               ('SpanTokens', spans, False)):
+        t_dict = best_of(parse_with_tree, toks, compiled, dict_table, 'Program', None, codes)
+        t_dense = best_of(parse_with_tree, toks, compiled, compiled.dense_table, 'Program', None, codes)
+        print(f"{label:<14} 字典表 {n_tokens / t_dict / 1e3:>7.0f} K token/s  "
+              f"稠密表 {n_tokens / t_dense / 1e3:>7.0f} K token/s  x{t_dict / t_dense:.2f}")
+
+
+def bench_generated_parser(repeat: int = 1000):
+    """生成的递归下降模块与表驱动 parse_with_tree 对比（test/example 语法用例放大 repeat 倍）"""
+    source = load_corpus('语法*.txt', repeat)
+    compiled = Compiler().compiled
+    tokens, errors = lexical_analysis(source)
+    assert not errors
+    module = load_generated_parser()
+    print(f"== 递归下降生成模块（{len(tokens)} 个 token） ==")
+    results = []
+    for label, fn, args in (('字典表', parse_with_tree, (tokens, compiled, dict(compiled.table), 'Program', None, True)),
+                            ('稠密表', parse_with_tree, (tokens, compiled, compiled.table, 'Program', None, True)),
+                            ('生成模块', parse_generated, (tokens, module, None, True))):
+        elapsed = best_of(fn, *args)
+        results.append(elapsed)
+        print(f"{label:<6} {elapsed * 1000:>8.0f} ms  {len(tokens) / elapsed / 1e3:>7.0f} K token/s  "
+              f"x{results[0] / elapsed:.2f}")
+
+
+def broken_corpus(repeat: int = 20, every: int = 10):
+    """
+    多错误输入：语法用例放大 repeat 倍后，每 every 个 ';' 删去一个。
+    返回 (出错的源代码, 被删去的 ';' 在原源代码中的偏移量列表)
+    """
+    source = load_corpus('语法*.txt', repeat)
+    removed = [k for k, ch in enumerate(source) if ch == ';'][every - 1::every]
+    parts, last = [], 0
+    for k in removed:
+        parts.append(source[last:k])
+        last = k + 1
+    parts.append(source[last:])
+    return ' '.join(parts), removed
+
+
+def bench_error_recovery(repeat: int = 20, every: int = 10):
+    """
+    多错误文件：逐个修正首个错误后重新词法 + 语法分析（无错误恢复时的工作方式）与一遍错误恢复对比；
+    另测无错误输入上开启错误恢复的额外开销
+    """
+    compiled = Compiler().compiled
+    broken, removed = broken_corpus(repeat, every)
+    print(f"== 语法错误恢复（删去 {len(removed)} 个 ';'） ==")
+
+    def rerun_until_clean():
+        # 每轮报告一个错误，修正后整体重跑：删去的 ';' 原处留有一个空格，
+        # 补回报错位置之前所有仍缺失的 ';'（文法本身接受的缺失不会报错，随下一个错误一并补回）
+        source, missing, runs = broken, list(removed), 0
+        while True:
+            runs += 1
+            tokens, _, positions = lexical_analysis(source, with_positions=True)
+            try:
+                parse_with_tree(tokens, compiled, compiled.table, 'Program', positions, True)
+                return runs
+            except SyntaxError as e:
+                line, col = map(int, re.search(r'line (\d+), column (\d+)', str(e)).groups())
+                limit = positions.line_index.offset_of(line, col)
+                while missing and missing[0] < limit:
+                    k = missing.pop(0)
+                    source = source[:k] + ';' + source[k + 1:]
+
+    def recover_once():
+        tokens, _, positions = lexical_analysis(broken, with_positions=True)
+        errors = []
+        parse_with_tree(tokens, compiled, compiled.table, 'Program', positions, True, errors)
+        return errors
+
+    runs = rerun_until_clean()
+    errors = recover_once()
+    t_rerun = best_of(rerun_until_clean, rounds=1)
+    t_once = best_of(recover_once)
+    print(f"逐个修正重跑（{runs} 轮）       {t_rerun * 1000:>9.0f} ms")
+    print(f"一遍错误恢复（报告 {len(errors)} 个错误） {t_once * 1000:>9.0f} ms  x{t_rerun / t_once:.0f}")
+
+    tokens, _ = lexical_analysis(load_corpus('语法*.txt', repeat * 10))
+    t_plain = best_of(parse_with_tree, tokens, compiled, compiled.table, 'Program', None, True)
+    t_recover = best_of(lambda: parse_with_tree(tokens, compiled, compiled.table, 'Program', None, True, []))
+    print(f"无错误输入（{len(tokens)} 个 token）  直接解析 {t_plain * 1000:>7.1f} ms  "
+          f"开启错误恢复 {t_recover * 1000:>7.1f} ms")
+
+
+if __name__ == '__main__':
+    bench_startup()
+    bench_first_follow()
+    bench_table_construction()
+    bench_item_lookahead()
+    bench_left_factoring()
+    bench_grammar_transforms()
+    bench_parse_throughput()
+    bench_generated_parser()
+    bench_error_recovery()
@@ -1,10 +1,10 @@
-from typing import Dict, List, Tuple, Any
-import os
+from typing import Dict, List, Optional, Tuple, Any
 
-from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals
+from Compilers.lexer.manual_lexer import lexical_analysis
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+from Compilers.lexer.line_index import TokenPositions
 from Compilers.ll_parser.core.ll_main import parse_with_tree
-from Compilers.ll_parser.core.grammar_oop import Grammar, load_grammar_from_file
-from Compilers.ll_parser.core.parse_table import build_parse_table
+from Compilers.ll_parser.core.compiled_grammar import get_compiled_grammar
 from Compilers.ll_parser.core.parse_tree import cst_to_ast
 from Compilers.semantic.semantic_analyzer import run_semantic_analysis
 from Compilers.middle_code.ir_generator import IRBuilder
@@ -16,67 +16,69 @@ class Compiler:
     """
 
     def __init__(self):
-        # 创建 Grammar 对象，用于存储文法定义
-        self.grammar = Grammar()
-        # 获取当前文件所在目录路径
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # 构建文法文件路径 (CFG.txt 位于 ll_parser/examples 目录下)
-        cfg_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            'll_parser', 'examples', 'CFG.txt'
-        )
-        # 从文件加载文法规则到 Grammar 对象中
-        load_grammar_from_file(cfg_path, self.grammar)
-        # 对文法进行后处理：消除左递归、左公因子化
-        self.grammar.finalize(eliminate_lr=True, left_fact=True)
-        # 构建 LL(1) 分析表，返回分析表、是否为 LL1 文法标志以及文法终结符集合
-        self.table, self.is_ll1, self.terminals = build_parse_table(
-            self.grammar,
-            start_symbol='Program'
-        )
-
-    def run_lexical_analysis(self, source_code: str, mode: str = '手动') -> Tuple[List, List[str]]:
+        # 文法（已消除左递归、左公因子化）与 LL(1) 分析表：本进程内所有 Compiler 共用同一个只读对象，
+        # 首次使用时从磁盘缓存读取或构建（CFG.txt 位于 ll_parser/examples 目录下）
+        self.compiled = get_compiled_grammar(start_symbol='Program')
+        # 文法、分析表、是否为 LL1 文法标志以及文法终结符集合
+        self.grammar = self.compiled
+        self.table = self.compiled.table
+        self.is_ll1 = self.compiled.is_ll1
+        self.terminals = self.compiled.terminal_list
+
+    def run_lexical_analysis(self, source_code: str, mode: str = '手动',
+                             with_positions: bool = False) -> Tuple:
         """
         运行词法分析
 
         参数:
             source_code: 源代码字符串
-            mode: 分析模式，'手动' 或 '自动'
+            mode: 分析模式，'手动'、'DFA'（表驱动扫描器）或 '自动'
+            with_positions: 为 True 时额外返回 token 位置信息
 
         返回:
-            tokens: 词法单元列表，每个元素为 (token_type, lexeme)
+            tokens: 词法单元列表，每个元素为 (token_type, lexeme)；
+                    自动模式下为 TokenBuffer，其元素同样可按 (token_type, lexeme) 解包
             errors: 错误信息列表
+            positions: 仅当 with_positions 为 True 时返回
         """
         if mode == '手动':
             # 调用用户手写的词法分析器实现
-            return lexical_analysis(source_code)
+            return lexical_analysis(source_code, with_positions)
+        elif mode == 'DFA':
+            # 表驱动 DFA 扫描器，输出与手写实现一致
+            return dfa_lexical_analysis(source_code, with_positions)
         else:
-            # 如果需要自动模式，则动态导入并调用自动词法分析器
-            from Compilers.lexer.auto_lexer import analyze
-            return analyze(source_code)
-
-    def run_syntax_analysis(self, tokens: List) -> Tuple[Any, Any]:
+            # 自动模式：TokenBuffer 的种别码与手写实现同属 token_kinds 登记表，直接交给语法分析
+            from Compilers.lexer.auto_lexer import LexerWrapper
+            lexer = LexerWrapper()
+            lexer.input(source_code)
+            tokens = lexer.tokens
+            return (tokens, lexer.errors, tokens.positions) if with_positions else (tokens, lexer.errors)
+
+    def run_syntax_analysis(self, tokens: List, positions: Optional[TokenPositions] = None,
+                            errors: Optional[List[str]] = None) -> Tuple[Any, Any]:
         """
         运行语法分析，生成具体语法树 (CST) 和抽象语法树 (AST)
 
         参数:
             tokens: 词法单元列表
+            positions: 可选的 token 位置信息，用于语法错误的行列定位与节点 pos
+            errors: 省略时遇到语法错误抛出 SyntaxError；传入列表时进行错误恢复，
+                    全部语法错误追加到该列表，返回的语法树在出错处带有 error 节点
 
         返回:
             cst: 具体语法树节点
             ast: 抽象语法树节点
         """
-        # 将 tokens 拆分成只含终结符和词素的平行列表
-        terms_only = tokens_to_terminals(tokens)  # 提取 token_type
-        lexemes_only = [lexeme for (_, lexeme) in tokens]  # 提取实际字符
-        term_pairs = list(zip(terms_only, lexemes_only))  # 组成 (token_type, lexeme) 对列表
-
         # 使用 LL(1) 分析表解析，生成具体语法树 (CST)
         cst = parse_with_tree(
-            term_pairs,
+            tokens,
             self.grammar,
             self.table,
-            'Program'
+            'Program',
+            positions,
+            token_codes=True,
+            errors=errors
         )
         # 将 CST 转换为简化后的抽象语法树 (AST)
         ast = cst_to_ast(cst)
@@ -126,8 +128,9 @@ class Compiler:
         result = {}
 
         # 1. 词法分析阶段
-        tokens, lex_errors = self.run_lexical_analysis(source_code, mode)
+        tokens, lex_errors, positions = self.run_lexical_analysis(source_code, mode, with_positions=True)
         result['tokens'] = tokens
+        result['positions'] = positions
         result['lex_errors'] = lex_errors
 
         # 如果词法阶段有错误，则直接返回失败状态
@@ -137,10 +140,16 @@ class Compiler:
             return result
 
         try:
-            # 2. 语法分析阶段
-            cst, ast = self.run_syntax_analysis(tokens)
+            # 2. 语法分析阶段：一遍报告全部语法错误
+            syntax_errors = []
+            cst, ast = self.run_syntax_analysis(tokens, positions, syntax_errors)
             result['cst'] = cst
             result['ast'] = ast
+            result['syntax_errors'] = syntax_errors
+            if syntax_errors:
+                result['status'] = 'failed'
+                result['error'] = "语法分析错误:\n" + "\n".join(syntax_errors)
+                return result
 
             # 3. 语义分析阶段
             symbol_tables = self.run_semantic_analysis(ast)
@@ -1,78 +1,116 @@
+import mmap
 import re
+import string
+from array import array
+from operator import add
 
-# 定义 Token 模式及优先级，按照从高到低的顺序放置，优先匹配更复杂或更特定的模式
+from Compilers.lexer.keywords import KeywordTable
+from Compilers.lexer.line_index import LineIndex, TokenPositions
+from Compilers.lexer.token_kinds import (
+    keywords, extra_keywords, operators, delimiter,
+    identifier_code, integer_code, float_code, string_code, char_code, other_code, error_code,
+)
+
+# 定义 Token 模式及优先级，按照从高到低的顺序放置，优先匹配更复杂或更特定的模式。
+# 各模式中的重复一律写成占有型量词（*+ ++ ?+，Python 3.11+），匹配失败时不回溯：
+# 相邻的字符类互不相交，占有与贪婪在合法输入上结果相同，但能避免长数字串、长字符串上的反复回溯，
+# 也避免了回溯"退让"出的错误切分（如 1e5 被截成 INVALID_NUMBER_ALPHA、"abc" 被拆成未闭合字符串）。
+# 名称必须唯一：它们同时是主正则中的命名分组。
 TOKENS = [
     # 多行注释：匹配 /* ... */ 包含换行的注释，? 为非贪婪匹配
     ('COMMENT_MULTI',         r'/\*[\s\S]*?\*/'),
+    # 未闭合的多行注释：吞掉其后全部内容（否则每个 '/*' 都会向后扫描到文件末尾，整体退化为平方）
+    ('COMMENT_UNCLOSED',      r'/\*[\s\S]*+'),
     # 单行注释：匹配 // 开头直到行尾的注释
-    ('COMMENT_SINGLE',        r'//.*'),
+    ('COMMENT_SINGLE',        r'//.*+'),
     # 预处理指令：匹配 # 开头，后跟字母或下划线开头的标识符
-    ('PREPROCESSOR',          r'\#[A-Za-z_][A-Za-z0-9_]*'),
+    ('PREPROCESSOR',          r'\#[A-Za-z_][A-Za-z0-9_]*+'),
     # 错误浮点：多个小数点后可带可选科学计数法，如 1.2.3 或 1.2.3e+4
-    ('INVALID_FLOAT_MULTI_DOT', r'\d+\.\d+\.\d+([eE][+-]?\d+)?'),
+    ('INVALID_FLOAT_MULTI_DOT', r'\d++\.\d++\.\d++(?:[eE][+-]?\d++)?+'),
     # 错误八进制：以 0 开头，但包含 8 或 9
-    ('INVALID_OCTAL',           r'0[0-7]*[89]\d*'),
+    ('INVALID_OCTAL',           r'0[0-7]*+[89]\d*+'),
     # 错误十六进制：0x 后跟非十六进制字符
-    ('INVALID_HEX',             r'0[xX][0-9A-Fa-f]*[^0-9A-Fa-f\s]+'),
+    ('INVALID_HEX',             r'0[xX][0-9A-Fa-f]*+[^0-9A-Fa-f\s]++'),
     # 数字后接字母非法：非 0x 前缀的数字后面带字母
-    ('INVALID_NUMBER_ALPHA',    r'(?!0[xX])\d+(?:\.\d*)?(?:[eE][+-]?\d+)?[A-Za-z_]\w*'),
+    ('INVALID_NUMBER_ALPHA',    r'(?!0[xX])\d++(?:\.\d*+)?+(?:[eE][+-]?\d++)?+[A-Za-z_]\w*+'),
     # 合法浮点：整数/小数部分可选，带可选科学计数法
-    ('FLOAT',                   r'\d*\.\d+([eE][+-]?\d+)?|\d+[eE][+-]?\d+'),
+    ('FLOAT',                   r'\d*+\.\d++(?:[eE][+-]?\d++)?+|\d++[eE][+-]?\d++'),
     # 合法整数：十六进制、八进制、十进制和单独 0
-    ('INTEGER',                 r'0[xX][0-9A-Fa-f]+|0[0-7]+|[1-9]\d*|0'),
+    ('INTEGER',                 r'0[xX][0-9A-Fa-f]++|0[0-7]++|[1-9]\d*+|0'),
 
     # 错误多字符操作符：连续 3 个以上操作符字符
-    ('INVALID_OPERATOR_MULTI',  r'[+\-*/%<>=!&]{3,}'),
+    ('INVALID_OPERATOR_MULTI',  r'[+\-*/%<>=!&]{3,}+'),
     # 合法双字符操作符，如 ++, --, ==, !=, <=, >=, <<, >>, &&, ||
     ('OP',                      r'\+\+|--|\+=|-=|\*=|/=|%=|==|!=|<=|>=|<<|>>|&&|\|\|'),
     # 合法单字符操作符，如 + - * / % < > = ! &
-    ('OP',                      r'[+\-*/%<>=!&]'),
+    ('OP_SINGLE',               r'[+\-*/%<>=!&]'),
     # 错误双字符操作符：长度为 2 且不在合法列表中
     ('INVALID_OPERATOR',        r'(?:[+\-*/%<>=!&]{2})'),
 
     # 分隔符：逗号、分号、冒号、大括号、中括号、小括号、点
     ('DELIM',                   r'[\.,;:{}\[\]\(\)]'),
-    # 关键字（必须放在 IDENT 之前，保证优先匹配）
-    ('KEYWORD', r'\b(?:int|char|float|double|if|else|for|while|do|return|break|continue)\b'),
+    # 关键字不再单独占一个交替分支：IDENT 匹配出完整单词后查 KEYWORD_TABLE（见 LexerWrapper.input）
     # 标识符：以字母或下划线开头，后跟字母、数字或下划线
-    ('IDENT',                   r'[A-Za-z_][A-Za-z0-9_]*'),
+    ('IDENT',                   r'[A-Za-z_][A-Za-z0-9_]*+'),
 
     # 非法字符串未闭合：以双引号开始，直到行尾未闭合
-    ('STRING_UNCLOSED',         r'"(?:\\.|[^"\\\n])*(?!\")'),
+    ('STRING_UNCLOSED',         r'"(?:\\.|[^"\\\n])*+(?!\")'),
     # 合法字符串：双引号内可包含转义序列或非引号字符
-    ('STRING',                  r'"(?:\\.|[^"\\\n])*"'),
+    ('STRING',                  r'"(?:\\.|[^"\\\n])*+"'),
     # 非法字符常量未闭合：单引号开始未闭合
-    ('CHAR_UNCLOSED',           r"'(?:\\.|[^'\\\n])*(?!')"),
+    ('CHAR_UNCLOSED',           r"'(?:\\.|[^'\\\n])*+(?!')"),
     # 合法字符常量：单引号内一个字符或转义序列
     ('CHAR',                    r"'(?:\\.|[^'\\\n])'"),
 
     # 空白：空格、制表、换行等
-    ('WHITESPACE',              r'\s+'),
+    ('WHITESPACE',              r'\s++'),
     # 兜底：匹配任意单个字符
     ('MISMATCH',                r'.'),
 ]
 
 
-# 关键字与符号映射
-KEYWORDS = {'main':1, 'int':2, 'char':3, 'if':4, 'else':5,
-            'for':6, 'while':7, 'return':8, 'void':9,
-            'string':10, 'bool':11}
-SYMBOLS  = {
-    '=':21, '==':39, '!=':40, '<':36, '>':35, '<=':38, '>=':37,
-    '+':22, '++':41, '+=':43, '-':23, '--':42, '-=':44,
-    '*':24, '*=':45, '/':25, '/=':46, '%':26, '%=':47,
-    '<<':48, '>>':49, '&&':50, '||':51,
-    '(':26, ')':27, '[':28, ']':29, '{':30, '}':31,
-    ',':32, ':':33, ';':34
+# 种别码统一取自 token_kinds 登记表，与手写词法分析一致，输出可直接交给语法分析。
+# 关键字集合与手写词法分析相同（main 按标识符处理，read / write 等按关键字处理，与文法一致）
+KEYWORDS = dict(keywords)
+# 原 KEYWORD 正则 r'\b(?:int|...)\b' 中的单词；其中不在 KEYWORDS 里的登记为 extra_keywords
+REGEX_KEYWORDS = ('int', 'char', 'float', 'double', 'if', 'else', 'for', 'while',
+                  'do', 'return', 'break', 'continue')
+# 关键字识别表：在 KEYWORDS 之外还识别 extra_keywords（受 _BOUNDARY_KEYWORDS 的边界规则约束）
+KEYWORD_TABLE = KeywordTable.merged(KEYWORDS, extra_keywords)
+# 只出现在原 KEYWORD 正则中的关键字
+_BOUNDARY_KEYWORDS = frozenset(extra_keywords)
+# 原正则开头的 \b 要求前一个字符不是 ASCII 单词字符，否则 _BOUNDARY_KEYWORDS 中的单词只能按 IDENT 匹配
+_WORD_CHARS = frozenset(string.ascii_letters + string.digits + '_')
+_WORD_BYTES = frozenset((string.ascii_letters + string.digits + '_').encode())
+
+# 主正则：每个模式作为一个命名分组按优先级拼成一条交替式，一次编译。
+# finditer 逐个取出匹配，lastgroup 即命中的模式名，省去 re.Scanner 每个单词一次的回调。
+# re.Scanner 编译时不带 UNICODE 标志，\d \w \s 只匹配 ASCII，这里用 re.ASCII 保持一致。
+MASTER_PATTERN = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKENS), re.ASCII)
+
+# 字节版主正则：用于 bytes / mmap 输入，直接在文件映射上扫描，不生成整个文件的 str。
+# 模式本身都是 ASCII，只有"恰好一个字符"的两处需要改写为"一个 UTF-8 字符"，使切分与 str 版逐字一致。
+_UTF8_CHAR = rb'[\xc0-\xff][\x80-\xbf]*+'
+_BYTES_OVERRIDES = {
+    'CHAR':     rb"'(?:\\(?:" + _UTF8_CHAR + rb"|[^\n\x80-\xff])|" + _UTF8_CHAR + rb"|[^'\\\n\x80-\xff])'",
+    'MISMATCH': _UTF8_CHAR + rb'|.',
 }
+MASTER_PATTERN_BYTES = re.compile(b'|'.join(
+    b'(?P<' + name.encode() + b'>' + _BYTES_OVERRIDES.get(name, pattern.encode()) + b')' for name, pattern in TOKENS
+))
 
-# 构造 Scanner
+# 构造 Scanner（保留旧接口）
 # 接收 TOKENS，一次性编译所有正则，达到按优先级扫描的效果。
 scanner = re.Scanner([(pattern, lambda s, t, tp=tt: (tp, t)) for tt, pattern in TOKENS])
 
 
-# 全局错误列表
-errors = []
+def scan(code: str):
+    """
+    用主正则扫描源代码，逐个产出 (模式名, 词素)，结果与 scanner.scan(code)[0] 相同。
+    WHITESPACE 与 MISMATCH 保证任意位置都能匹配，因此匹配之间不会留下空隙。
+    """
+    for m in MASTER_PATTERN.finditer(code):
+        yield m.lastgroup, m.group()
 
 # Token 类——兼容 PLY 接口属性
 class Token:
@@ -83,73 +121,218 @@ class Token:
     def __repr__(self):
         return f"Token({self.type_code}, '{self.value}', {self.type})"
 
+
+# 输出 token 可能的类型名：模式名加上分类后的名称。TokenBuffer 中只存其下标，名称本身只有这一份
+TYPE_NAMES = tuple(dict.fromkeys(
+    [name for name, _ in TOKENS] + ['KEYWORD', 'IDENTIFIER', 'OPERATOR', 'DELIMITER']
+))
+TYPE_IDS = {name: k for k, name in enumerate(TYPE_NAMES)}
+
+
+class TokenBuffer:
+    """
+    列式 token 缓冲：每个 token 只占四个数组中的各一项，不产生任何 Python 对象。
+      codes:   种别码，array('H')
+      starts:  词素在源代码中的起始偏移量，array('I')
+      lengths: 词素长度，array('I')
+      kinds:   类型名在 TYPE_NAMES 中的下标，array('B')
+    词素在需要时才从 source 中切出；按下标访问得到轻量的 TokenView。
+    种别码取自 token_kinds 登记表，codes / lexeme(k) / positions 与 SpanTokens 相同，
+    因此整个缓冲可以直接交给 parse_with_tree，不需要逐 token 转换。
+    """
+    __slots__ = ('source', 'codes', 'starts', 'lengths', 'kinds')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.codes = array('H')
+        self.starts = array('I')
+        self.lengths = array('I')
+        self.kinds = array('B')
+
+    def append(self, code: int, start: int, length: int, kind: int):
+        self.codes.append(code)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.kinds.append(kind)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, k: int) -> 'TokenView':
+        if k < 0:
+            k += len(self.codes)
+        if not 0 <= k < len(self.codes):
+            raise IndexError('token index out of range')
+        return TokenView(self, k)
+
+    def __iter__(self):
+        for k in range(len(self.codes)):
+            yield TokenView(self, k)
+
+    def lexeme(self, k: int) -> str:
+        """第 k 个 token 的词素（字节输入按 UTF-8 解码）"""
+        start = self.starts[k]
+        text = self.source[start:start + self.lengths[k]]
+        return text if isinstance(text, str) else text.decode('utf-8')
+
+    @property
+    def positions(self):
+        """与 token 平行的 TokenPositions（源代码为 str 时），字节输入的偏移量不是字符偏移量，返回 None"""
+        if not isinstance(self.source, str):
+            return None
+        return TokenPositions(LineIndex(self.source), self.starts, array('I', map(add, self.starts, self.lengths)))
+
+    def as_tuples(self):
+        """展开为 [(type_code, lexeme, type_name)]，即 analyze 的返回格式"""
+        source, names = self.source, TYPE_NAMES
+        if not isinstance(source, str):
+            return [(self.codes[k], self.lexeme(k), names[self.kinds[k]]) for k in range(len(self.codes))]
+        return [(code, source[start:start + length], names[kind])
+                for code, start, length, kind in zip(self.codes, self.starts, self.lengths, self.kinds)]
+
+
+class TokenView:
+    """
+    TokenBuffer 中第 k 个 token 的视图，属性与 Token 相同（type_code / value / type），
+    只保存缓冲区引用和下标，value 在访问时才切出。
+    """
+    __slots__ = ('_buffer', '_index')
+
+    def __init__(self, buffer: TokenBuffer, index: int):
+        self._buffer = buffer
+        self._index = index
+
+    @property
+    def type_code(self) -> int:
+        return self._buffer.codes[self._index]
+
+    @property
+    def value(self) -> str:
+        return self._buffer.lexeme(self._index)
+
+    @property
+    def type(self) -> str:
+        return TYPE_NAMES[self._buffer.kinds[self._index]]
+
+    @property
+    def start(self) -> int:
+        """词素在源代码中的起始偏移量"""
+        return self._buffer.starts[self._index]
+
+    def __iter__(self):
+        """按 (种别码, 词素) 解包，与手写词法分析的 token 形式一致"""
+        yield self.type_code
+        yield self.value
+
+    def __repr__(self):
+        return f"Token({self.type_code}, '{self.value}', {self.type})"
+
+
+def _group_text(m) -> str:
+    return m.group()
+
+
+def _group_bytes(m) -> str:
+    return m.group().decode('utf-8')
+
+
 # LexerWrapper：模拟 PLY 的 lexer 接口
-# 用于封装 re.Scanner 输出，提供与 PLY 接口一致的方法：
+# 用于封装扫描输出，提供与 PLY 接口一致的方法。
+# 每个实例即一次词法分析的上下文，独占自己的 token 缓冲与错误列表，
+# 不读写任何模块级可变状态，因此不同线程各用各的实例即可并发分析，无需加锁。
 class LexerWrapper:
     def __init__(self):
-        # 存储扫描器处理后的所有合法/非法 Token 对象
-        self._tokens = []
+        # 扫描结果的列式缓冲
+        self._tokens = TokenBuffer('')
         # 当前扫描到的 token 索引
         self._index = 0
+        # 本实例最近一次 input 产生的错误信息
+        self.errors = []
+
+    @property
+    def tokens(self) -> TokenBuffer:
+        """最近一次 input 的 token 缓冲"""
+        return self._tokens
 
-    def input(self, code: str):
+    def input(self, code):
         """
-        处理输入的源代码字符串，将其转换为内部统一的 Token 列表，
+        处理输入的源代码字符串，将其转换为内部统一的列式 token 缓冲，
         并根据类型分类，处理错误和合法情况。
+        每次调用都换用新的错误列表，之前返回给调用者的列表不会被改动。
+        code 也可以是 UTF-8 编码的 bytes / mmap：此时用字节版主正则扫描，偏移量为字节偏移。
         """
-        global errors
-        errors.clear()  # 清空全局错误列表
-        all_tokens, _ = scanner.scan(code)  # 调用自定义扫描器进行词法分析
-
-        out = []  # 保存处理后的 Token 对象列表
-        for tp, lexeme in all_tokens:
+        errors = self.errors = []
+        out = TokenBuffer(code)
+        add = out.append
+        ids = TYPE_IDS
+        if isinstance(code, str):
+            pattern, group, word_chars = MASTER_PATTERN, _group_text, _WORD_CHARS
+        else:
+            pattern, group, word_chars = MASTER_PATTERN_BYTES, _group_bytes, _WORD_BYTES
+        keyword_code, boundary = KEYWORD_TABLE.get, _BOUNDARY_KEYWORDS
+        operator_code, delimiter_code = operators.get, delimiter.get
+        for m in pattern.finditer(code):
+            tp = m.lastgroup
             # 忽略空白和注释类 token，不做进一步处理
             if tp in ('WHITESPACE', 'COMMENT_MULTI', 'COMMENT_SINGLE'):
                 continue
 
+            # 未闭合的多行注释：报错，其后内容全部视为注释
+            if tp == 'COMMENT_UNCLOSED':
+                errors.append("多行注释未闭合 '/*'")
+                continue
+
+            start, end = m.span()
+            length = end - start
+
             # 不匹配的非法字符，记录错误并加入错误 token
             if tp == 'MISMATCH':
-                errors.append(f"非法字符 '{lexeme}'")
-                out.append(Token(0, lexeme, 'MISMATCH'))
+                errors.append(f"非法字符 '{group(m)}'")
+                add(error_code, start, length, ids[tp])
 
             # 其他非法 token 类型（如无效数字格式等）
             elif tp.startswith('INVALID'):
-                errors.append(f"{tp} 错误: '{lexeme}'")
-                out.append(Token(0, lexeme, tp))
+                errors.append(f"{tp} 错误: '{group(m)}'")
+                add(error_code, start, length, ids[tp])
 
-            # 如果是标识符并且是关键字
-            elif tp == 'IDENT' and lexeme in KEYWORDS:
-                out.append(Token(KEYWORDS[lexeme], lexeme, 'KEYWORD'))
-
-            # 普通标识符
+            # 标识符：关键字或普通标识符
             elif tp == 'IDENT':
-                out.append(Token(45, lexeme, 'IDENTIFIER'))
+                word = group(m)
+                code_kw = keyword_code(word)
+                if code_kw is not None and start and code[start - 1] in word_chars and word in boundary:
+                    code_kw = None
+                if code_kw is not None:
+                    add(code_kw, start, length, ids['KEYWORD'])
+                else:
+                    add(identifier_code, start, length, ids['IDENTIFIER'])
 
             # 整型或浮点型常量
             elif tp in ('INTEGER', 'FLOAT'):
-                code_map = 46 if tp == 'INTEGER' else 47  # 整数:46，浮点数:47
-                out.append(Token(code_map, lexeme, tp))
+                code_map = integer_code if tp == 'INTEGER' else float_code
+                add(code_map, start, length, ids[tp])
 
             # 操作符处理
-            elif tp == 'OP':
-                if lexeme in SYMBOLS:
-                    out.append(Token(SYMBOLS[lexeme], lexeme, 'OPERATOR'))
+            elif tp in ('OP', 'OP_SINGLE'):
+                lexeme = group(m)
+                code_op = operator_code(lexeme)
+                if code_op is not None:
+                    add(code_op, start, length, ids['OPERATOR'])
                 else:
                     errors.append(f"未知操作符 '{lexeme}'")
-                    out.append(Token(0, lexeme, 'OPERATOR'))
+                    add(error_code, start, length, ids['OPERATOR'])
 
             # 分隔符处理
             elif tp == 'DELIM':
-                out.append(Token(SYMBOLS.get(lexeme, 0), lexeme, 'DELIMITER'))
+                add(delimiter_code(group(m), error_code), start, length, ids['DELIMITER'])
 
             # 字符串或字符常量
             elif tp in ('STRING', 'CHAR'):
-                code_map = 49 if tp == 'STRING' else 48  # 字符串:49，字符:48
-                out.append(Token(code_map, lexeme, tp))
+                code_map = string_code if tp == 'STRING' else char_code
+                add(code_map, start, length, ids[tp])
 
             else:
-                # 其他类型，如预处理指令等统一用 63 表示
-                out.append(Token(63, lexeme, tp))
+                # 其他类型，如预处理指令、未闭合的字符串/字符等统一用 other_code 表示
+                add(other_code, start, length, ids[tp])
 
         # 更新内部 Token 缓存和索引
         self._tokens = out
@@ -157,25 +340,50 @@ class LexerWrapper:
 
     def token(self):
         """
-        获取当前索引指向的 token，并将索引向后推进一位。
+        获取当前索引指向的 token（TokenView），并将索引向后推进一位。
         如果没有更多 token，返回 None。
         """
         if self._index < len(self._tokens):
-            tok = self._tokens[self._index]
+            tok = TokenView(self._tokens, self._index)
             self._index += 1
             return tok
         return None
 
+    def __iter__(self):
+        """按 PLY 约定迭代剩余 token"""
+        while True:
+            tok = self.token()
+            if tok is None:
+                return
+            yield tok
 
-# 对外导出兼容 PLY 接口的 lexer 与 errors
-lexer = LexerWrapper()
 
 # 分析函数：返回 (tokens, errors)
 def analyze(code: str):
     """
+    每次调用使用独立的 LexerWrapper，可在多个线程中同时调用。
     返回:
       tokens: List[ (type_code, lexeme, type_name) ]
-      errors: List[str]
+      errors: List[str]，属于本次调用，不与其他调用共享
     """
+    lexer = LexerWrapper()
     lexer.input(code)
-    return [(t.type_code, t.value, t.type) for t in lexer._tokens], errors
+    return lexer.tokens.as_tuples(), lexer.errors
+
+
+def analyze_file(path: str):
+    """
+    以 mmap 方式词法分析整个文件，不把文件内容读成 Python str。
+    返回:
+      tokens: TokenBuffer，source 为文件映射，词素在访问时才解码
+      errors: List[str]
+    """
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            source = b''
+        else:
+            # 映射在文件关闭后依然有效，随 TokenBuffer 一起释放
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    lexer = LexerWrapper()
+    lexer.input(source)
+    return lexer.tokens, lexer.errors
@@ -0,0 +1,99 @@
+# batch_lexer.py
+# 批量词法分析：成千上万段短源代码依次扫描进同一个 token 列表，最后拆成平行数组，
+# 省去逐段调用 lexical_analysis 时的初始化与逐段结果列表；批次也可分发到进程池。
+from array import array
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from Compilers.lexer.manual_lexer import build_error
+from Compilers.lexer.dfa_lexer import _scan
+from Compilers.lexer.line_index import LineIndex
+
+# 行号索引只在报告未闭合的多行注释时才被 _scan 使用，不含 '/*' 的段共用这一个空索引
+_NO_COMMENT_INDEX = LineIndex('')
+
+
+class LexBatch:
+    """
+    一批源代码的词法分析结果，以列存储：
+
+      codes / lexemes:        所有 token 的种别码（array('H')）与词素，按源代码顺序首尾相接
+      token_offsets:          第 k 段的 token 为 [token_offsets[k], token_offsets[k + 1])
+      errors / error_offsets: 错误信息字符串（格式同 lexical_analysis）及其按源代码的分段
+    """
+    __slots__ = ('codes', 'lexemes', 'token_offsets', 'errors', 'error_offsets')
+
+    def __init__(self):
+        self.codes = array('H')
+        self.lexemes: List[str] = []
+        self.token_offsets = array('I', [0])
+        self.errors: List[str] = []
+        self.error_offsets = array('I', [0])
+
+    def __len__(self):
+        return len(self.token_offsets) - 1
+
+    def tokens(self, k: int) -> List[Tuple[int, str]]:
+        """第 k 段源代码的 [(种别码, 词素)]，与 lexical_analysis 的 tokens 相同"""
+        start, end = self.token_offsets[k], self.token_offsets[k + 1]
+        return list(zip(self.codes[start:end], self.lexemes[start:end]))
+
+    def errors_of(self, k: int) -> List[str]:
+        """第 k 段源代码的错误信息"""
+        return self.errors[self.error_offsets[k]:self.error_offsets[k + 1]]
+
+    def __iter__(self) -> Iterator[Tuple[List[Tuple[int, str]], List[str]]]:
+        """逐段产出 (tokens, errors)"""
+        for k in range(len(self)):
+            yield self.tokens(k), self.errors_of(k)
+
+    def extend(self, other: 'LexBatch'):
+        """把另一批结果接在本批之后（偏移量按本批已有的 token 与错误数平移）"""
+        token_base, error_base = len(self.codes), len(self.errors)
+        self.codes.extend(other.codes)
+        self.lexemes.extend(other.lexemes)
+        self.token_offsets.extend(offset + token_base for offset in other.token_offsets[1:])
+        self.errors.extend(other.errors)
+        self.error_offsets.extend(offset + error_base for offset in other.error_offsets[1:])
+
+
+def _lex_batch(sources: Sequence[str]) -> LexBatch:
+    """依次扫描各段源代码，token 追加到同一个列表，最后一次性拆成列（可在子进程中执行）"""
+    batch = LexBatch()
+    scanned: List[Tuple[int, str]] = []
+    raw_errors: List[Tuple[int, str, str]] = []
+    token_offsets, errors, error_offsets = batch.token_offsets, batch.errors, batch.error_offsets
+    for source_code in sources:
+        source_code = source_code.lstrip('\ufeff')
+        line_index = LineIndex(source_code) if '/*' in source_code else _NO_COMMENT_INDEX
+        _scan(source_code, 0, len(source_code), scanned, raw_errors, line_index)
+        if raw_errors:
+            line_index = LineIndex(source_code)
+            errors.extend(build_error(message, token, pos, line_index) for pos, message, token in raw_errors)
+            raw_errors.clear()
+        token_offsets.append(len(scanned))
+        error_offsets.append(len(errors))
+    batch.codes = array('H', [code for code, _ in scanned])
+    batch.lexemes = [lexeme for _, lexeme in scanned]
+    return batch
+
+
+def lex_many(sources: Sequence[str], executor: Optional[Executor] = None,
+             batch_size: int = 2000) -> LexBatch:
+    """
+    批量词法分析，每段源代码的 tokens 与错误信息都与 lexical_analysis 相同。
+
+    参数:
+        sources: 源代码字符串序列
+        executor: 若提供（如 ProcessPoolExecutor），按 batch_size 段一批分发后按原顺序合并
+        batch_size: 分发到进程池时每批的源代码段数
+    返回:
+        LexBatch
+    """
+    if executor is None or len(sources) <= batch_size:
+        return _lex_batch(sources)
+    result = LexBatch()
+    chunks = [sources[k:k + batch_size] for k in range(0, len(sources), batch_size)]
+    for batch in executor.map(_lex_batch, chunks):
+        result.extend(batch)
+    return result
@@ -0,0 +1,448 @@
+# dfa_lexer.py
+# 表驱动的 DFA 词法分析器：与 manual_lexer.lexical_analysis 输出完全一致的 (code, lexeme) 与错误信息，
+# 但状态转移表在模块导入时根据 keywords / operators / delimiter 一次性预计算，扫描时只做查表。
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Compilers.lexer.manual_lexer import (
+    keywords, operators, operator_chars, delimiter,
+    identifier_code, integer_code, float_code, string_code, char_code,
+    is_valid_hex, is_valid_octal, is_valid_float, is_valid_decimal, build_error,
+)
+from Compilers.lexer.line_index import LineIndex, TokenPositions
+from Compilers.lexer.token_spans import SpanTokens, CodeSink
+
+# ---------------- 字符类别 ----------------
+# ASCII 字符直接以字符本身作为转移表的列；非 ASCII 字符按 str 谓词归入以下 5 类，
+# 与手写词法分析器中 isdigit / isalpha / isalnum / isspace 的判断保持一致。
+NA_DIGIT, NA_ALPHA, NA_ALNUM, NA_SPACE, NA_OTHER = range(5)
+_NA_CLASS_CACHE: Dict[str, int] = {}
+
+
+def _na_class(ch: str) -> int:
+    """计算非 ASCII 字符的类别，并缓存结果"""
+    cls = _NA_CLASS_CACHE.get(ch)
+    if cls is None:
+        if ch.isdigit():
+            cls = NA_DIGIT
+        elif ch.isalpha():
+            cls = NA_ALPHA
+        elif ch.isalnum():
+            cls = NA_ALNUM
+        elif ch.isspace():
+            cls = NA_SPACE
+        else:
+            cls = NA_OTHER
+        _NA_CLASS_CACHE[ch] = cls
+    return cls
+
+
+_ASCII = [chr(o) for o in range(128)]
+_DIGITS = set('0123456789')
+_ALPHA = {c for c in _ASCII if c.isalpha()}
+_ALNUM = _ALPHA | _DIGITS
+_IDENT_CONT = _ALNUM | {'_'}
+_SPACE = {c for c in _ASCII if c.isspace() or ord(c) < 32}
+_HEX = _DIGITS | set('abcdefABCDEF')
+_NUM_RUN = _DIGITS | set('.eE+-')
+
+# ---------------- 接受动作 ----------------
+# A_WORD / A_OPERATOR / A_DELIM 直接输出 (code, lexeme)，编号连续以便一次比较完成分派
+(A_NONE, A_SKIP, A_WORD, A_OPERATOR, A_DELIM, A_DEC, A_DEC_BAD, A_HEX, A_HEX_EMPTY, A_HEX_BAD,
+ A_OP_RUN3, A_CHAR, A_STRING, A_BLOCK_COMMENT, A_LINE_COMMENT) = range(15)
+
+
+class _DFABuilder:
+    """
+    构造扫描用的 DFA。每个状态包含：
+      rows[s]:     ASCII 字符 -> 下一状态（-1 表示死状态）
+      na_rows[s]:  非 ASCII 字符类别 -> 下一状态
+      actions[s]:  到达该状态时的接受动作（A_NONE 表示非接受状态）
+      codes[s]:    关键字 / 标识符 / 操作符状态对应的种别码
+    """
+
+    def __init__(self):
+        self.rows: List[Dict[str, int]] = []
+        self.na_rows: List[List[int]] = []
+        self.actions: List[int] = []
+        self.codes: List[int] = []
+
+    def new_state(self, action: int = A_NONE, code: int = 0) -> int:
+        self.rows.append({c: -1 for c in _ASCII})
+        self.na_rows.append([-1] * 5)
+        self.actions.append(action)
+        self.codes.append(code)
+        return len(self.rows) - 1
+
+    def on(self, src: int, chars, dst: int, na_classes=()):
+        row = self.rows[src]
+        for c in chars:
+            row[c] = dst
+        for cls in na_classes:
+            self.na_rows[src][cls] = dst
+
+    def on_missing(self, src: int, chars, dst: int, na_classes=()):
+        """只为尚未定义转移的字符添加转移（用于关键字前缀状态回落到普通标识符）"""
+        row = self.rows[src]
+        for c in chars:
+            if row[c] == -1:
+                row[c] = dst
+        for cls in na_classes:
+            if self.na_rows[src][cls] == -1:
+                self.na_rows[src][cls] = dst
+
+    def build(self):
+        start = self.new_state()
+
+        # 空白：空格、制表、换行以及所有控制字符
+        ws = self.new_state(A_SKIP)
+        self.on(start, _SPACE, ws, (NA_SPACE,))
+        self.on(ws, _SPACE, ws, (NA_SPACE,))
+
+        # 标识符与关键字：按 keywords 构造前缀树，偏离前缀树后进入普通标识符状态
+        ident = self.new_state(A_WORD, identifier_code)
+        ident_na = (NA_DIGIT, NA_ALPHA, NA_ALNUM)
+        self.on(ident, _IDENT_CONT, ident, ident_na)
+        trie: Dict[str, int] = {}
+        for word in sorted(keywords):
+            for k in range(1, len(word) + 1):
+                prefix = word[:k]
+                if prefix not in trie:
+                    trie[prefix] = self.new_state(A_WORD, keywords.get(prefix, identifier_code))
+                    parent = start if k == 1 else trie[prefix[:-1]]
+                    self.on(parent, prefix[-1], trie[prefix])
+        for state in trie.values():
+            self.on_missing(state, _IDENT_CONT, ident, ident_na)
+        self.on_missing(start, _ALPHA | {'_'}, ident, (NA_ALPHA,))
+
+        # 数字：十进制 / 浮点 / 八进制收集同一段 [0-9.eE+-]*，其后紧跟字母则整体非法
+        dec = self.new_state(A_DEC)
+        dec_bad = self.new_state(A_DEC_BAD)
+        zero = self.new_state(A_DEC)
+        self.on(start, _DIGITS - {'0'}, dec, (NA_DIGIT,))
+        self.on(start, '0', zero)
+        for s in (dec, zero):
+            self.on(s, _NUM_RUN, dec, (NA_DIGIT,))
+            self.on_missing(s, _ALPHA, dec_bad, (NA_ALPHA,))
+        self.on(dec_bad, _ALNUM, dec_bad, (NA_DIGIT, NA_ALPHA, NA_ALNUM))
+
+        # 十六进制：0x 之后收集十六进制数字，再遇到字母数字则整体非法
+        hex0 = self.new_state(A_HEX_EMPTY)
+        hexs = self.new_state(A_HEX)
+        hex_bad = self.new_state(A_HEX_BAD)
+        self.on(zero, 'xX', hex0)
+        for s in (hex0, hexs):
+            self.on(s, _HEX, hexs, (NA_DIGIT,))
+            self.on_missing(s, _ALNUM, hex_bad, (NA_ALPHA, NA_ALNUM))
+        self.on(hex_bad, _ALNUM, hex_bad, (NA_DIGIT, NA_ALPHA, NA_ALNUM))
+
+        # 操作符：连续操作符字符按前缀建状态，第三个操作符字符统一进入非法操作符状态
+        op_states: Dict[str, int] = {}
+        run3 = self.new_state(A_OP_RUN3)
+        for c1 in sorted(operator_chars):
+            op_states[c1] = self.new_state(A_OPERATOR if c1 in operators else A_NONE, operators.get(c1, 0))
+            self.on(start, c1, op_states[c1])
+        for c1 in sorted(operator_chars):
+            for c2 in sorted(operator_chars):
+                seq = c1 + c2
+                op_states[seq] = self.new_state(A_OPERATOR if seq in operators else A_NONE, operators.get(seq, 0))
+                self.on(op_states[c1], c2, op_states[seq])
+                self.on(op_states[seq], operator_chars, run3)
+
+        # 注释：仅当 '/' 位于单词开头时，'/*' 与 '//' 优先于操作符
+        self.on(op_states['/'], '*', self.new_state(A_BLOCK_COMMENT))
+        self.on(op_states['/'], '/', self.new_state(A_LINE_COMMENT))
+
+        # 字符 / 字符串字面量与其余分隔符
+        self.on(start, "'", self.new_state(A_CHAR))
+        self.on(start, '"', self.new_state(A_STRING))
+        for c in delimiter:
+            if c not in ("'", '"'):
+                self.on(start, c, self.new_state(A_DELIM, delimiter[c]))
+        return self
+
+
+def _build_skippers(rows: List[Dict[str, int]]) -> List[Optional[Callable]]:
+    """
+    为带自环的状态（空白、标识符、数字等）预编译 ASCII 自环字符集的匹配函数，
+    扫描时整段跳过自环字符，遇到非 ASCII 字符再回到逐字符查表，结果与逐字符转移相同。
+    """
+    skippers: List[Optional[Callable]] = []
+    for state, row in enumerate(rows):
+        loop = sorted(c for c, nxt in row.items() if nxt == state)
+        if len(loop) > 1:
+            skippers.append(re.compile('[' + ''.join(re.escape(c) for c in loop) + ']+').match)
+        else:
+            skippers.append(None)
+    return skippers
+
+
+_DFA = _DFABuilder().build()
+ROWS: Tuple[Dict[str, int], ...] = tuple(_DFA.rows)
+NA_ROWS: Tuple[List[int], ...] = tuple(_DFA.na_rows)
+ACTIONS: Tuple[int, ...] = tuple(_DFA.actions)
+STATE_CODES: Tuple[int, ...] = tuple(_DFA.codes)
+SKIPPERS: Tuple[Optional[Callable], ...] = tuple(_build_skippers(_DFA.rows))
+# 没有任何出边的状态（分隔符、注释/字面量入口等），到达后无需再读下一个字符
+TERMINAL: Tuple[bool, ...] = tuple(
+    all(nxt < 0 for nxt in row.values()) and all(nxt < 0 for nxt in na_row)
+    for row, na_row in zip(_DFA.rows, _DFA.na_rows)
+)
+_STRING_BODY = re.compile(r'[^"\\\n]+').match
+
+# 文件末尾的未闭合注释报告的第二条错误 (消息, 单词)；其前一条的 "起始于第N行" 依赖之前吞掉的换行数
+UNCLOSED_COMMENT = ("多行注释未闭合", "/*")
+
+
+def _scan(source_code: str, i: int, n: int,
+          tokens: List[Tuple[int, str]], errors: List[Tuple[int, str, str]],
+          line_index: LineIndex, swallowed: int = 0,
+          positions: Optional[TokenPositions] = None, final: bool = True) -> Tuple[int, int]:
+    """
+    从 i 扫描到 n，把 (code, lexeme) 追加到 tokens，把 (pos, message, token) 追加到 errors。
+    每个单词按最长匹配推进 DFA，并回退到最后一个接受状态（只有操作符会真正回退）。
+
+    swallowed 记录被字符/字符串字面量吞掉的换行数：手写版本在这些位置不更新行号，
+    "多行注释未闭合（起始于第N行）" 中的 N 因此会少算，这里同样扣除以保持输出一致。
+    positions 不为空时同步记录每个 token 的起止偏移量。
+    tokens 为 CodeSink 时只记录种别码：标识符、关键字、操作符与分隔符的种别码由接受状态直接给出，
+    不切出词素也不构造元组；数字仍需切出文本以校验格式，字面量与错误 token 照常经 CodeSink.append。
+    final 为 False 表示 n 之后还有未读入的输入（流式分块扫描）：凡是可能延续到 n 之后的单词
+    （标识符/数字/操作符前缀、未闭合的字符串与注释、不完整的字符字面量）都不产生，
+    扫描停在该单词的起点，由调用者补齐下一块后从这里继续。
+    返回 (停止位置, swallowed)。
+    """
+    rows, na_rows, actions, state_codes, skippers, terminal = ROWS, NA_ROWS, ACTIONS, STATE_CODES, SKIPPERS, TERMINAL
+    string_body = _STRING_BODY
+    append = tokens.append
+    codes = tokens.codes if isinstance(tokens, CodeSink) else None
+    append_code = codes.append if codes is not None else None
+    # len(counted) 即已产生的 token 数；CodeSink 直接数种别码数组，避免每轮调用 Python 层的 __len__
+    counted = codes if codes is not None else tokens
+    recording = positions is not None
+    if recording:
+        starts_append, ends_append = positions.starts.append, positions.ends.append
+        recorded = len(positions.starts)
+    row0, na_row0 = rows[0], na_rows[0]
+    token_start = i
+    while i < n:
+        # 每轮至多产生一个 token，上一轮新增的 token 范围即 [token_start, i)
+        if recording and len(counted) > recorded:
+            starts_append(token_start)
+            ends_append(i)
+            recorded += 1
+        token_start = i
+        # 首字符单独查表：分隔符等终结状态无需进入逐字符循环
+        ch = source_code[i]
+        state = row0.get(ch)
+        if state is None:
+            state = na_row0[_na_class(ch)]
+        j = i + 1
+        if state < 0:
+            acc = 0
+        elif terminal[state]:
+            acc = state
+            acc_pos = j
+        else:
+            skip = skippers[state]
+            if skip is not None:
+                m = skip(source_code, j, n)
+                if m is not None:
+                    j = m.end()
+            if actions[state]:
+                acc = state
+                acc_pos = j
+            else:
+                acc = 0
+            row = rows[state]
+            while j < n:
+                ch = source_code[j]
+                nxt = row.get(ch)
+                if nxt is None:
+                    nxt = na_rows[state][_na_class(ch)]
+                if nxt < 0:
+                    break
+                state = nxt
+                row = rows[nxt]
+                j += 1
+                skip = skippers[nxt]
+                if skip is not None:
+                    m = skip(source_code, j, n)
+                    if m is not None:
+                        j = m.end()
+                if actions[nxt]:
+                    acc = nxt
+                    acc_pos = j
+                if terminal[nxt]:
+                    break
+            if not final and j >= n and not terminal[state] and actions[state] != A_SKIP:
+                # 读到缓冲区末尾仍未进入死状态：单词可能延续到下一块
+                break
+        action = actions[acc]
+
+        if action == A_SKIP:
+            i = acc_pos
+        elif action <= A_DELIM and action:
+            if append_code is not None:
+                append_code(state_codes[acc])
+            else:
+                append((state_codes[acc], source_code[i:acc_pos]))
+            i = acc_pos
+        elif action == A_DEC:
+            num_str = source_code[i:acc_pos]
+            error_msg = ''
+            if num_str.startswith('0') and num_str != '0' and '.' not in num_str and 'e' not in num_str.lower():
+                if not is_valid_octal(num_str):
+                    error_msg = "非法的八进制数"
+                code = integer_code
+            elif '.' in num_str or 'e' in num_str.lower():
+                if not is_valid_float(num_str):
+                    error_msg = "浮点数格式不完整或无效"
+                code = float_code
+            else:
+                if not is_valid_decimal(num_str):
+                    error_msg = "十进制数字无效"
+                code = integer_code
+            if error_msg:
+                errors.append((i, error_msg, num_str))
+                code = 0
+            if append_code is not None:
+                append_code(code)
+            else:
+                append((code, num_str))
+            i = acc_pos
+        elif action == A_HEX:
+            num_str = source_code[i:acc_pos]
+            if is_valid_hex(num_str):
+                append((integer_code, num_str))
+            else:
+                errors.append((i, "非法的十六进制数字", num_str))
+                append((0, num_str))
+            i = acc_pos
+        elif action == A_DEC_BAD or action == A_HEX_BAD or action == A_HEX_EMPTY:
+            num_str = source_code[i:acc_pos]
+            if action == A_DEC_BAD:
+                errors.append((i, "数字格式无效", num_str))
+            elif action == A_HEX_BAD:
+                errors.append((i, "十六进制字面量无效", num_str))
+            else:
+                errors.append((i, "缺少十六进制数字", num_str))
+            append((0, num_str))
+            i = acc_pos
+        elif action == A_OP_RUN3:
+            seq3 = source_code[i:acc_pos]
+            errors.append((i, "非法操作符", seq3))
+            append((0, seq3))
+            i = acc_pos
+        elif action == A_LINE_COMMENT:
+            end = source_code.find('\n', acc_pos, n)
+            if end < 0 and not final:
+                break
+            i = n if end < 0 else end
+        elif action == A_BLOCK_COMMENT:
+            end = source_code.find('*/', acc_pos, n)
+            if end < 0 and not final:
+                break
+            if end < 0:
+                # 与手写版本一致：未闭合注释先按起始行报一次，扫描结束时再报一次
+                line = line_index.line_of(i) - swallowed
+                errors.append((i, f"多行注释未闭合（起始于第{line}行）", "/*"))
+                errors.append((i,) + UNCLOSED_COMMENT)
+                i = n
+            else:
+                i = end + 2
+        elif action == A_CHAR:
+            if not final and i + 3 >= n:
+                break
+            start = i
+            i += 1
+            char_content = ''
+            if i < n and source_code[i] == '\\':
+                if i + 1 < n:
+                    char_content = source_code[i:i + 2]
+                    i += 2
+            elif i < n:
+                char_content = source_code[i]
+                i += 1
+            if '\n' in char_content:
+                swallowed += 1
+            if i < n and source_code[i] == "'":
+                i += 1
+                append((char_code, f"'{char_content}'"))
+            else:
+                errors.append((start, "字符字面量未闭合或格式错误", source_code[start:i]))
+                append((0, source_code[start:i]))
+        elif action == A_STRING:
+            # 与手写版本一致：词素从左引号后一位开始，且该位字符不参与闭合判断
+            start = i + 1
+            i += 2
+            is_closed = False
+            while i < n:
+                m = string_body(source_code, i, n)
+                if m is not None:
+                    i = m.end()
+                    if i >= n:
+                        break
+                ch = source_code[i]
+                if ch == '\n':
+                    errors.append((start, "字符串未闭合", source_code[start:i]))
+                    break
+                if ch == '"':
+                    is_closed = True
+                    i += 1
+                    break
+                i += 2 if ch == '\\' else 1
+            if not is_closed and not final and i >= n:
+                i = token_start
+                break
+            if not is_closed:
+                errors.append((start, "字符串未闭合", source_code[start:i]))
+            swallowed += source_code.count('\n', start, i)
+            append((string_code, source_code[start:i]))
+        else:
+            # 无接受状态：未识别的符号（包括单独的 '|' 等非法操作符字符）
+            ch = source_code[i]
+            errors.append((i, "未识别的符号", ch))
+            append((0, ch))
+            i += 1
+    if recording and len(counted) > recorded:
+        starts_append(token_start)
+        ends_append(min(i, n))
+    return i, swallowed
+
+
+def dfa_lexical_analysis(source_code: str, with_positions: bool = False, spans: bool = False):
+    """
+    表驱动 DFA 版本的词法分析，返回值与 manual_lexer.lexical_analysis 完全相同。
+
+    参数:
+        source_code: 源代码字符串
+        with_positions: 为 True 时额外返回 TokenPositions
+        spans: 为 True 时 tokens 为 SpanTokens，只保存种别码与源代码区间，词素按需切出
+               （其 positions 属性即 TokenPositions，此时不再单独返回）
+    返回:
+        tokens: [(种别码, 词素)] 或 SpanTokens
+        errors: 错误信息字符串列表（形如 '第N行：消息 "单词"'）
+        positions: 仅当 with_positions 为 True 且 spans 为 False 时返回
+    """
+    source_code = source_code.lstrip('\ufeff')
+    raw_errors: List[Tuple[int, str, str]] = []
+    line_index = LineIndex(source_code)
+    if spans:
+        sink = CodeSink()
+        positions = TokenPositions(line_index)
+        _scan(source_code, 0, len(source_code), sink, raw_errors, line_index, positions=positions)
+        errors = [build_error(message, token, pos, line_index) for pos, message, token in raw_errors]
+        return SpanTokens(source_code, positions, sink.codes), errors
+    tokens: List[Tuple[int, str]] = []
+    positions = TokenPositions(line_index) if with_positions else None
+    _scan(source_code, 0, len(source_code), tokens, raw_errors, line_index, positions=positions)
+    errors = [build_error(message, token, pos, line_index) for pos, message, token in raw_errors]
+    if positions is not None:
+        return tokens, errors, positions
+    return tokens, errors
+
+
+if __name__ == '__main__':
+    src = 'int x = 0x1F; /* c */ y >== 3.5e2;'
+    print(dfa_lexical_analysis(src))
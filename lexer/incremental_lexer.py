@@ -0,0 +1,167 @@
+# incremental_lexer.py
+# 增量词法分析：编辑器中每次修改只重新扫描受影响的区域。
+# 从修改点之前最近的安全 token 边界重新开始扫描，新 token 与旧 token 在修改点之后重新对齐即停止，
+# 其余 token 直接复用（偏移量整体平移）。结果与对修改后的全文调用 lexical_analysis 完全相同。
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+from Compilers.lexer.manual_lexer import build_error
+from Compilers.lexer.dfa_lexer import _scan, UNCLOSED_COMMENT
+from Compilers.lexer.line_index import LineIndex, TokenPositions
+
+# 扫描一个 token 时至多读入词尾之后的 _LOOKAHEAD 个字符（如 '&<' 需看到其后的字符才能确定 '&' 单独成词，
+# 而 '&<|' 为一个非法操作符）；重新扫描从词尾不晚于 修改点 - _LOOKAHEAD - 1 的 token 之后开始，
+# 多留 1 个字符的余量，恰好处在边界上的 token 也一并重新扫描
+_LOOKAHEAD = 2
+# 第一次在修改点之后多扫描的长度，未能对齐时按倍数扩大
+_RESYNC_WINDOW = 256
+
+
+def _swallowed_newlines(tokens: List[Tuple[int, str]]) -> int:
+    """字符/字符串字面量吞掉的换行数：其他 token 的词素都不含换行"""
+    return sum(lexeme.count('\n') for _, lexeme in tokens)
+
+
+class LexedSource:
+    """
+    一次词法分析的完整结果，可据此增量地得到修改后源代码的结果。
+
+    tokens / positions 与 lexical_analysis(source, with_positions=True) 的前后两项相同，
+    错误信息以 (偏移量, 消息, 单词) 保存，读取 errors 时才按当前的行号索引生成，
+    因此修改点之后的错误不需要逐条改写行号。
+    source 为去掉开头 BOM 之后的源代码，edit 的偏移量均相对于它。
+    """
+    __slots__ = ('source', 'tokens', 'positions', 'raw_errors', 'swallowed')
+
+    def __init__(self, source: str, tokens: List[Tuple[int, str]], positions: TokenPositions,
+                 raw_errors: List[Tuple[int, str, str]], swallowed: int):
+        self.source = source
+        self.tokens = tokens
+        self.positions = positions
+        self.raw_errors = raw_errors
+        self.swallowed = swallowed  # 全文被字符/字符串字面量吞掉的换行数（见 dfa_lexer._scan）
+
+    @classmethod
+    def from_source(cls, source_code: str) -> 'LexedSource':
+        """对整个源代码做一次完整的词法分析"""
+        source_code = source_code.lstrip('\ufeff')
+        tokens: List[Tuple[int, str]] = []
+        raw_errors: List[Tuple[int, str, str]] = []
+        line_index = LineIndex(source_code)
+        positions = TokenPositions(line_index)
+        _, swallowed = _scan(source_code, 0, len(source_code), tokens, raw_errors, line_index,
+                             positions=positions)
+        return cls(source_code, tokens, positions, raw_errors, swallowed)
+
+    @property
+    def errors(self) -> List[str]:
+        """错误信息字符串列表，格式同 lexical_analysis"""
+        line_index = self.positions.line_index
+        return [build_error(message, token, pos, line_index) for pos, message, token in self.raw_errors]
+
+    def edit(self, start: int, old_len: int, new_text: str) -> 'LexedSource':
+        """
+        把 source[start:start + old_len] 替换为 new_text，返回修改后源代码的词法分析结果。
+
+        重新扫描从修改点之前最后一个不受影响的 token 之后开始，
+        一旦某个新 token 的起点位于修改区域之后、且恰好是某个旧 token 的起点（按长度差平移），
+        两者之后的扫描必然相同，剩余的旧 token 与错误信息直接平移复用。
+
+        参数:
+            start: 修改的起始偏移量
+            old_len: 被替换的原文长度
+            new_text: 替换后的文本
+        返回:
+            新的 LexedSource（self 不被修改）
+        """
+        old_source = self.source
+        if start < 0 or old_len < 0 or start + old_len > len(old_source):
+            raise ValueError(f"修改区域越界: start={start}, old_len={old_len}, 源代码长度={len(old_source)}")
+        source = old_source[:start] + new_text + old_source[start + old_len:]
+        if source.startswith('\ufeff'):
+            # 开头插入了 BOM：lexical_analysis 会先去掉它，偏移量整体改变，直接重新分析
+            return LexedSource.from_source(source)
+
+        delta = len(new_text) - old_len
+        edit_end = start + len(new_text)
+        old_tokens = self.tokens
+        old_starts, old_ends = self.positions.starts, self.positions.ends
+
+        # 词尾距修改点超过 _LOOKAHEAD 的 token 不受影响，从最后一个这样的 token 之后开始
+        k0 = bisect_right(old_ends, start - _LOOKAHEAD - 1)
+        restart = old_ends[k0 - 1] if k0 else 0
+
+        n = len(source)
+        line_index = LineIndex(source)
+        window = TokenPositions(line_index)
+        tokens: List[Tuple[int, str]] = []
+        raw_errors: List[Tuple[int, str, str]] = []
+        i, swallowed = restart, 0
+        limit = min(n, edit_end + _RESYNC_WINDOW)
+        k1 = len(old_tokens)   # 被替换的旧 token 为 [k0, k1)
+        resync = -1            # 与旧 token 对齐的新 token 下标
+        checked = 0
+        while True:
+            final = limit >= n
+            i, swallowed = _scan(source, i, limit, tokens, raw_errors, line_index, swallowed, window, final)
+            for t in range(checked, len(window.starts)):
+                p = window.starts[t]
+                if p < edit_end:
+                    continue
+                k = bisect_left(old_starts, p - delta, k0)
+                if k < len(old_starts) and old_starts[k] == p - delta:
+                    resync, k1 = t, k
+                    break
+            if resync >= 0 or final:
+                break
+            checked = len(window.starts)
+            limit = min(n, limit + (limit - restart))
+
+        old_errors = self.raw_errors
+        head_errors = [e for e in old_errors if e[0] < restart]
+        tail_errors = []
+        if resync >= 0:
+            p = window.starts[resync]
+            del tokens[resync:], window.starts[resync:], window.ends[resync:]
+            raw_errors = [e for e in raw_errors if e[0] < p]
+            tail_errors = [(pos + delta, message, token) for pos, message, token in old_errors
+                           if pos >= p - delta]
+
+        total_swallowed = self.swallowed - _swallowed_newlines(old_tokens[k0:k1]) + _swallowed_newlines(tokens)
+        errors = head_errors + raw_errors + tail_errors
+        if errors and errors[-1][1:] == UNCLOSED_COMMENT:
+            # 文件末尾的未闭合注释："起始于第N行" 依赖其前面吞掉的换行数，按修改后的全文重新生成
+            comment_pos = errors[-1][0]
+            del errors[-2:]
+            _scan(source, comment_pos, n, [], errors, line_index, total_swallowed)
+
+        starts = old_starts[:k0] + window.starts + array('I', [s + delta for s in old_starts[k1:]])
+        ends = old_ends[:k0] + window.ends + array('I', [e + delta for e in old_ends[k1:]])
+        return LexedSource(source, old_tokens[:k0] + tokens + old_tokens[k1:],
+                           TokenPositions(line_index, starts, ends), errors, total_swallowed)
+
+
+def edit_between(old: str, new: str) -> Tuple[int, int, str]:
+    """
+    求把 old 变为 new 的单处修改 (start, old_len, new_text)：去掉两者的公共前缀与公共后缀。
+    前后缀长度按二分查找确定，每次比较都是一次切片比较。
+    """
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix = lo
+    return prefix, len(old) - prefix - suffix, new[prefix:len(new) - suffix]
@@ -0,0 +1,91 @@
+# line_index.py
+# 源代码行号索引：记录每个换行符的偏移量，之后任意偏移量 -> (行, 列) 只需一次二分查找。
+# TokenPositions 则以平行数组的形式记录每个 token 的起止偏移量。
+from array import array
+from bisect import bisect_left
+from typing import Tuple
+
+
+class LineIndex:
+    """
+    换行偏移索引。
+
+    首次查询时扫描一遍源代码，把所有 '\\n' 的偏移量存入有序的 array('I')，
+    之后每次查询都是 O(log n) 的二分查找，替代逐次 source.count('\\n', 0, pos)。
+    行号与列号均从 1 开始，与词法错误信息 "第N行" 保持一致。
+    source 只是更长输入中的一段（如流式分块）时，first_line 给出 source[0] 所在的行号。
+    """
+
+    def __init__(self, source: str, first_line: int = 1):
+        self.source = source
+        self.first_line = first_line
+        self._newlines = None
+
+    @property
+    def newlines(self) -> array:
+        """所有换行符的偏移量（升序），首次访问时构建"""
+        if self._newlines is None:
+            offsets = array('I')
+            find = self.source.find
+            pos = find('\n')
+            while pos >= 0:
+                offsets.append(pos)
+                pos = find('\n', pos + 1)
+            self._newlines = offsets
+        return self._newlines
+
+    def line_of(self, pos: int) -> int:
+        """返回偏移量 pos 所在的行号（等价于 source.count('\\n', 0, pos) + 1）"""
+        return bisect_left(self.newlines, pos) + self.first_line
+
+    def line_col(self, pos: int) -> Tuple[int, int]:
+        """返回偏移量 pos 对应的 (行号, 列号)"""
+        newlines = self.newlines
+        k = bisect_left(newlines, pos)
+        line_start = newlines[k - 1] + 1 if k else 0
+        return k + self.first_line, pos - line_start + 1
+
+    def offset_of(self, line: int, col: int = 1) -> int:
+        """(行号, 列号) -> 偏移量，是 line_col 的逆运算"""
+        line -= self.first_line
+        if line <= 0:
+            return col - 1
+        return self.newlines[line - 1] + col
+
+    def line_count(self) -> int:
+        """源代码总行数"""
+        return len(self.newlines) + 1
+
+    def __repr__(self):
+        return f"LineIndex(lines={self.line_count()})"
+
+
+class TokenPositions:
+    """
+    与 token 列表平行的位置信息：starts[k] / ends[k] 为第 k 个 token 在源代码中的起止偏移量。
+    两个 array('I') 代替逐 token 的位置对象，内存占用与 token 数成正比且不产生额外 Python 对象。
+    """
+    __slots__ = ('starts', 'ends', 'line_index')
+
+    def __init__(self, line_index: LineIndex, starts: array = None, ends: array = None):
+        self.line_index = line_index
+        self.starts = starts if starts is not None else array('I')
+        self.ends = ends if ends is not None else array('I')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def offset(self, k: int) -> int:
+        """第 k 个 token 的起始偏移量；k 越界（如结束符 '$'）时返回最后一个 token 的结束位置"""
+        if k < len(self.starts):
+            return self.starts[k]
+        return self.ends[-1] if self.ends else 0
+
+    def line_col(self, k: int) -> Tuple[int, int]:
+        """第 k 个 token 的 (行号, 列号)"""
+        return self.line_index.line_col(self.offset(k))
+
+    def describe(self, k: int) -> str:
+        """用于错误信息的位置描述，如 'line 3, column 7'"""
+        line, col = self.line_col(k)
+        return f"line {line}, column {col}"
@@ -1,39 +1,20 @@
 # manual_lexer.py 数字合法性校验函数（不使用正则表达式）
-from typing import List, Dict, Set,Tuple
-# 定义关键字及其对应的编码
-# keywords = {
-#     'int': 1, 'float': 2, 'double': 3, 'char': 4, 'if': 5,
-#     'else': 6, 'while': 7, 'for': 8, 'return': 9, 'void': 10,
-#     'string': 11, 'bool': 12, 'true': 13, 'false': 14, 'main': 15,
-#     'include': 16
-# }
-keywords = {
-    'int': 1, 'float': 2, 'double': 3, 'char': 4, 'if': 5,
-    'else': 6, 'while': 7, 'for': 8, 'return': 9, 'void': 10,
-    'string': 11, 'bool': 12, 'true': 13, 'false': 14,
-    'include': 16, 'read': 17, 'write': 18
-}
-
-# 定义操作符及其对应的编码
-operators = {
-    '=': 20, '+': 21, '-': 22, '*': 23, '/': 24, '%': 25,
-    '==': 26, '!=': 27, '<': 28, '>': 29, '<=': 30, '>=': 31,
-    '<<': 32, '>>': 33, '&&': 34, '||': 35,
-    '+=': 36, '-=': 37, '*=': 38, '/=': 39, '%=': 40,
-    '++': 41, '--': 42, '!': 43, '&': 44
-}
-operator_chars = set(''.join(operators.keys()))
+import codecs
+from itertools import chain
+from typing import List, Dict, Set,Tuple, Iterator, Optional
+
+from Compilers.lexer.line_index import LineIndex, TokenPositions
+from Compilers.lexer.keywords import KeywordTable
+from Compilers.lexer.token_kinds import (
+    keywords, operators, delimiter,
+    identifier_code, integer_code, float_code, string_code, char_code,
+    TOKEN_NAME, TERMINALS, CODE_TO_TERMINAL,
+)
 
-delimiter = {
-    '(': 50, ')': 51, '[': 52, ']': 53, '{': 54, '}': 55,
-    '.': 56, ',': 57, ';': 58, "'": 59, '#': 60, '?': 61, '"': 62,':':63
-}
+# 关键字识别表：手写词法分析只识别 keywords 中的关键字
+KEYWORD_TABLE = KeywordTable(keywords)
 
-identifier_code = 45
-integer_code = 46
-float_code = 47
-string_code = 48
-char_code = 49
+operator_chars = set(''.join(operators.keys()))
 
 def is_valid_integer(num: str) -> bool:
     """
@@ -144,16 +125,33 @@ def is_valid_float(num: str) -> bool:
 
     return True
 
-def build_error(message: str, token: str, pos: int, source_code: str) -> str:
-    line = source_code.count('\n', 0, pos) + 1
+def build_error(message: str, token: str, pos: int, line_index: LineIndex) -> str:
+    """
+    构造形如 '第N行：消息 "单词"' 的错误信息。
+    行号通过 line_index 二分查找得到，同一次分析中的所有错误共用一个索引。
+    """
+    line = line_index.line_of(pos)
     return f'第{line}行：{message} "{token}"'
 
-def lexical_analysis(source_code: str):
+def lexical_analysis(source_code: str, with_positions: bool = False):
+    """
+    手写词法分析。
+
+    参数:
+        source_code: 源代码字符串
+        with_positions: 为 True 时额外返回 TokenPositions（每个 token 的起止偏移量）
+    返回:
+        (tokens, errors) 或 (tokens, errors, positions)
+    """
     tokens = []
     errors = []
     line_number = 1  # 当前处理的行号，用于错误定位
     source_code = source_code.lstrip('\ufeff')
-
+    # 换行偏移索引：首次报错时才真正构建，之后每条错误 O(log n) 定位行号
+    line_index = LineIndex(source_code)
+    positions = TokenPositions(line_index) if with_positions else None
+    token_start = 0  # 本轮循环开始时的位置，即本轮产生的 token 的起点
+    keyword_code = KEYWORD_TABLE.get
 
 
     i = 0  # 当前处理的字符索引
@@ -161,6 +159,12 @@ def lexical_analysis(source_code: str):
     comment_start_pos = 0  # 多行注释开始的位置，用于错误定位
 
     while i < len(source_code):
+        # 每轮循环至多产生一个 token，且产生后立即 continue，
+        # 所以上一轮若新增了 token，其范围就是 [token_start, i)
+        if positions is not None and len(tokens) > len(positions.starts):
+            positions.starts.append(token_start)
+            positions.ends.append(i)
+        token_start = i
         char = source_code[i]
 
         # 处理空白字符（包括空格、制表符、换行符等）
@@ -193,7 +197,7 @@ def lexical_analysis(source_code: str):
             if not comment_closed:
                 # 如果注释未正确闭合，记录错误信息
                 errors.append(build_error(f"多行注释未闭合（起始于第{comment_start_line}行）", "/*", comment_start_pos,
-                                          source_code))
+                                          line_index))
             continue  # 完成注释处理后，跳过后续分析逻辑
 
         # 检测并处理单行注释（以 // 开始，直到行尾）
@@ -230,7 +234,7 @@ def lexical_analysis(source_code: str):
                     continue  # 继续处理下一个字符
                 else:
                     # 如果没有闭合的单引号，记录错误
-                    errors.append(build_error("字符字面量未闭合或格式错误", source_code[start:i], start, source_code))
+                    errors.append(build_error("字符字面量未闭合或格式错误", source_code[start:i], start, line_index))
                     tokens.append((0, source_code[start:i]))  # 添加错误的字面量到 tokens
                     continue  # 继续处理下一个字符
 
@@ -260,7 +264,7 @@ def lexical_analysis(source_code: str):
                     else:
                         # 未匹配到结束单引号，记录错误
                         errors.append(
-                            build_error("字符字面量未闭合或格式错误", source_code[start:i], start, source_code))
+                            build_error("字符字面量未闭合或格式错误", source_code[start:i], start, line_index))
                         tokens.append((0, source_code[start:i]))
                         continue
 
@@ -269,7 +273,7 @@ def lexical_analysis(source_code: str):
                 while i < len(source_code):
                     if source_code[i] == '\n':
                         # 遇到换行符，说明字符串未闭合，记录错误
-                        errors.append(build_error("字符串未闭合", source_code[start:i], start, source_code))
+                        errors.append(build_error("字符串未闭合", source_code[start:i], start, line_index))
                         break
                     if source_code[i] == quote:
                         # 成功匹配到结束引号，标记为已闭合
@@ -284,34 +288,31 @@ def lexical_analysis(source_code: str):
                         i += 1
                 if not is_closed:
                     # 如果字符串未闭合，记录错误
-                    errors.append(build_error("字符串未闭合", source_code[start:i], start, source_code))
+                    errors.append(build_error("字符串未闭合", source_code[start:i], start, line_index))
                 # 无论字符串是否闭合，都将其添加到 tokens 中
                 tokens.append((string_code, source_code[start:i]))
                 continue
 
         # 数字的处理逻辑
         if char.isdigit():  # 如果当前字符是数字
-            start = i  # 记录数字的起始位置
-            num_str = ''  # 用来存储数字字符串
+            start = i  # 记录数字的起始位置，数字字符串即 source_code[start:i]，扫描时只移动下标
             # 标记数字的类型
             is_hex = is_oct = is_float = is_invalid = False  # 初始化各种数字类型的标记
             error_msg = ''  # 错误信息初始化
 
             # 检查是否为十六进制数字（以 '0x' 开头）
             if source_code[i:i + 2].lower() == '0x':  # 如果当前字符和接下来的字符是 '0x' 或 '0X'，表示十六进制
-                num_str += source_code[i:i + 2]  # 将 '0x' 加入数字字符串
                 i += 2  # 跳过 '0x'
                 hex_start = i  # 记录十六进制数字的起始位置
 
                 # 收集十六进制数字（包括 '0-9' 和 'a-f' 字符）
                 while i < len(source_code) and (source_code[i].isdigit() or source_code[i].lower() in 'abcdef'):
-                    num_str += source_code[i]
                     i += 1
+                num_str = source_code[start:i]
 
                 # 检查十六进制字面量是否有效
                 if i < len(source_code) and source_code[i].isalnum():  # 如果数字后面跟有字母或其他数字（无效字符）
                     while i < len(source_code) and source_code[i].isalnum():
-                        num_str += source_code[i]
                         i += 1
                     is_invalid = True  # 标记为无效
                     error_msg = "十六进制字面量无效"  # 设置错误信息
@@ -328,13 +329,12 @@ def lexical_analysis(source_code: str):
                 # 浮点数1.收集数字部分
                 while i < len(source_code) and (
                         source_code[i].isdigit() or source_code[i] in ['.', 'e', 'E', '+', '-']):
-                    num_str += source_code[i]  # 收集数字部分
-                    i += 1
+                    i += 1  # 收集数字部分
+                num_str = source_code[start:i]
 
                 # 如果数字后面跟有字母，说明格式无效 如果数字后面紧接着字母字符，则认为是非法数字格式。
                 if i < len(source_code) and source_code[i].isalpha():
                     while i < len(source_code) and source_code[i].isalnum():
-                        num_str += source_code[i]
                         i += 1
                     is_invalid = True  # 标记为无效
                     error_msg = "数字格式无效"  # 设置错误信息
@@ -361,8 +361,9 @@ def lexical_analysis(source_code: str):
                     error_msg = "十进制数字无效"  # 提示十进制数字无效
 
             # 记录结果
+            num_str = source_code[start:i]
             if is_invalid:  # 如果数字无效，记录错误
-                errors.append(build_error(error_msg, num_str, start, source_code))  # 记录错误信息
+                errors.append(build_error(error_msg, num_str, start, line_index))  # 记录错误信息
                 tokens.append((0, num_str))  # 将无效的数字加入 token，0 表示无效 token
             elif is_hex or is_oct or not is_float:  # 如果是十六进制、八进制或者纯整数
                 tokens.append((integer_code, num_str))  # 将其标记为整数
@@ -379,12 +380,8 @@ def lexical_analysis(source_code: str):
                 # 向后遍历，只要是字母、数字或下划线，都是合法的标识符字符
                 i += 1
             token = source_code[start:i]  # 提取完整的标识符字符串
-            if token in keywords:
-                # 如果该字符串在关键字表中，则将其作为关键字记入
-                tokens.append((keywords[token], token))
-            else:
-                # 否则是普通标识符
-                tokens.append((identifier_code, token))
+            # 查一次关键字表：是关键字则记入其种别码，否则是普通标识符
+            tokens.append((keyword_code(token, identifier_code), token))
             continue  # 处理下一个字符
 
         # 操作符
@@ -395,7 +392,7 @@ def lexical_analysis(source_code: str):
                 seq3 = source_code[i:i + 3]  # 尝试获取三个字符组成的操作符
                 if seq3 not in operators and all(c in operator_chars for c in seq3):
                     # 如果不是合法的三字符操作符，但都是操作符字符组合，视为非法操作符
-                    errors.append(build_error("非法操作符", seq3, i, source_code))
+                    errors.append(build_error("非法操作符", seq3, i, line_index))
                     tokens.append((0, seq3))  # 0 代表错误标记
                     i += 3
                     continue
@@ -422,32 +419,154 @@ def lexical_analysis(source_code: str):
             continue
 
         # 未识别符号
-        errors.append(build_error("未识别的符号", char, i, source_code))
+        errors.append(build_error("未识别的符号", char, i, line_index))
         tokens.append((0, char))
         i += 1
 
     # 结束后检查多行注释是否闭合
     if in_multiline_comment:
-        errors.append(build_error("多行注释未闭合", "/*", comment_start_pos, source_code))
+        errors.append(build_error("多行注释未闭合", "/*", comment_start_pos, line_index))
 
+    if positions is not None:
+        if len(tokens) > len(positions.starts):
+            positions.starts.append(token_start)
+            positions.ends.append(min(i, len(source_code)))
+        return tokens, errors, positions
     return tokens, errors
 
-TOKEN_NAME = {
-    # 关键字: 保留原样
-    **{ v: k for k, v in keywords.items() },
-    # 操作符和分隔符: 保留符号本身
-    **{ v: k for k, v in operators.items() },
-    **{ v: k for k, v in delimiter.items() },
-    # 标识符、整型、浮点型字面量: 统一大写下划线风格
-    identifier_code: 'ID',
-    integer_code:   'INT_LITERAL',
-    float_code:     'FLOAT_LITERAL',
-    string_code:    'STRING_LITERAL',
-    char_code:      'CHAR_LITERAL',
-    # 确保分隔符被正确映射
-    50: '(',  # 左括号
-    51: ')',  # 右括号
-}
+def _read_chunks(readable, chunk_size: int) -> Iterator[str]:
+    """把文件对象（文本或二进制）或字符串块的可迭代对象统一成 str 块的迭代器"""
+    if hasattr(readable, 'read'):
+        def chunks():
+            while True:
+                chunk = readable.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        source = chunks()
+    else:
+        source = iter(readable)
+    decoder = None
+    for chunk in source:
+        if isinstance(chunk, (bytes, bytearray)):
+            # 二进制输入按 UTF-8 增量解码，多字节字符被块边界切开时留到下一块
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+def iter_tokens(readable, chunk_size: int = 1 << 16,
+                errors: Optional[List[str]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    流式词法分析：分块读入源代码，边读边产出 (code, lexeme)，不需要一次性持有整个文件。
+    产出的 token 序列与错误信息与 lexical_analysis 对整个文件的结果完全相同。
+
+    块与块之间携带的状态：
+      - 可能跨块的单词（标识符、数字、操作符前缀、未闭合的字符串/字符字面量、单行注释）
+        不在块尾产生，其起点之后的内容留在缓冲区与下一块拼接后重新扫描；
+        缓冲区中只剩这样一个单词时，读入的内容使缓冲区长度翻倍后才重新扫描，
+        跨越很多块的长单词（如 1 MB 的单行字符串）总的重扫长度与其长度成正比，而不是与块数的平方成正比；
+      - 未闭合的单行注释与多行注释都不保留注释体：单行注释只留下开头的 '//'，
+        多行注释只记住起始行对应的错误信息（仅保留可能与下一块组成 '*/' 的结尾 '*'），因此长注释不会占用内存；
+        缓冲区只需容纳最长的一个字符串、标识符或数字；
+      - 当前行号与被字符串/字符字面量吞掉的换行数，用于错误定位。
+
+    参数:
+        readable: 文件对象（read(n) 返回 str 或 UTF-8 bytes），或 str/bytes 块的可迭代对象
+        chunk_size: 每次从文件对象读取的长度
+        errors: 若提供，错误信息（格式同 lexical_analysis）按出现顺序追加到其中
+    返回:
+        (种别码, 词素) 的生成器
+    """
+    # 延迟导入：dfa_lexer 依赖本模块中的映射表与校验函数
+    from Compilers.lexer.dfa_lexer import _scan
+
+    buf = ''
+    held: List[str] = []  # 已读入、尚未拼进 buf 的块
+    held_len = 0
+    rescan_at = 0        # buf 与 held 的总长度达到此值时才重新扫描
+    first_line = 1       # buf[0] 所在的行号
+    swallowed = 0        # 被字符/字符串字面量吞掉的换行数（见 dfa_lexer._scan）
+    at_start = True      # 仍处于输入开头，需要去掉 BOM
+    comment_errors = None  # 处于未闭合的多行注释中时，为注释到达文件末尾时要报告的错误
+    for chunk in chain(_read_chunks(readable, chunk_size), (None,)):
+        final = chunk is None
+        if not final:
+            if at_start:
+                chunk = chunk.lstrip('\ufeff')
+                at_start = not chunk
+            held.append(chunk)
+            held_len += len(chunk)
+            if len(buf) + held_len < rescan_at:
+                continue
+        if held:
+            buf = ''.join([buf] + held)
+            held.clear()
+            held_len = 0
+        while True:
+            if comment_errors is not None:
+                end = buf.find('*/')
+                if end < 0:
+                    if final:
+                        if errors is not None:
+                            errors.extend(comment_errors)
+                        return
+                    cut = len(buf) - 1 if buf.endswith('*') else len(buf)
+                    first_line += buf.count('\n', 0, cut)
+                    buf = buf[cut:]
+                    rescan_at = 0
+                    break
+                first_line += buf.count('\n', 0, end + 2)
+                buf = buf[end + 2:]
+                comment_errors = None
+
+            tokens: List[Tuple[int, str]] = []
+            raw_errors: List[Tuple[int, str, str]] = []
+            line_index = LineIndex(buf, first_line)
+            stop, swallowed = _scan(buf, 0, len(buf), tokens, raw_errors, line_index, swallowed, final=final)
+            if errors is not None:
+                errors.extend(build_error(message, token, pos, line_index) for pos, message, token in raw_errors)
+            yield from tokens
+
+            cut = stop
+            if not final and buf.startswith('/*', stop):
+                # 注释尚未闭合：先按起始位置生成错误信息，闭合前都不再需要注释体
+                line = line_index.line_of(stop) - swallowed
+                comment_errors = [
+                    build_error(f"多行注释未闭合（起始于第{line}行）", "/*", stop, line_index),
+                    build_error("多行注释未闭合", "/*", stop, line_index),
+                ]
+                cut = stop + 2
+            first_line += buf.count('\n', 0, cut)
+            buf = buf[cut:]
+            if comment_errors is None:
+                if buf.startswith('//'):
+                    # 单行注释尚未结束：注释体不含换行，丢弃后不影响行号
+                    buf = '//'
+                rescan_at = 2 * len(buf)
+                break
+
+
+def token_terminal(code: int, lexeme: str) -> str:
+    """
+    单个 (code, lexeme) 对应的文法终结符：优先按种别码查表，查不到时按词素兜底。
+    缺失任何映射时抛出 KeyError。
+    """
+    if 0 <= code < len(CODE_TO_TERMINAL):
+        terminal = CODE_TO_TERMINAL[code]
+        if terminal is not None:
+            return terminal
+    terminal = TERMINALS.get(lexeme)
+    if terminal is not None:
+        return terminal
+    if lexeme == 'ε':
+        return 'ε'
+    raise KeyError(f"未映射的 token: code={code}, lexeme='{lexeme}'")
 
 
 def tokens_to_terminals(lexed_tokens: List[Tuple[int, str]]) -> List[str]:
@@ -455,42 +574,13 @@ def tokens_to_terminals(lexed_tokens: List[Tuple[int, str]]) -> List[str]:
     将 (code, lexeme) 列表转换为文法终结符列表，名称与 grammar 定义完全一致。
     缺失任何映射时抛出 KeyError。
     """
-    token_map = {
-        # 字面量类型
-        'INT_LITERAL': 'INT_LITERAL',
-        'FLOAT_LITERAL': 'FLOAT_LITERAL',
-        'STRING_LITERAL': 'STRING_LITERAL',
-        'CHAR_LITERAL': 'CHAR_LITERAL',
-        'ID': 'ID',
-        # 关键字（小写，与文法中一致）
-        'int': 'int', 'float': 'float', 'void': 'void',
-        'if': 'if', 'else': 'else', 'while': 'while', 'for': 'for', 'return': 'return', 'include': 'include',
-        'read': 'read', 'write': 'write',  # 添加read和write的映射
-        # 操作符 & 分隔符
-        '=': '=', '+': '+', '-': '-', '*': '*', '/': '/', '%': '%',
-        '==': '==', '!=': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>=',
-        '&&': '&&', '||': '||', '!': '!', '++': '++', '--': '--',
-        '(': '(', ')': ')', '{': '{', '}': '}', '[': '[', ']': ']',
-        ';': ';', ',': ',', '.': '.', '#': '#'
-    }
-
+    table = CODE_TO_TERMINAL
+    size = len(table)
     terminals: List[str] = []
+    append = terminals.append
     for code, lexeme in lexed_tokens:
-        # 1) code -> 名字
-        name = TOKEN_NAME.get(code)
-        if name and name in token_map:
-            terminals.append(token_map[name])
-            continue
-        # 2) lexeme 兜底
-        if lexeme in token_map:
-            terminals.append(token_map[lexeme])
-            continue
-        # 3) 特殊 ε
-        if lexeme == 'ε':
-            terminals.append('ε')
-            continue
-        # 4) 报错
-        raise KeyError(f"未映射的 token: code={code}, lexeme='{lexeme}'")
+        terminal = table[code] if 0 <= code < size else None
+        append(terminal if terminal is not None else token_terminal(code, lexeme))
     return terminals
 
 # 示例测试
@@ -0,0 +1,161 @@
+# parallel_lexer.py
+# 多进程词法分析：在注释与字符串之外的换行处把大文件切块，各块交给 ProcessPoolExecutor 扫描，
+# 再按顺序拼接 token 与错误信息（行号按块起始行重新定位），结果与 lexical_analysis 完全相同。
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from Compilers.lexer.manual_lexer import lexical_analysis, build_error
+from Compilers.lexer.dfa_lexer import _scan, UNCLOSED_COMMENT
+from Compilers.lexer.line_index import LineIndex
+
+# 预扫描只关心可能跨行的结构：多行/单行注释的开头与引号
+_SPECIAL = re.compile(r'/[*/]|["\']')
+# 字符串字面量：与词法分析一致，遇到未转义的换行即结束，反斜杠后的任意字符（含换行）被跳过
+_STRING = re.compile(r'"(?:[^"\\\n]|\\[\s\S])*+"?')
+# 小于该长度的块不值得单独交给子进程
+MIN_CHUNK = 1 << 16
+
+
+def _skip_special(source: str, m: re.Match) -> int:
+    """从预扫描命中的注释/字符串/字符开头跳到其结束位置"""
+    n = len(source)
+    kind = m.group()
+    if kind == '/*':
+        end = source.find('*/', m.end())
+        return n if end < 0 else end + 2
+    if kind == '//':
+        end = source.find('\n', m.end())
+        return n if end < 0 else end
+    if kind == '"':
+        return _STRING.match(source, m.start()).end()
+    # 字符字面量：引号后至多一个（转义）字符，再加可选的右引号
+    i = m.end()
+    if source.startswith('\\', i):
+        i += 2
+    elif i < n:
+        i += 1
+    if source.startswith("'", i):
+        i += 1
+    return min(i, n)
+
+
+def find_split_points(source: str, parts: int, min_chunk: int = MIN_CHUNK) -> List[int]:
+    """
+    把 source 大致均分为 parts 块，返回各块的起始偏移量（不含 0）。
+    每个切分点都紧跟在一个不属于注释、字符串或字符字面量的换行之后。
+
+    预扫描只识别 '/*'、'*/'、'//' 与引号，不做完整的词法分析，
+    少数特殊写法（如 '*/*' 被当作非法操作符）可能让切分点落在不安全的位置，
+    这种情况由 parallel_lexical_analysis 在合并时发现并回退为串行扫描，不影响结果。
+    """
+    n = len(source)
+    points: List[int] = []
+    pos = 0  # pos 之前的内容已经归类
+    for k in range(1, parts):
+        target = max(n * k // parts, pos, (points[-1] if points else 0) + min_chunk)
+        while True:
+            nl = source.find('\n', target if target > pos else pos, n - 1)
+            if nl < 0:
+                return points
+            m = _SPECIAL.search(source, pos, nl)
+            if m is None:
+                pos = nl + 1
+                points.append(pos)
+                break
+            pos = _skip_special(source, m)
+    return points
+
+
+def _lex_piece(piece: str, first_line: int, final: bool, swallowed: int = 0):
+    """
+    扫描一块源代码（在子进程中执行）。
+
+    参数:
+        piece: 块内容
+        first_line: piece[0] 所在的行号
+        final: 是否为最后一块；否则可能延续到块外的单词不产生，停在其起点
+        swallowed: 之前被字符/字符串字面量吞掉的换行数
+    返回:
+        (tokens, 原始错误 [(块内偏移, 消息, 单词)], 停止位置, swallowed)
+    """
+    tokens: List[Tuple[int, str]] = []
+    raw_errors: List[Tuple[int, str, str]] = []
+    stop, swallowed = _scan(piece, 0, len(piece), tokens, raw_errors,
+                            LineIndex(piece, first_line), swallowed, final=final)
+    return tokens, raw_errors, stop, swallowed
+
+
+def parallel_lexical_analysis(source_code: str, workers: Optional[int] = None,
+                              executor: Optional[Executor] = None, min_chunk: int = MIN_CHUNK):
+    """
+    多进程版本的词法分析，返回值与 lexical_analysis(source_code) 完全相同。
+
+    各块以"行首、不在注释/字符串中"为初始状态独立扫描，合并时逐块检查：
+    前一块必须恰好在块尾结束（最后的换行作为空白被跳过），后一块的结果才有效；
+    否则把前一块剩余的部分与后一块拼接后在本进程中重新扫描。
+
+    参数:
+        source_code: 源代码字符串
+        workers: 子进程数，默认为 CPU 核数
+        executor: 可复用的进程池；为 None 时临时创建
+        min_chunk: 每块的最小长度，源代码不足两块时直接串行分析
+    返回:
+        (tokens, errors)
+    """
+    source_code = source_code.lstrip('\ufeff')
+    workers = workers or os.cpu_count() or 1
+    points = []
+    if workers > 1 and len(source_code) >= 2 * min_chunk:
+        points = find_split_points(source_code, workers, min_chunk)
+    if not points:
+        return lexical_analysis(source_code)
+
+    bounds = [0] + points + [len(source_code)]
+    pieces = [source_code[bounds[k]:bounds[k + 1]] for k in range(len(bounds) - 1)]
+    first_lines = [1]
+    for k in range(1, len(pieces)):
+        first_lines.append(first_lines[-1] + pieces[k - 1].count('\n'))
+    last = len(pieces) - 1
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(_lex_piece, piece, first_lines[k], k == last)
+                   for k, piece in enumerate(pieces)]
+
+        tokens: List[Tuple[int, str]] = []
+        errors: List[str] = []
+        swallowed = 0
+        carry = ''          # 前一块未能在块内结束的部分
+        carry_line = 1      # carry[0] 所在的行号
+        for k, piece in enumerate(pieces):
+            final = k == last
+            if carry:
+                # 切分点不安全：丢弃这一块的并行结果，与剩余部分拼接后串行重扫
+                futures[k].cancel()
+                piece, first_line = carry + piece, carry_line
+                piece_tokens, raw_errors, stop, swallowed = _lex_piece(piece, first_line, final, swallowed)
+            else:
+                first_line = first_lines[k]
+                piece_tokens, raw_errors, stop, piece_swallowed = futures[k].result()
+                if swallowed and final and raw_errors and raw_errors[-1][1:] == UNCLOSED_COMMENT:
+                    # 文件末尾的未闭合注释："起始于第N行" 需要扣除之前各块吞掉的换行
+                    comment_pos = raw_errors[-2][0]
+                    del raw_errors[-2:]
+                    _scan(piece, comment_pos, len(piece), [], raw_errors, LineIndex(piece, first_line),
+                          swallowed + piece_swallowed)
+                swallowed += piece_swallowed
+
+            tokens.extend(piece_tokens)
+            if raw_errors:
+                line_index = LineIndex(piece, first_line)
+                errors.extend(build_error(message, token, pos, line_index) for pos, message, token in raw_errors)
+            carry = piece[stop:]
+            carry_line = first_line + piece.count('\n', 0, stop)
+        return tokens, errors
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
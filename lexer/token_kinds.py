@@ -0,0 +1,88 @@
+# token_kinds.py
+# 种别码登记表：手写、DFA 与自动词法分析共用同一套种别码，每个种别码只代表一种单词。
+# 语法分析按 CODE_TO_TERMINAL 由种别码直接得到文法终结符，任何一种词法分析的输出都无需转换。
+from typing import Dict, List, Optional
+
+# 关键字及其种别码
+keywords = {
+    'int': 1, 'float': 2, 'double': 3, 'char': 4, 'if': 5,
+    'else': 6, 'while': 7, 'for': 8, 'return': 9, 'void': 10,
+    'string': 11, 'bool': 12, 'true': 13, 'false': 14,
+    'include': 16, 'read': 17, 'write': 18
+}
+
+# 操作符及其种别码
+operators = {
+    '=': 20, '+': 21, '-': 22, '*': 23, '/': 24, '%': 25,
+    '==': 26, '!=': 27, '<': 28, '>': 29, '<=': 30, '>=': 31,
+    '<<': 32, '>>': 33, '&&': 34, '||': 35,
+    '+=': 36, '-=': 37, '*=': 38, '/=': 39, '%=': 40,
+    '++': 41, '--': 42, '!': 43, '&': 44
+}
+
+# 分隔符及其种别码
+delimiter = {
+    '(': 50, ')': 51, '[': 52, ']': 53, '{': 54, '}': 55,
+    '.': 56, ',': 57, ';': 58, "'": 59, '#': 60, '?': 61, '"': 62, ':': 63
+}
+
+identifier_code = 45
+integer_code = 46
+float_code = 47
+string_code = 48
+char_code = 49
+
+# 只有自动词法分析识别的单词类别，登记在以上种别码之后
+# 关键字：手写词法分析把它们当作标识符
+extra_keywords = {'do': 64, 'break': 65, 'continue': 66}
+# 其他单词：预处理指令、未闭合的字符串/字符常量等
+other_code = 67
+# 非法单词（错误 token）
+error_code = 0
+
+# 种别码 -> 单词类别名称
+TOKEN_NAME: Dict[int, str] = {
+    # 关键字: 保留原样
+    **{v: k for k, v in keywords.items()},
+    **{v: k for k, v in extra_keywords.items()},
+    # 操作符和分隔符: 保留符号本身
+    **{v: k for k, v in operators.items()},
+    **{v: k for k, v in delimiter.items()},
+    # 标识符、整型、浮点型字面量: 统一大写下划线风格
+    identifier_code: 'ID',
+    integer_code:   'INT_LITERAL',
+    float_code:     'FLOAT_LITERAL',
+    string_code:    'STRING_LITERAL',
+    char_code:      'CHAR_LITERAL',
+    other_code:     'OTHER',
+    error_code:     'ERROR',
+}
+
+
+# 文法终结符名称（与 grammar 定义完全一致）
+TERMINALS = {
+    # 字面量类型
+    'INT_LITERAL': 'INT_LITERAL',
+    'FLOAT_LITERAL': 'FLOAT_LITERAL',
+    'STRING_LITERAL': 'STRING_LITERAL',
+    'CHAR_LITERAL': 'CHAR_LITERAL',
+    'ID': 'ID',
+    # 关键字（小写，与文法中一致）
+    'int': 'int', 'float': 'float', 'void': 'void',
+    'if': 'if', 'else': 'else', 'while': 'while', 'for': 'for', 'return': 'return', 'include': 'include',
+    'read': 'read', 'write': 'write',  # 添加read和write的映射
+    # 操作符 & 分隔符
+    '=': '=', '+': '+', '-': '-', '*': '*', '/': '/', '%': '%',
+    '==': '==', '!=': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>=',
+    '&&': '&&', '||': '||', '!': '!', '++': '++', '--': '--',
+    '(': '(', ')': ')', '{': '{', '}': '}', '[': '[', ']': ']',
+    ';': ';', ',': ',', '.': '.', '#': '#'
+}
+
+# 种别码 -> 终结符名称，导入时构建一次；没有对应终结符的种别码为 None
+CODE_TO_TERMINAL: List[Optional[str]] = [None] * (max(TOKEN_NAME) + 1)
+for _code, _name in TOKEN_NAME.items():
+    CODE_TO_TERMINAL[_code] = TERMINALS.get(_name)
+# 只有自动词法分析识别的关键字在文法中没有对应终结符，与手写词法分析一致按标识符交给语法分析
+for _code in extra_keywords.values():
+    CODE_TO_TERMINAL[_code] = TERMINALS['ID']
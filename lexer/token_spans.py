@@ -0,0 +1,75 @@
+# token_spans.py
+# 以 (起点, 终点) 区间表示词素的 token 序列：词素不随 token 一起复制保存，只在读取时从源代码中切出。
+from array import array
+from typing import Iterator, Tuple
+
+from Compilers.lexer.manual_lexer import string_code
+from Compilers.lexer.line_index import TokenPositions
+
+
+class SpanTokens:
+    """
+    只存种别码与源代码区间的 token 序列，按下标访问时才生成 (code, lexeme)。
+
+    codes 为 array('H')，区间复用 TokenPositions 的 starts / ends，
+    因此一百万个 token 只占几个数组，而不是一百万个元组和词素字符串。
+
+    与手写词法分析一致，字符串 token 的词素从左引号后一位开始，即 source[start + 1:end]。
+    """
+    __slots__ = ('source', 'codes', 'positions')
+
+    def __init__(self, source: str, positions: TokenPositions, codes: array = None):
+        self.source = source
+        self.positions = positions
+        self.codes = codes if codes is not None else array('H')
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code(self, k: int) -> int:
+        """第 k 个 token 的种别码"""
+        return self.codes[k]
+
+    def span(self, k: int) -> Tuple[int, int]:
+        """第 k 个 token 词素的 (起点, 终点)"""
+        start = self.positions.starts[k]
+        if self.codes[k] == string_code:
+            start += 1
+        return start, self.positions.ends[k]
+
+    def lexeme(self, k: int) -> str:
+        """第 k 个 token 的词素，在调用时才从源代码切出"""
+        start, end = self.span(k)
+        return self.source[start:end]
+
+    def __getitem__(self, k: int) -> Tuple[int, str]:
+        if k < 0:
+            k += len(self.codes)
+        if not 0 <= k < len(self.codes):
+            raise IndexError('token index out of range')
+        return self.codes[k], self.lexeme(k)
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        for k in range(len(self.codes)):
+            yield self.codes[k], self.lexeme(k)
+
+    def materialize(self):
+        """展开为普通的 [(code, lexeme)] 列表"""
+        return list(self)
+
+
+class CodeSink:
+    """
+    词法扫描的输出端：只保留种别码，丢弃扫描过程中产生的词素。
+    与 TokenPositions 配合使用即得到 SpanTokens。
+    """
+    __slots__ = ('codes',)
+
+    def __init__(self):
+        self.codes = array('H')
+
+    def append(self, token: Tuple[int, str]):
+        self.codes.append(token[0])
+
+    def __len__(self):
+        return len(self.codes)
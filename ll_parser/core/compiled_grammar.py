@@ -0,0 +1,167 @@
+# compiled_grammar.py
+# 进程内共享的只读文法：finalize 后的产生式、符号集合与 LL(1) 分析表冻结成 CompiledGrammar，
+# 每个进程只构建（或从磁盘缓存读取）一次，所有 Compiler 实例共用同一个对象。
+import gc
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Set, Tuple
+
+from Compilers.ll_parser.core.grammar_oop import Grammar, Production, SymbolIndex
+from Compilers.ll_parser.core.first_follow import GrammarSets
+from Compilers.ll_parser.core.grammar_cache import load_or_build
+from Compilers.ll_parser.core.parse_table import DenseParseTable
+
+DEFAULT_CFG_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'CFG.txt'))
+
+
+class _ReadOnly:
+    """只读对象的公共部分：构建时用 object.__setattr__ 写入各字段，此后任何赋值与删除都抛出 AttributeError"""
+    __slots__ = ()
+
+    @classmethod
+    def _copy_of(cls, source, **fields):
+        """按 source 的 __slots__ 逐个复制字段构造只读副本，fields 中给出的字段以新值代替"""
+        obj = object.__new__(cls)
+        for name in type(source).__slots__:
+            object.__setattr__(obj, name, fields[name] if name in fields else getattr(source, name))
+        return obj
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} 不可修改: {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} 不可修改: {name}")
+
+
+class FrozenProduction(_ReadOnly, Production):
+    """CompiledGrammar 中的产生式：右部与编号均为 tuple，构建后不可修改"""
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, prod: Production) -> 'FrozenProduction':
+        return cls._copy_of(prod, body=tuple(prod.body), body_ids=tuple(prod.body_ids))
+
+
+class FrozenSymbolIndex(_ReadOnly, SymbolIndex):
+    """只读的 SymbolIndex：names 为 tuple，ids 为只读映射"""
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, index: SymbolIndex) -> 'FrozenSymbolIndex':
+        return cls._copy_of(index, names=tuple(index.names), ids=MappingProxyType(dict(index.ids)),
+                            _chunks=MappingProxyType({}))
+
+    def terminal_names(self, mask: int) -> Set[str]:
+        """位集 -> 终结符名称集合（只读对象不缓存按字节切分的子集，只在报错时调用）"""
+        names, offset = self.names, self.n_nonterminals
+        return {names[offset + k] for k in range(mask.bit_length()) if mask >> k & 1}
+
+
+class FrozenDenseParseTable(_ReadOnly, DenseParseTable):
+    """只读的 DenseParseTable：cells / code_terms 为 array 的只读 memoryview，按下标读取的速度与 array 相同"""
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, dense: DenseParseTable) -> 'FrozenDenseParseTable':
+        return cls._copy_of(dense, cells=memoryview(dense.cells).toreadonly(),
+                            code_terms=memoryview(dense.code_terms).toreadonly())
+
+
+class FrozenGrammarSets(_ReadOnly, GrammarSets):
+    """只读的 GrammarSets：offsets 为只读 memoryview，其余字段本就是 tuple"""
+    __slots__ = ()
+
+    @classmethod
+    def of(cls, sets: GrammarSets, index: SymbolIndex) -> 'FrozenGrammarSets':
+        return cls._copy_of(sets, index=index, offsets=memoryview(sets.offsets).toreadonly())
+
+
+class CompiledGrammar(_ReadOnly):
+    """
+    冻结的文法与分析表，构建后不可修改：
+
+      productions:   {非终结符: (FrozenProduction, ...)} 的只读映射，产生式右部为 tuple
+      nonterminals / terminals: frozenset
+      table:         {(非终结符, 终结符): FrozenProduction} 的只读映射
+      is_ll1:        文法是否为 LL(1)
+      terminal_list: build_parse_table 返回的终结符序列（含 '$'），tuple
+      start_symbol:  开始符号
+      symbol_index:  finalize 分配的符号编号（FrozenSymbolIndex），产生式的 head_id / body_ids 随之保留
+      dense_table:   与 table 内容相同的 FrozenDenseParseTable，parse_with_tree 以整数编号查表
+      sets:          FrozenGrammarSets：FIRST / FOLLOW 位集与每个 (产生式, 点位置) 的后缀 FIRST，
+                     产生式下标与 dense_table.prods 一致
+
+    productions / nonterminals / all_prods / index_symbols 与 Grammar 同名，可直接传给 parse_with_tree。
+    冻结是深层的：嵌套的产生式、符号编号、稠密表与 FIRST/FOLLOW 也都是只读副本，
+    只由 tuple、frozenset、str、只读映射与只读 memoryview 组成，fork 出的子进程直接继承，不需要重新序列化。
+    """
+    __slots__ = ('productions', 'nonterminals', 'terminals', 'table', 'is_ll1', 'terminal_list', 'start_symbol',
+                 'symbol_index', 'dense_table', 'sets')
+
+    def __init__(self, grammar: Grammar, table: Mapping[Tuple[str, str], Production],
+                 is_ll1: bool, terminals: List[str], start_symbol: str, sets: GrammarSets):
+        symbol_index = FrozenSymbolIndex.of(grammar.index_symbols())
+        frozen: Dict[int, FrozenProduction] = {}
+        productions = {}
+        for head, prods in grammar.productions.items():
+            copies = []
+            for prod in prods:
+                copy = frozen[id(prod)] = FrozenProduction.of(prod)
+                copies.append(copy)
+            productions[head] = tuple(copies)
+        init = object.__setattr__
+        init(self, 'productions', MappingProxyType(productions))
+        init(self, 'nonterminals', frozenset(grammar.nonterminals))
+        init(self, 'terminals', frozenset(grammar.terminals))
+        init(self, 'table', MappingProxyType({key: frozen[id(prod)] for key, prod in table.items()}))
+        init(self, 'is_ll1', is_ll1)
+        init(self, 'terminal_list', tuple(terminals))
+        init(self, 'start_symbol', start_symbol)
+        init(self, 'symbol_index', symbol_index)
+        init(self, 'dense_table', FrozenDenseParseTable.of(DenseParseTable(symbol_index, self.all_prods(), self.table)))
+        init(self, 'sets', FrozenGrammarSets.of(sets, symbol_index))
+
+    def index_symbols(self) -> SymbolIndex:
+        """符号编号（构建时已分配）"""
+        return self.symbol_index
+
+    def all_prods(self) -> List[Production]:
+        """返回所有 Production 对象列表"""
+        return [p for ps in self.productions.values() for p in ps]
+
+    def __repr__(self):
+        return '\n'.join(map(repr, self.all_prods()))
+
+
+# (CFG 路径, 开始符号, eliminate_lr, left_fact) -> CompiledGrammar
+_shared: Dict[Tuple[str, str, bool, bool], CompiledGrammar] = {}
+_shared_lock = threading.Lock()
+
+
+def get_compiled_grammar(cfg_path: str = DEFAULT_CFG_PATH, start_symbol: str = 'Program',
+                         eliminate_lr: bool = True, left_fact: bool = True) -> CompiledGrammar:
+    """
+    返回本进程共享的 CompiledGrammar，相同参数只构建一次（首次调用时经 load_or_build 读取磁盘缓存）。
+    可在多个线程中同时调用。
+    """
+    key = (os.path.normcase(os.path.abspath(cfg_path)), start_symbol, eliminate_lr, left_fact)
+    compiled = _shared.get(key)
+    if compiled is None:
+        with _shared_lock:
+            compiled = _shared.get(key)
+            if compiled is None:
+                grammar, table, is_ll1, terminals, sets = load_or_build(cfg_path, start_symbol, eliminate_lr, left_fact)
+                compiled = _shared[key] = CompiledGrammar(grammar, table, is_ll1, terminals, start_symbol, sets)
+    return compiled
+
+
+def freeze_for_fork(cfg_path: str = DEFAULT_CFG_PATH, start_symbol: str = 'Program') -> CompiledGrammar:
+    """
+    在创建 fork 子进程之前调用：先构建共享文法，再用 gc.freeze() 把当前所有对象移出垃圾回收的追踪范围，
+    子进程中的垃圾回收不再改写这些对象所在的内存页，父子进程得以长期共享同一份物理内存（写时复制）。
+    """
+    compiled = get_compiled_grammar(cfg_path, start_symbol)
+    gc.freeze()
+    return compiled
@@ -1,9 +1,10 @@
 # first_follow.py
-from typing import Dict, Set, List
-from Compilers.ll_parser.core.grammar_oop import Grammar
+from array import array
+from typing import Dict, Set, List, Sequence, Tuple
+from Compilers.ll_parser.core.grammar_oop import Grammar, SymbolIndex
 
 
-def compute_first(grammar: Grammar) -> Dict[str, Set[str]]:
+def compute_first_fixpoint(grammar: Grammar) -> Dict[str, Set[str]]:
     """
     计算给定文法中每个非终结符 A 的 FIRST 集合。
     FIRST(A) 包含：
@@ -58,7 +59,7 @@ def compute_first(grammar: Grammar) -> Dict[str, Set[str]]:
     return FIRST
 
 
-def compute_follow(grammar: Grammar,
+def compute_follow_fixpoint(grammar: Grammar,
                    FIRST: Dict[str, Set[str]],
                    start_symbol: str) -> Dict[str, Set[str]]:
     """
@@ -76,7 +77,7 @@ def compute_follow(grammar: Grammar,
       - 直到所有 FOLLOW 集稳定。
     参数：
       grammar: 已完成 finalize() 的 Grammar 对象。
-      FIRST: 调用 compute_first 得到的 FIRST 集映射。
+      FIRST: 调用 compute_first（或 compute_first_fixpoint）得到的 FIRST 集映射。
       start_symbol: 文法的起始符号，通常为 'Program'。
     返回：
       Dict[str, Set[str]]，键为非终结符，值为其 FOLLOW 集。
@@ -113,4 +114,290 @@ def compute_follow(grammar: Grammar,
                     else:
                         # X 是终结符或 ε，则重置 trailer 为 {X}
                         trailer = {X}
-    return FOLLOW
\ No newline at end of file
+    return FOLLOW
+
+# ---------------- 依赖图 + 位集 ----------------
+# FIRST / FOLLOW 都是形如 S[A] = base[A] ∪ ⋃{S[X] | X ∈ deps[A]} 的最小解。
+# 先逐条产生式扫描一遍，得到每个非终结符的常量部分 base（位集）与依赖边 deps，
+# 再对依赖图求强连通分量：Tarjan 算法按"被依赖者先于依赖者"的顺序给出各分量，
+# 每个分量只需把成员的 base 与已算好的下游分量并起来，一次即得最终结果，不再反复扫描全部产生式。
+# 符号一律使用 Grammar.finalize 分配的整数编号（SymbolIndex），非终结符 A 的集合存于列表下标 A，
+# 集合本身为终结符位集（'ε' 为第 0 位）。
+
+EPS_BIT = SymbolIndex.EPS_BIT
+
+
+def _propagate(base: List[int], deps: List[List[int]]) -> List[int]:
+    """
+    求 S[A] = base[A] | OR(S[X] for X in deps[A]) 的最小解，A 为 0 .. len(base) - 1。
+    迭代式 Tarjan 算法：分量按逆拓扑序弹出，弹出时其依赖的分量都已求得，
+    分量内各成员互相依赖，结果相同，为成员 base 与外部依赖之并。
+    """
+    n = len(base)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    result = [0] * n
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, iter(deps[root]))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if index[child] < 0:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = 1
+                    work.append((child, iter(deps[child])))
+                    break
+                if on_stack[child] and index[child] < low[node]:
+                    low[node] = index[child]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    # node 为一个强连通分量的根：弹出分量，合并成员的 base 与外部依赖
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        members.append(member)
+                        if member == node:
+                            break
+                    mask = 0
+                    for member in members:
+                        mask |= base[member]
+                        for dep in deps[member]:
+                            mask |= result[dep]
+                    for member in members:
+                        result[member] = mask
+    return result
+
+
+def first_bits(grammar: Grammar) -> List[int]:
+    """
+    以位集计算每个非终结符的 FIRST 集（下标为非终结符编号），结果与 compute_first_fixpoint 相同。
+
+    1) 可空性：产生式 A → X1..Xk t ...（Xi 为非终结符，t 为第一个非 非终结符 的符号或不存在），
+       当 X1..Xk 均可空且 t 不存在或为 'ε' 时 A 可空。
+       每条这样的产生式记录尚未确认可空的 Xi 个数，某个非终结符一旦可空，
+       只需更新出现它的产生式的计数，计数归零即得到一个新的可空非终结符（工作表）。
+    2) A 依赖 X1..Xj（X1..Xj-1 均可空），X1..Xk 全部可空时 t 进入 base[A]；
+       可空的非终结符带 'ε' 位。依赖图上一次 _propagate 得到全部 FIRST 集。
+    """
+    index = grammar.index_symbols()
+    n = index.n_nonterminals
+    eps = n  # 'ε' 的编号
+    nullable = bytearray(n)
+    worklist: List[int] = []
+    remaining: List[int] = []
+    waiting_heads: List[int] = []
+    occurs: List[List[int]] = [[] for _ in range(n)]
+    prefixes = []
+    for prods in grammar.productions.values():
+        for prod in prods:
+            head = prod.head_id
+            prefix = []
+            tail = -1
+            for sid in prod.body_ids:
+                if sid >= n:
+                    tail = sid
+                    break
+                prefix.append(sid)
+            prefixes.append((head, prefix, tail))
+            if tail < 0 or tail == eps:
+                if not prefix:
+                    if not nullable[head]:
+                        nullable[head] = 1
+                        worklist.append(head)
+                    continue
+                k = len(remaining)
+                remaining.append(len(prefix))
+                waiting_heads.append(head)
+                for sid in prefix:
+                    occurs[sid].append(k)
+    while worklist:
+        sid = worklist.pop()
+        for k in occurs[sid]:
+            remaining[k] -= 1
+            if remaining[k] == 0:
+                head = waiting_heads[k]
+                if not nullable[head]:
+                    nullable[head] = 1
+                    worklist.append(head)
+
+    base = [0] * n
+    deps: List[List[int]] = [[] for _ in range(n)]
+    for head, prefix, tail in prefixes:
+        for sid in prefix:
+            deps[head].append(sid)
+            if not nullable[sid]:
+                break
+        else:
+            if tail > eps:
+                base[head] |= 1 << (tail - n)
+    result = _propagate(base, deps)
+    for A in range(n):
+        if nullable[A]:
+            result[A] |= EPS_BIT
+    return result
+
+
+def follow_bits(grammar: Grammar, first: List[int], start_symbol: str) -> List[int]:
+    """
+    以位集计算每个非终结符的 FOLLOW 集（下标为非终结符编号），结果与 compute_follow_fixpoint 相同。
+
+    对产生式 A → α 从右向左扫描一次：X 右侧各符号 FIRST 的并（遇到不可空符号或终结符即截止）进入 base[X]；
+    X 右侧全部是可空的非终结符时 FOLLOW(X) 依赖 FOLLOW(A)。依赖图上一次 _propagate 得到全部 FOLLOW 集。
+    """
+    index = grammar.index_symbols()
+    n = index.n_nonterminals
+    base = [0] * n
+    start = index.ids[start_symbol]
+    if start >= n:
+        raise KeyError(start_symbol)
+    base[start] |= SymbolIndex.END_BIT
+    deps: List[List[int]] = [[] for _ in range(n)]
+    for prods in grammar.productions.values():
+        for prod in prods:
+            head = prod.head_id
+            trailer = 0
+            reaches_end = True
+            for sid in reversed(prod.body_ids):
+                if sid < n:
+                    base[sid] |= trailer & ~EPS_BIT
+                    if reaches_end and sid != head:
+                        deps[sid].append(head)
+                    first_sym = first[sid]
+                    if first_sym & EPS_BIT:
+                        trailer |= first_sym & ~EPS_BIT
+                    else:
+                        trailer = first_sym
+                        reaches_end = False
+                else:
+                    trailer = 1 << (sid - n)
+                    reaches_end = False
+    return _propagate(base, deps)
+
+
+def compute_first(grammar: Grammar) -> Dict[str, Set[str]]:
+    """
+    计算给定文法中每个非终结符 A 的 FIRST 集合（含 'ε' 表示可推出空串），
+    结果与 compute_first_fixpoint 相同，但每条产生式只扫描常数次（见 first_bits）。
+    参数：
+      grammar: 已完成 finalize() 的 Grammar 对象。
+    返回：
+      Dict[str, Set[str]]，键为非终结符，值为其 FIRST 集。
+    """
+    index = grammar.index_symbols()
+    return {index.names[A]: index.terminal_names(mask) for A, mask in enumerate(first_bits(grammar))}
+
+
+def compute_follow(grammar: Grammar,
+                   FIRST: Dict[str, Set[str]],
+                   start_symbol: str) -> Dict[str, Set[str]]:
+    """
+    计算给定文法中每个非终结符 A 的 FOLLOW 集合，结果与 compute_follow_fixpoint 相同（见 follow_bits）。
+    参数：
+      grammar: 已完成 finalize() 的 Grammar 对象。
+      FIRST: 调用 compute_first 得到的 FIRST 集映射。
+      start_symbol: 文法的起始符号，通常为 'Program'。
+    返回：
+      Dict[str, Set[str]]，键为非终结符，值为其 FOLLOW 集。
+    """
+    index = grammar.index_symbols()
+    names = index.names[:index.n_nonterminals]
+    first = [index.terminal_mask(FIRST[A]) for A in names]
+    follow = follow_bits(grammar, first, start_symbol)
+    return {A: index.terminal_names(mask) for A, mask in zip(names, follow)}
+
+
+def suffix_first_bits(grammar: Grammar, first: List[int]) -> Tuple[array, List[int]]:
+    """
+    每条产生式每个点位置的 FIRST 位集：对 A → X1..Xk 与 0 <= dot <= k，
+    item_first[offsets[p] + dot] = FIRST(X(dot+1)..Xk)，可空时带 'ε' 位（dot = k 即空串，恒为 'ε'）。
+    产生式下标 p 按 grammar.all_prods() 的顺序；每条右部从右向左扫描一次。
+    """
+    n = grammar.index_symbols().n_nonterminals
+    eps = n
+    offsets = array('I', [0])
+    item_first: List[int] = []
+    for prod in grammar.all_prods():
+        body = prod.body_ids
+        suffix = [EPS_BIT] * (len(body) + 1)
+        acc = EPS_BIT
+        for dot in range(len(body) - 1, -1, -1):
+            sid = body[dot]
+            if sid >= n:
+                if sid != eps:
+                    acc = 1 << (sid - n)
+            elif first[sid] & EPS_BIT:
+                acc |= first[sid] & ~EPS_BIT
+            else:
+                acc = first[sid]
+            suffix[dot] = acc
+        item_first += suffix
+        offsets.append(len(item_first))
+    return offsets, item_first
+
+
+class GrammarSets:
+    """
+    finalize 后预先算好的 FIRST / FOLLOW 信息，均为终结符位集（见 SymbolIndex）：
+
+      first / follow: 非终结符编号 -> FIRST / FOLLOW 位集，FIRST 含 'ε' 位表示可空
+      offsets:        产生式下标（all_prods 的顺序）-> 该产生式在 item_first 中的起点，末尾多一项为总长
+      item_first:     平铺的 (产生式, 点位置) -> 点之后的右部后缀的 FIRST 位集（见 suffix_first_bits）
+
+    错误恢复与补全提示按 (产生式下标, 点位置) 查询时只需一次下标运算，不再逐符号合并集合。
+    """
+    __slots__ = ('index', 'first', 'follow', 'offsets', 'item_first')
+
+    def __init__(self, index: SymbolIndex, first: Sequence[int], follow: Sequence[int],
+                 offsets: array, item_first: Sequence[int]):
+        self.index = index
+        self.first: Tuple[int, ...] = tuple(first)
+        self.follow: Tuple[int, ...] = tuple(follow)
+        self.offsets = offsets
+        self.item_first: Tuple[int, ...] = tuple(item_first)
+
+    def first_at(self, prod: int, dot: int) -> int:
+        """产生式 prod 中点位置 dot 之后的后缀的 FIRST 位集"""
+        return self.item_first[self.offsets[prod] + dot]
+
+    def nullable_at(self, prod: int, dot: int) -> bool:
+        """产生式 prod 中点位置 dot 之后的后缀能否推出 ε"""
+        return bool(self.item_first[self.offsets[prod] + dot] & EPS_BIT)
+
+    def lookahead_at(self, prod: int, head: int, dot: int) -> int:
+        """
+        在 head → α·β 处可以出现的下一个终结符：FIRST(β) 去掉 'ε'，β 可空时再并上 FOLLOW(head)。
+        head 为产生式 prod 的左部编号。
+        """
+        bits = self.item_first[self.offsets[prod] + dot]
+        if bits & EPS_BIT:
+            return (bits & ~EPS_BIT) | self.follow[head]
+        return bits
+
+    def names(self, mask: int) -> Set[str]:
+        """位集 -> 终结符名称集合"""
+        return self.index.terminal_names(mask)
+
+
+def build_grammar_sets(grammar: Grammar, start_symbol: str) -> GrammarSets:
+    """计算 grammar（须已 finalize）的 FIRST、FOLLOW 以及每个 (产生式, 点位置) 的后缀 FIRST"""
+    first = first_bits(grammar)
+    follow = follow_bits(grammar, first, start_symbol)
+    offsets, item_first = suffix_first_bits(grammar, first)
+    return GrammarSets(grammar.index_symbols(), first, follow, offsets, item_first)
@@ -0,0 +1,199 @@
+# grammar_cache.py
+# 文法与 LL(1) 分析表的磁盘缓存：finalize 之后的产生式、终结符/非终结符与分析表
+# 以符号下标编码成几段 array('H') 字节串，连同预先算好的 FIRST / FOLLOW 位集（GrammarSets）用 marshal 写入一个文件。
+# 缓存键为 CFG 文件内容、finalize 选项与文法处理代码本身的哈希，任何一项变化都会重新构建。
+import glob
+import hashlib
+import marshal
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from Compilers.ll_parser.core.grammar_oop import Grammar, Production, load_grammar_from_file
+from Compilers.ll_parser.core.first_follow import GrammarSets, build_grammar_sets
+from Compilers.ll_parser.core.parse_table import build_parse_table
+
+# 缓存文件格式版本，格式改变时递增
+CACHE_FORMAT = 2
+CACHE_SUFFIX = '.llcache'
+
+# 参与构建文法与分析表的模块：其源代码变化时缓存一并失效
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+_SOURCE_MODULES = ('grammar_oop.py', 'first_follow.py', 'parse_table.py', 'grammar_cache.py')
+_code_fingerprint: Optional[bytes] = None
+
+
+def _fingerprint() -> bytes:
+    """文法处理代码的摘要，每个进程只计算一次"""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        h = hashlib.sha256()
+        for name in _SOURCE_MODULES:
+            with open(os.path.join(_CORE_DIR, name), 'rb') as f:
+                h.update(f.read())
+        _code_fingerprint = h.digest()
+    return _code_fingerprint
+
+
+def grammar_cache_key(cfg_bytes: bytes, start_symbol: str,
+                      eliminate_lr: bool = True, left_fact: bool = True) -> str:
+    """CFG 文件内容 + 开始符号 + finalize 选项 + 代码摘要 的十六进制哈希"""
+    h = hashlib.sha256()
+    h.update(f"{CACHE_FORMAT}\0{start_symbol}\0{eliminate_lr:d}\0{left_fact:d}\0".encode())
+    h.update(_fingerprint())
+    h.update(cfg_bytes)
+    return h.hexdigest()
+
+
+def dump_compiled(grammar: Grammar, table: Dict[Tuple[str, str], Production],
+                  is_ll1: bool, terminals: List[str], sets: GrammarSets) -> bytes:
+    """
+    把 finalize 后的文法、分析表与 GrammarSets 编码为字节串。
+    符号按首次出现的顺序编号；产生式平铺为 [head, 长度, body...]，
+    分析表为 (非终结符, 终结符, 产生式下标) 三元组，全部存为 array('H')。
+    GrammarSets 的位集以 finalize 的符号编号为准，载入时重新编号得到的结果相同，原样存为 int 元组。
+    """
+    symbols: Dict[str, int] = {}
+
+    def sid(sym: str) -> int:
+        k = symbols.get(sym)
+        if k is None:
+            k = symbols[sym] = len(symbols)
+        return k
+
+    prods = grammar.all_prods()
+    prod_index = {id(p): k for k, p in enumerate(prods)}
+    flat = array('H')
+    for p in prods:
+        flat.append(sid(p.head))
+        flat.append(len(p.body))
+        flat.extend(sid(sym) for sym in p.body)
+    nonterminals = array('H', sorted(sid(sym) for sym in grammar.nonterminals))
+    grammar_terms = array('H', sorted(sid(sym) for sym in grammar.terminals))
+    term_list = array('H', [sid(sym) for sym in terminals])
+    cells = array('H')
+    for (head, term), prod in table.items():
+        cells.extend((sid(head), sid(term), prod_index[id(prod)]))
+    return marshal.dumps((CACHE_FORMAT, tuple(symbols), flat.tobytes(), nonterminals.tobytes(),
+                          grammar_terms.tobytes(), term_list.tobytes(), cells.tobytes(), is_ll1,
+                          sets.first, sets.follow, sets.offsets.tobytes(), sets.item_first))
+
+
+def _unpack(raw: bytes) -> array:
+    values = array('H')
+    values.frombytes(raw)
+    return values
+
+
+def load_compiled(data: bytes):
+    """
+    dump_compiled 的逆过程。
+
+    返回:
+        (grammar, table, is_ll1, terminals, sets)，与 build_compiled 的结果相同；
+        table 中的值与 grammar.productions 中的 Production 是同一批对象
+    """
+    fields = marshal.loads(data)
+    if fields[0] != CACHE_FORMAT:
+        raise ValueError(f"缓存格式不匹配: {fields[0]}")
+    (_, symbols, flat, nonterminals, grammar_terms, term_list, cells, is_ll1,
+     first, follow, offsets, item_first) = fields
+    grammar = Grammar()
+    prods: List[Production] = []
+    flat = _unpack(flat)
+    k = 0
+    while k < len(flat):
+        head, length = symbols[flat[k]], flat[k + 1]
+        prod = Production(head, [symbols[s] for s in flat[k + 2:k + 2 + length]])
+        grammar.productions.setdefault(head, []).append(prod)
+        prods.append(prod)
+        k += 2 + length
+    grammar.nonterminals = {symbols[s] for s in _unpack(nonterminals)}
+    grammar.terminals = {symbols[s] for s in _unpack(grammar_terms)}
+    grammar._pending_bodies = [p.body for p in prods]
+    index = grammar.index_symbols()
+    offsets_array = array('I')
+    offsets_array.frombytes(offsets)
+    sets = GrammarSets(index, first, follow, offsets_array, item_first)
+    cells = _unpack(cells)
+    table = {(symbols[cells[k]], symbols[cells[k + 1]]): prods[cells[k + 2]] for k in range(0, len(cells), 3)}
+    return grammar, table, is_ll1, [symbols[s] for s in _unpack(term_list)], sets
+
+
+def build_compiled(cfg_path: str, start_symbol: str,
+                   eliminate_lr: bool = True, left_fact: bool = True):
+    """
+    不经缓存，读取 CFG 文件、finalize 并构建分析表。
+    返回 (grammar, table, is_ll1, terminals, sets)，sets 为 build_grammar_sets 的结果，建表时直接复用
+    """
+    grammar = Grammar()
+    load_grammar_from_file(cfg_path, grammar)
+    grammar.finalize(eliminate_lr=eliminate_lr, left_fact=left_fact, start_symbol=start_symbol)
+    sets = build_grammar_sets(grammar, start_symbol)
+    table, is_ll1, terminals = build_parse_table(grammar, start_symbol=start_symbol, sets=sets)
+    return grammar, table, is_ll1, terminals, sets
+
+
+def cache_stem_for(cfg_path: str, start_symbol: str, eliminate_lr: bool, left_fact: bool) -> str:
+    """
+    缓存文件名前缀：CFG 文件名 + 开始符号 + finalize 选项，同一配置的各版本缓存共享此前缀。
+
+    不同开始符号或选项的缓存前缀不同，清理旧缓存时互不影响。
+    """
+    return f"{os.path.basename(cfg_path)}.{start_symbol}.lr{int(eliminate_lr)}lf{int(left_fact)}."
+
+
+def cache_path_for(cfg_path: str, key: str, stem: str, cache_dir: Optional[str] = None) -> str:
+    """缓存文件路径：默认放在 CFG 文件旁的 __pycache__ 目录下"""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(cfg_path)), '__pycache__')
+    return os.path.join(cache_dir, f"{stem}{key[:16]}{CACHE_SUFFIX}")
+
+
+def load_or_build(cfg_path: str, start_symbol: str = 'Program',
+                  eliminate_lr: bool = True, left_fact: bool = True,
+                  cache_dir: Optional[str] = None):
+    """
+    优先从磁盘缓存读取文法与分析表，未命中时构建并写入缓存。
+
+    缓存文件损坏或格式不符时视为未命中；缓存目录不可写时只是不写缓存，不影响结果。
+    写入新缓存时只删除同一 CFG 文件、同一开始符号与选项的旧缓存，其他配置的缓存保留；
+    文件名不含开始符号与选项的旧格式缓存也在此时删除。
+
+    参数:
+        cfg_path: CFG 文件路径
+        start_symbol: 文法开始符号
+        eliminate_lr / left_fact: 传给 Grammar.finalize 的选项
+        cache_dir: 缓存目录，默认为 CFG 文件旁的 __pycache__
+    返回:
+        (grammar, table, is_ll1, terminals, sets)
+    """
+    with open(cfg_path, 'rb') as f:
+        cfg_bytes = f.read()
+    key = grammar_cache_key(cfg_bytes, start_symbol, eliminate_lr, left_fact)
+    stem = cache_stem_for(cfg_path, start_symbol, eliminate_lr, left_fact)
+    path = cache_path_for(cfg_path, key, stem, cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            return load_compiled(f.read())
+    except (OSError, EOFError, ValueError, TypeError, IndexError):
+        pass
+
+    compiled = build_compiled(cfg_path, start_symbol, eliminate_lr, left_fact)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cache_dir = glob.escape(os.path.dirname(path))
+        stale = glob.glob(os.path.join(cache_dir, f"{glob.escape(stem)}*{CACHE_SUFFIX}"))
+        # 旧格式的缓存文件名不含开始符号与选项（CFG 文件名.16 位哈希），无法判断所属配置，一并删除
+        legacy = f"{glob.escape(os.path.basename(cfg_path))}.{'[0-9a-f]' * 16}{CACHE_SUFFIX}"
+        stale += glob.glob(os.path.join(cache_dir, legacy))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(dump_compiled(*compiled))
+        os.replace(tmp, path)
+        for old in stale:
+            if old != path:
+                os.remove(old)
+    except OSError:
+        pass
+    return compiled
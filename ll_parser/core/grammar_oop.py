@@ -1,16 +1,156 @@
 #grammar_oop.py
-from typing import List, Dict, Set
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Set, Optional, Iterable, Tuple
 
 class Production:
+    # head_id / body_ids 为 finalize 时分配的整数编号（见 SymbolIndex），此前为 -1 与 ()
+    __slots__ = ('head', 'body', 'head_id', 'body_ids')
+
     def __init__(self, head: str, body: List[str]):
         self.head = head
         self.body = body
+        self.head_id = -1
+        self.body_ids: Tuple[int, ...] = ()
 
     def __repr__(self):
         rhs = ' '.join(self.body) or 'ε'
         return f"{self.head} → {rhs}"
 
 
+class SymbolIndex:
+    """
+    finalize 时为文法符号分配的稠密整数编号：
+      非终结符: 0 .. n_nonterminals - 1，按 productions 中的顺序
+      终结符:   从 n_nonterminals 起，'ε' 与 '$' 在最前，其余右部符号按首次出现的顺序
+    终结符集合（FIRST / FOLLOW）表示为 int 位集，编号 n_nonterminals + k 的终结符对应第 k 位，
+    因此 'ε' 为第 0 位、'$' 为第 1 位。names 保留每个编号的名称，用于打印与构造分析表的键。
+    """
+    __slots__ = ('names', 'ids', 'n_nonterminals', '_chunks')
+
+    EPS_BIT = 1
+    END_BIT = 2
+
+    def __init__(self, productions: Dict[str, List['Production']]):
+        self.names: List[str] = list(productions)
+        self.n_nonterminals = len(self.names)
+        self.names += ['ε', '$']
+        self.ids: Dict[str, int] = {name: k for k, name in enumerate(self.names)}
+        for prods in productions.values():
+            for prod in prods:
+                for sym in prod.body:
+                    if sym not in self.ids:
+                        self.ids[sym] = len(self.names)
+                        self.names.append(sym)
+        self._chunks: Dict[int, frozenset] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def n_terminals(self) -> int:
+        """终结符个数（含 'ε' 与 '$'）"""
+        return len(self.names) - self.n_nonterminals
+
+    def terminal_bit(self, sym: str) -> int:
+        """终结符 sym 在位集中对应的位"""
+        return 1 << (self.ids[sym] - self.n_nonterminals)
+
+    def terminal_names(self, mask: int) -> Set[str]:
+        """位集 -> 终结符名称集合：按字节切分，每个 (字节位置, 字节值) 对应的名称子集只构造一次"""
+        chunks = self._chunks
+        names, offset = self.names, self.n_nonterminals
+        parts = []
+        for pos, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) >> 3, 'little')):
+            if byte:
+                key = pos << 8 | byte
+                part = chunks.get(key)
+                if part is None:
+                    part = chunks[key] = frozenset(names[offset + pos * 8 + k] for k in range(8) if byte >> k & 1)
+                parts.append(part)
+        return set().union(*parts)
+
+    def terminal_mask(self, symbols: Iterable[str]) -> int:
+        """终结符名称集合 -> 位集（非终结符与未编号的符号被忽略）"""
+        ids, offset = self.ids, self.n_nonterminals
+        mask = 0
+        for sym in symbols:
+            sid = ids.get(sym, -1)
+            if sid >= offset:
+                mask |= 1 << (sid - offset)
+        return mask
+
+
+def _concat(*parts: List[str]) -> List[str]:
+    """拼接若干段右部并去掉其中的 ε；结果为空时为 ['ε']"""
+    return [sym for part in parts for sym in part if sym != 'ε'] or ['ε']
+
+
+def _left_recursive_groups(bodies_map: Dict[str, List[List[str]]]) -> Dict[str, List[str]]:
+    """
+    左角图（A → B：A 有以非终结符 B 开头的右部）的强连通分量中构成左递归的那些：
+    含多个非终结符，或只含一个但有 A → A 的自环。
+    返回 {非终结符: 所在分量的成员（按 bodies_map 中的顺序）}，不参与左递归的非终结符不出现。
+    """
+    edges = {A: list(dict.fromkeys(b[0] for b in bodies if b and b[0] in bodies_map))
+             for A, bodies in bodies_map.items()}
+    order = {A: k for k, A in enumerate(bodies_map)}
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    groups: Dict[str, List[str]] = {}
+    # 迭代实现的 Tarjan 算法，避免深层递归
+    for root in bodies_map:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            A, k = work.pop()
+            if k == 0:
+                index[A] = low[A] = len(index)
+                stack.append(A)
+                on_stack.add(A)
+            succ = edges[A]
+            while k < len(succ):
+                B = succ[k]
+                k += 1
+                if B not in index:
+                    work.append((A, k))
+                    work.append((B, 0))
+                    break
+                if B in on_stack:
+                    low[A] = min(low[A], index[B])
+            else:
+                if low[A] == index[A]:
+                    members = []
+                    while True:
+                        B = stack.pop()
+                        on_stack.discard(B)
+                        members.append(B)
+                        if B == A:
+                            break
+                    if len(members) > 1 or A in edges[A]:
+                        members.sort(key=order.__getitem__)
+                        for B in members:
+                            groups[B] = members
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[A])
+    return groups
+
+
+# finalize 的文法变换结果缓存：输入文法（产生式与 finalize 选项）的哈希 -> 变换后的 ((head, (body, ...)), ...)
+# 按最近使用淘汰，最多保留 TRANSFORM_CACHE_SIZE 份
+TRANSFORM_CACHE_SIZE = 32
+_transform_cache: 'OrderedDict[bytes, Tuple[Tuple[str, Tuple[Tuple[str, ...], ...]], ...]]' = OrderedDict()
+
+
+def clear_transform_cache():
+    """清空 finalize 的文法变换缓存"""
+    _transform_cache.clear()
+
+
 class Grammar:
     def __init__(self):
         # 存储所有产生式，键为非终结符，值为对应的 Production 列表
@@ -19,8 +159,10 @@ class Grammar:
         self.nonterminals: Set[str] = set()
         # 终结符集合
         self.terminals: Set[str] = set()
-        # 在 finalize 前暂存所有产生式右部，用于后续统一分类
+        # 依次添加的所有产生式右部
         self._pending_bodies: List[List[str]] = []
+        # finalize 时分配的符号编号，之后再添加产生式则失效
+        self.symbol_index: Optional[SymbolIndex] = None
 
     def add_prod(self, head: str, body: List[str]):
         """
@@ -35,106 +177,239 @@ class Grammar:
         self.nonterminals.add(head)
         # 暂存 body，待 finalize 分类
         self._pending_bodies.append(body)
+        self.symbol_index = None
 
     def finalize(self,
                  eliminate_lr: bool = True,
-                 left_fact: bool = True):
+                 left_fact: bool = True,
+                 remove_useless: bool = True,
+                 start_symbol: Optional[str] = None):
         """
         在所有产生式添加完成后调用：
-        1) 消除直接左递归
+        1) 消除左递归（含间接左递归）
         2) 提取左公因子
-        3) 根据暂存的 body 分类终结符
+        3) 删除无用符号：推导不出终结符串的非终结符，以及从开始符号不可达的非终结符
+        4) 根据产生式右部分类终结符
+        5) 为所有符号分配整数编号，产生式记录 head_id / body_ids
+        1) ~ 3) 的结果按输入文法的哈希缓存在进程内，同一文法再次 finalize 时直接重建产生式。
+
+        参数:
+            start_symbol: 开始符号，默认为第一个添加产生式的非终结符
         """
-        if eliminate_lr:
-            self._eliminate_direct_left_recursion()
-        if left_fact:
-            self._left_factor_all()
+        if start_symbol is None:
+            start_symbol = next(iter(self.productions), None)
+        key = self._transform_key(eliminate_lr, left_fact, remove_useless, start_symbol)
+        cached = _transform_cache.get(key)
+        if cached is None:
+            if eliminate_lr:
+                self._eliminate_left_recursion()
+            if left_fact:
+                self._left_factor_all()
+            if remove_useless and start_symbol is not None:
+                self._remove_useless_symbols(start_symbol)
+            _transform_cache[key] = tuple((head, tuple(tuple(p.body) for p in prods))
+                                          for head, prods in self.productions.items())
+            if len(_transform_cache) > TRANSFORM_CACHE_SIZE:
+                _transform_cache.popitem(last=False)
+        else:
+            _transform_cache.move_to_end(key)
+            self._rebuild_from_bodies({head: [list(body) for body in bodies] for head, bodies in cached})
 
-        # 将所有右侧符号分类：非 pending 且非非终结符的视为终结符
-        all_rhs_syms = {sym for body in self._pending_bodies for sym in body}
+        # 将所有右侧符号分类：不是非终结符的视为终结符
+        all_rhs_syms = {sym for prods in self.productions.values() for p in prods for sym in p.body}
         for sym in all_rhs_syms:
             if sym != 'ε' and sym not in self.nonterminals:
                 self.terminals.add(sym)
+        self.index_symbols()
+
+    def _transform_key(self, *options) -> bytes:
+        """当前产生式与 finalize 选项的哈希，作为文法变换缓存的键"""
+        h = hashlib.sha256(repr(options).encode())
+        for head, prods in self.productions.items():
+            for p in prods:
+                h.update(f"{head}\0{' '.join(p.body)}\n".encode())
+        return h.digest()
 
-    def _eliminate_direct_left_recursion(self):
+    def index_symbols(self) -> SymbolIndex:
+        """
+        返回符号编号；尚未编号（或编号后又添加了产生式）时按当前产生式重新分配，
+        并写入每个产生式的 head_id 与 body_ids
         """
-        消除所有非终结符的直接左递归：
-        A → A α | β  转换为
-        A → β A'
-        A' → α A' | ε
+        if self.symbol_index is None:
+            index = SymbolIndex(self.productions)
+            ids = index.ids
+            for head, prods in self.productions.items():
+                head_id = ids[head]
+                for prod in prods:
+                    prod.head_id = head_id
+                    prod.body_ids = tuple(map(ids.__getitem__, prod.body))
+            self.symbol_index = index
+        return self.symbol_index
+
+    def _eliminate_left_recursion(self):
         """
+        消除左递归（含间接左递归），按非终结符在 productions 中的顺序 A1, A2, ..., An 依次处理 Ai：
+        1) 对 j < i，把 Ai → Aj γ 替换为 Ai → δ1 γ | δ2 γ | ...（Aj → δ1 | δ2 | ... 为 Aj 已处理过的产生式）
+        2) 消除 Ai 的直接左递归：
+           A → A α | β  转换为
+           A → β A'
+           A' → α A' | ε
+        只代入与 Ai 处在同一个左递归环中的 Aj（左角图的同一强连通分量），
+        不参与左递归的非终结符保持原样，语法树的结构也就不变。
+        与经典算法相同，要求文法无 ε 产生式隐藏的左递归（如 A → B A α 且 B ⇒* ε），此类左递归不做处理。
+        """
+        bodies_map = {A: [p.body for p in ps] for A, ps in self.productions.items()}
+        groups = _left_recursive_groups(bodies_map)
+        if not groups:
+            return
+        order = {A: k for k, A in enumerate(bodies_map)}
         new_bodies: Dict[str, List[List[str]]] = {}
-        for A, prods in list(self.productions.items()):
+        for A, bodies in bodies_map.items():
+            group = groups.get(A)
+            if group is None:
+                new_bodies[A] = bodies
+                continue
+            # 1) 按顺序代入同一环中排在 A 之前、已处理过的 Aj
+            for Aj in group:
+                if order[Aj] >= order[A]:
+                    break
+                substituted: List[List[str]] = []
+                for b in bodies:
+                    if b and b[0] == Aj:
+                        substituted.extend(_concat(delta, b[1:]) for delta in new_bodies[Aj])
+                    else:
+                        substituted.append(b)
+                bodies = substituted
+            # 2) 消除直接左递归
             # alpha 保存所有左递归产生式去掉首符号后的部分。
             # A → A a | A b，则 alpha = [['a'], ['b']]。
             # beta 保存所有非左递归产生式的右侧。
             # 若 A → c | d，则 beta = [['c'], ['d']]。
-            alpha, beta = [], []
-            # 区分左递归产生式（形如 A → A ...）和非左递归产生式
-            for p in prods:
-                if p.body and p.body[0] == A:
-                    # 去掉首符后的 α
-                    alpha.append(p.body[1:])
-                else:
-                    beta.append(p.body)
-            if alpha:
-                # 构造新的非终结符 A'
-                # 在原非终结符后添加 '（如 A'），若存在冲突则继续添加（如 A''>）。
-                Aprime = A + "'"
-                while Aprime in self.productions or Aprime in new_bodies:
-                    Aprime += "'"
-                # A -> β Aprime
-                new_bodies[A] = [b + [Aprime] for b in beta]
-                # Aprime -> α Aprime | ε
-                new_bodies[Aprime] = [a + [Aprime] for a in alpha] + [['ε']]
-            else:
-                # 无左递归，保留原产生式
-                new_bodies[A] = [p.body for p in prods]
+            alpha = [b[1:] for b in bodies if b and b[0] == A]
+            beta = [b for b in bodies if not (b and b[0] == A)]
+            # 没有非左递归的右部时 A 推导不出终结符串，保持原样，留给 _remove_useless_symbols 删除
+            if not alpha or not beta:
+                new_bodies[A] = bodies
+                continue
+            # 构造新的非终结符 A'
+            # 在原非终结符后添加 '（如 A'），若存在冲突则继续添加（如 A''）。
+            Aprime = A + "'"
+            while Aprime in bodies_map or Aprime in new_bodies:
+                Aprime += "'"
+            # A -> β Aprime
+            new_bodies[A] = [_concat(b, [Aprime]) for b in beta]
+            # Aprime -> α Aprime | ε
+            new_bodies[Aprime] = [_concat(a, [Aprime]) for a in alpha] + [['ε']]
 
         # 重建 productions
         self._rebuild_from_bodies(new_bodies)
 
+    def _remove_useless_symbols(self, start_symbol: str):
+        """
+        删除无用符号及含有它们的产生式：
+        1) 推导不出终结符串的非终结符（开始符号本身推导不出时语言为空，跳过这一步）
+        2) 从开始符号不可达的非终结符
+        终结符随之按剩余产生式重新归类（只在被删除产生式中出现的终结符不再保留）。
+        """
+        bodies_map = {A: [p.body for p in ps] for A, ps in self.productions.items()}
+        # 1) 能推导出终结符串的非终结符：每条产生式记录尚未确定的非终结符个数，减到 0 时其左部可推导
+        pending: List[int] = []
+        waiting: Dict[str, List[int]] = {}
+        heads: List[str] = []
+        ready: List[str] = []
+        for A, bodies in bodies_map.items():
+            for b in bodies:
+                k = len(pending)
+                heads.append(A)
+                pending.append(0)
+                for sym in b:
+                    if sym in bodies_map:
+                        pending[k] += 1
+                        waiting.setdefault(sym, []).append(k)
+                if not pending[k]:
+                    ready.append(A)
+        generating: Set[str] = set()
+        while ready:
+            A = ready.pop()
+            if A in generating:
+                continue
+            generating.add(A)
+            for k in waiting.get(A, ()):
+                pending[k] -= 1
+                if not pending[k]:
+                    ready.append(heads[k])
+        if start_symbol in generating:
+            bodies_map = {A: [b for b in bodies if all(sym in generating or sym not in bodies_map for sym in b)]
+                          for A, bodies in bodies_map.items() if A in generating}
+
+        # 2) 从开始符号可达的非终结符
+        reachable = {start_symbol}
+        todo = [start_symbol]
+        while todo:
+            for b in bodies_map.get(todo.pop(), ()):
+                for sym in b:
+                    if sym in bodies_map and sym not in reachable:
+                        reachable.add(sym)
+                        todo.append(sym)
+        kept = {A: bodies for A, bodies in bodies_map.items() if A in reachable}
+        if sum(map(len, kept.values())) != sum(map(len, self.productions.values())):
+            self._rebuild_from_bodies(kept)
+
     def _left_factor_all(self):
         """
-        反复进行左公因子提取，直到所有非终结符没有可提取的公因子
+        一遍提取所有左公因子：每个非终结符的右部按前缀组成（路径压缩的）字典树，
+        首符号相同的一组右部只引入一个新非终结符，并一次提取整组的最长公共前缀：
+        A → α β1 | α β2 | γ  转换为
+        A → α A' | γ
+        A' → β1 | β2        （β 为空时写作 ε）
+        若 β 之间仍有共同的首符号，即字典树在 α 之后继续分叉，对 A' 递归同样处理。
+        提取后的右部留在该组首次出现的位置，新非终结符紧跟在原非终结符之后。
         """
-        while True:
-            # 标记本轮循环是否进行了左因子提取。若没有，则终止循环。
-            changed = False
-            # 当前所有产生式右部映射
-            bodies_map = {A: [p.body for p in ps]
-                          for A, ps in self.productions.items()}
+        taken = set(self.productions)
+        new_bodies: Dict[str, List[List[str]]] = {}
+        changed = False
 
-            for A, bodies in bodies_map.items():
-                # 按首符号分组
-                groups: Dict[str, List[List[str]]] = {}
-                # 根据产生式右部的首符号 b[0] 分组。例如：
-                # A → aB | aC | d 分组为 {'a': [['a','B'], ['a','C']], 'd': [['d']]}。
-                for b in bodies:
-                    key = b[0] if b else 'ε'
-                    groups.setdefault(key, []).append(b)
-
-                for key, group in groups.items():
-                    # 找到首符相同且多于一条的组
-                    if key != 'ε' and len(group) > 1:
-                        # 新非终结符 A'
-                        Aprime = A + "'"
-                        while Aprime in bodies_map:
-                            Aprime += "'"
-                        # A 的新产生式：保留其他组 + 提取公因子项
-                        others = [b for b in bodies if b[0] != key]
-                        bodies_map[A] = others + [[key, Aprime]]
-                        # Aprime 的产生式：去掉首符后的剩余，否则 ε
-                        bodies_map[Aprime] = [(b[1:] or ['ε']) for b in group]
-                        changed = True
-                        break
-                if changed:
-                    break
+        def factor(A: str, bodies: List[List[str]]):
+            nonlocal changed
+            result: List[List[str]] = []
+            new_bodies[A] = result
+            # 按首符号分组，slots 按首次出现的顺序记录 ε 右部（原样保留）或分组的首符号
+            groups: Dict[str, List[List[str]]] = {}
+            slots: List = []
+            for b in bodies:
+                if not b or b[0] == 'ε':
+                    slots.append(b)
+                elif b[0] in groups:
+                    groups[b[0]].append(b)
+                else:
+                    groups[b[0]] = [b]
+                    slots.append(b[0])
 
-            if not changed:
-                break
-            # 若有变动，则重建 productions 继续下一轮
-            self._rebuild_from_bodies(bodies_map)
+            for slot in slots:
+                if not isinstance(slot, str):
+                    result.append(slot)
+                    continue
+                group = groups[slot]
+                if len(group) == 1:
+                    result.append(group[0])
+                    continue
+                # 整组的最长公共前缀 group[0][:n]
+                first, n = group[0], 1
+                shortest = min(map(len, group))
+                while n < shortest and all(b[n] == first[n] for b in group):
+                    n += 1
+                Aprime = A + "'"
+                while Aprime in taken:
+                    Aprime += "'"
+                taken.add(Aprime)
+                result.append(first[:n] + [Aprime])
+                changed = True
+                factor(Aprime, [b[n:] or ['ε'] for b in group])
+
+        for A, prods in list(self.productions.items()):
+            factor(A, [p.body for p in prods])
+        if changed:
+            self._rebuild_from_bodies(new_bodies)
 
     def _rebuild_from_bodies(self,
                              bodies_map: Dict[str, List[List[str]]]):
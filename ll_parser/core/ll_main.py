@@ -1,6 +1,6 @@
 # ll_main.py
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 from collections import deque
 import os
 import sys
@@ -10,16 +10,27 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..
 sys.path.insert(0, project_root)
 
 from Compilers.ll_parser.core.grammar_oop import Grammar, Production, load_grammar_from_file
-from Compilers.ll_parser.core.parse_table import build_parse_table
-from Compilers.ll_parser.core.parse_tree import Node, print_tree, cst_to_ast
-from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals
+from Compilers.ll_parser.core.parse_table import build_parse_table, DenseParseTable
+from Compilers.ll_parser.core.first_follow import GrammarSets, build_grammar_sets, EPS_BIT
+from Compilers.ll_parser.core.parse_tree import Node, print_tree, cst_to_ast, without_gc, ERROR_LABEL
+from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals, token_terminal, CODE_TO_TERMINAL
+from Compilers.lexer.line_index import TokenPositions
+from Compilers.lexer.token_spans import SpanTokens
+from Compilers.lexer.auto_lexer import TokenBuffer
 
+# 错误恢复时除 FOLLOW 集外额外用作同步点的语句结束符
+SYNC_TERMINALS = (';', '}')
 
+
+@without_gc
 def parse_with_tree(
     tokens: List[Tuple[str, str]],  # 每项为 (终结符名称, 原始文本)
     grammar: 'Grammar',
-    table: Dict[Tuple[str, str], 'Production'],
-    start_symbol: str
+    table: Union[Dict[Tuple[str, str], 'Production'], DenseParseTable],
+    start_symbol: str,
+    positions: Optional[TokenPositions] = None,
+    token_codes: bool = False,
+    errors: Optional[List[str]] = None
 ) -> Node:
     """
     基于 LL(1) 分析表的自顶向下解析，构造并返回 CST 根节点。
@@ -27,34 +38,101 @@ def parse_with_tree(
     grammar: Grammar 对象，包含 .nonterminals
     table: 解析表，键为 (非终结符, 终结符)
     start_symbol: 文法开始符号名称
+    positions: 可选的 token 位置信息（词法分析 with_positions=True 的结果），
+               提供时节点带有 pos，语法错误信息给出真实的行列号
+    token_codes: 为 True 时 tokens 直接是词法分析输出的 (种别码, 词素)，
+                 前看符号按 CODE_TO_TERMINAL 即时查表，省去 tokens_to_terminals 转换与配对拷贝
+    tokens 也可以是 SpanTokens 或自动词法分析的 TokenBuffer（隐含 token_codes）：前看只读种别码，
+    词素直到匹配终结符、写入 Node.value（或报错）时才从源代码切出
+    table 为 DenseParseTable，或 grammar 是带 dense_table 的 CompiledGrammar 且 table 就是 grammar.table 时，
+    走整数快速路径（_parse_dense）：栈中存符号编号，查表为 cells[nt_id * n_terms + t_id]，结果与字典查表相同
+    errors: 省略时遇到第一个语法错误即抛出 SyntaxError；传入列表时进行错误恢复，
+            每个错误的信息（与抛出的 SyntaxError 相同）追加到列表中，一遍解析报告全部错误，
+            返回的 CST 在出错处带有 ERROR_LABEL 节点（见 _parse_dense）。错误恢复总是走整数路径
     """
     stack_sym  = deque(['$', start_symbol])
     root       = Node(start_symbol)
     stack_node = deque([Node('$'), root])
 
-    # 拆分出并添加结束符
-    terms = [t for t,_ in tokens] + ['$']
-    texts = [txt for _,txt in tokens] + ['$']
+    n_tokens = len(tokens)
+    code_table = CODE_TO_TERMINAL
+    n_codes = len(code_table)
+    spans = tokens if isinstance(tokens, (SpanTokens, TokenBuffer)) else None
+
+    def text_at(k: int) -> str:
+        # 第 k 个 token 的文本，越界即结束符
+        if k >= n_tokens:
+            return '$'
+        return spans.lexeme(k) if spans is not None else tokens[k][1]
+
+    def lookahead(k: int) -> str:
+        # 第 k 个 token 的终结符，越界即结束符
+        if k >= n_tokens:
+            return '$'
+        if spans is not None:
+            code = spans.codes[k]
+        elif token_codes:
+            code = tokens[k][0]
+        else:
+            return tokens[k][0]
+        term = code_table[code] if 0 <= code < n_codes else None
+        if term is None:
+            try:
+                term = token_terminal(code, text_at(k))
+            except KeyError:
+                # 没有对应文法终结符的 token（如只有自动词法分析识别的单词）与不符的终结符同样报错
+                raise SyntaxError(f"Unexpected token '{text_at(k)}' at {where(k)}") from None
+        return term
+
+    if positions is None and spans is not None:
+        positions = spans.positions
+
+    def where(k: int) -> str:
+        if positions is not None:
+            return positions.describe(k)
+        return f"position {k}"
+
     pos = 0
+    lookahead_term = lookahead(0)
+
+    if not isinstance(table, DenseParseTable):
+        dense = getattr(grammar, 'dense_table', None)
+        if dense is not None and table is getattr(grammar, 'table', None):
+            table = dense
+        elif errors is not None:
+            table = DenseParseTable(grammar.index_symbols(), grammar.all_prods(), table)
+    if isinstance(table, DenseParseTable):
+        sets = None
+        if errors is not None:
+            # FOLLOW 集：CompiledGrammar 自带预先算好的 GrammarSets，其余文法现场计算
+            sets = getattr(grammar, 'sets', None)
+            if sets is None or sets.index is not table.index:
+                sets = build_grammar_sets(grammar, start_symbol)
+        return _parse_dense(tokens, table, start_symbol, positions, token_codes, spans, text_at, lookahead, where,
+                            errors, sets)
 
     while stack_sym:
         top_sym       = stack_sym.pop()
         top_node      = stack_node.pop()
-        lookahead_term = terms[pos]
+        if positions is not None:
+            top_node.pos = positions.offset(pos)
 
         # 如果栈顶是终结符
         if top_sym not in grammar.nonterminals:
             if top_sym == lookahead_term:
                 top_node.label = top_sym
-                top_node.value = texts[pos]  # 赋值真实文本
+                top_node.value = text_at(pos)  # 赋值真实文本
                 pos += 1
+                lookahead_term = lookahead(pos)
                 continue
             else:
-                raise SyntaxError(f"Unexpected token '{texts[pos]}' at position {pos}")
+                raise SyntaxError(f"Unexpected token '{text_at(pos)}' at {where(pos)}")
 
         # 否则是非终结符，从表中取产生式
         prod = table.get((top_sym, lookahead_term))
         if prod is None:
+            if positions is not None:
+                raise SyntaxError(f"No rule for ({top_sym}, '{lookahead_term}') at {where(pos)}")
             raise SyntaxError(f"No rule for ({top_sym}, '{lookahead_term}')")
 
         # 创建子节点并压栈
@@ -66,6 +144,201 @@ def parse_with_tree(
                 stack_node.append(node)
 
     return root
+
+
+def _parse_dense(tokens, dense: DenseParseTable, start_symbol: str,
+                 positions: Optional[TokenPositions], token_codes: bool, spans,
+                 text_at, lookahead, where, errors: Optional[List[str]] = None,
+                 sets: Optional[GrammarSets] = None) -> Node:
+    """
+    parse_with_tree 的整数快速路径：前看符号预先按种别码（或终结符名称）换算为 t_id，
+    栈中存符号编号，非终结符展开只做一次数组下标运算，不再构造并散列 (非终结符, 终结符) 元组。
+    种别码没有直接对应的终结符时按 lookahead（即 token_terminal 兜底）换算，报错信息与字典查表路径完全相同；
+    兜底也换算不出的 token 抛出（或在错误恢复时记录）与不符的终结符相同的 "Unexpected token" 错误。
+
+    errors 不为 None 时进行错误恢复（sets 为 GrammarSets，提供 FOLLOW 集与可空性）：
+      - 栈顶终结符与前看不符（短语级）：视为缺少该终结符，弹出它，原处留下一个没有子节点的 ERROR_LABEL 节点；
+        栈底的 '$' 与剩余输入不符时，剩余 token 全部收入根节点末尾的 ERROR_LABEL 节点
+      - 栈顶非终结符 A 无产生式（应急模式）：跳过 token，直到前看可以展开 A（继续展开），
+        或属于 FOLLOW(A)、为输入结束、可以被栈中 A 之下的符号接受（弹出 A）。
+        判断后者时，栈中不符的终结符视为缺失：前看为 SYNC_TERMINALS 时任意终结符都可以缺失，
+        否则只有 SYNC_TERMINALS 可以缺失（补上漏写的 ';' 或 '}'）；
+        跳过的 token 收入 A 的第一个子节点 ERROR_LABEL，A 有 A → ε 产生式且没有跳过 token 时按 ε 展开
+      - 自上一个错误以来没有再匹配任何 token 时，新的错误视为连锁错误，不再报告
+    错误恢复不改变正确输入的解析路径：只有出错分支会检查 errors。
+    """
+    index = dense.index
+    names = index.names
+    n = index.n_nonterminals
+    n_terms = dense.n_terms
+    cells, pushes = dense.cells, dense.pushes
+    bodies = [prod.body for prod in dense.prods]
+    end_id = index.ids['$'] - n
+
+    # 各 token 的 t_id，-1 表示需要经 lookahead 兜底换算（或不是本文法的终结符）
+    n_tokens = len(tokens)
+    if spans is not None or token_codes:
+        code_terms = dense.code_terms
+        n_codes = len(code_terms)
+        codes = spans.codes if spans is not None else [code for code, _ in tokens]
+        las = [code_terms[code] if 0 <= code < n_codes else -1 for code in codes]
+    else:
+        terminal_id = dense.terminal_id
+        las = [terminal_id(term) for term, _ in tokens]
+    if errors is not None:
+        # 错误恢复时预先换算全部兜底 token：无法映射的 token 记为 t_id 0（'ε'），它不会出现在任何表格与栈中
+        for k, t_id in enumerate(las):
+            if t_id < 0:
+                try:
+                    t_id = dense.terminal_id(lookahead(k))
+                except SyntaxError:
+                    pass
+                las[k] = t_id if t_id >= 0 else 0
+
+    def la_at(k: int) -> int:
+        if k >= n_tokens:
+            return end_id
+        t_id = las[k]
+        if t_id < 0:
+            t_id = dense.terminal_id(lookahead(k))
+        return t_id
+
+    lexeme_at = spans.lexeme if spans is not None else None
+    root = Node(start_symbol)
+    stack_sym = [index.ids['$'], index.ids[start_symbol]]
+    stack_node = [Node('$'), root]
+    pos = 0
+    la = la_at(0)
+    last_error = -1  # 最近一次错误恢复结束时的 token 下标，用于抑制连锁错误
+
+    def error_node(start: int, end: int) -> Node:
+        # 第 start .. end-1 个 token 组成的 ERROR_LABEL 节点
+        leaves = []
+        for j in range(start, end):
+            leaf = Node(names[n + las[j]] if las[j] > 0 else text_at(j), value=text_at(j))
+            if positions is not None:
+                leaf.pos = positions.offset(j)
+            leaves.append(leaf)
+        node = Node(ERROR_LABEL, leaves)
+        if positions is not None:
+            node.pos = positions.offset(start)
+        return node
+
+    def resumes(t_id: int, insertable) -> bool:
+        # 栈中（自顶向下）是否有符号可以接受 t_id：不符的终结符会被当作缺失而弹出（insertable 为 None 时任意终结符，
+        # 否则只限其中的终结符），可空的非终结符可以推出 ε，二者都跳过；遇到其余符号或栈底的 '$' 为止
+        for sym in reversed(stack_sym):
+            if sym >= n:
+                if sym - n == t_id:
+                    return True
+                if sym - n == end_id or (insertable is not None and sym - n not in insertable):
+                    return False
+                continue
+            if cells[sym * n_terms + t_id] >= 0:
+                return True
+            if not first[sym] & EPS_BIT:
+                return False
+        return False
+
+    if errors is not None:
+        follow, first = sets.follow, sets.first
+        sync = {t_id for t_id in map(dense.terminal_id, SYNC_TERMINALS) if t_id >= 0}
+        # 非终结符 -> 其 A → ε 产生式的下标：恢复时弹出 A 改为按 ε 展开，不留下 ERROR_LABEL 节点
+        epsilon_prods = {}
+        for j, prod in enumerate(dense.prods):
+            if not pushes[j]:
+                epsilon_prods.setdefault(prod.head_id, j)
+
+    while stack_sym:
+        top = stack_sym.pop()
+        top_node = stack_node.pop()
+        if positions is not None:
+            top_node.pos = positions.offset(pos)
+
+        # 栈顶是终结符
+        if top >= n:
+            if top - n == la:
+                if pos >= n_tokens:
+                    top_node.value = '$'
+                    pos += 1
+                    continue
+                top_node.value = lexeme_at(pos) if lexeme_at is not None else tokens[pos][1]
+                pos += 1
+                if pos < n_tokens:
+                    la = las[pos]
+                    if la < 0:
+                        la = la_at(pos)
+                else:
+                    la = end_id
+                continue
+            message = f"Unexpected token '{text_at(pos)}' at {where(pos)}"
+            if errors is None:
+                raise SyntaxError(message)
+            if pos > last_error:
+                errors.append(message)
+            if top - n == end_id:
+                # 栈已空而输入未尽：剩余 token 挂在根节点末尾
+                root.children.append(error_node(pos, n_tokens))
+                pos, la = n_tokens, end_id
+            else:
+                top_node.label = ERROR_LABEL
+            last_error = pos
+            continue
+
+        # 非终结符：稠密表查产生式下标
+        k = cells[top * n_terms + la] if la >= 0 else -1
+        if k < 0:
+            if errors is None:
+                term = lookahead(pos)
+            else:
+                term = names[n + la] if la > 0 else text_at(pos)
+            if la == 0 and pos < n_tokens:
+                # 无法映射的 token：与抛出路径中 lookahead 的报错相同
+                message = f"Unexpected token '{term}' at {where(pos)}"
+            elif positions is not None:
+                message = f"No rule for ({names[top]}, '{term}') at {where(pos)}"
+            else:
+                message = f"No rule for ({names[top]}, '{term}')"
+            if errors is None:
+                raise SyntaxError(message)
+            reported = pos > last_error
+            if reported:
+                errors.append(message)
+            # 应急模式：跳到可以展开 top 或属于同步集合的 token
+            start = pos
+            while True:
+                k = cells[top * n_terms + la]
+                if (k >= 0 or la == end_id or follow[top] >> la & 1
+                        or resumes(la, None if la in sync else sync)):
+                    break
+                pos += 1
+                la = las[pos] if pos < n_tokens else end_id
+            last_error = pos
+            if k < 0:
+                k = epsilon_prods.get(top, -1)
+                if k < 0:
+                    top_node.children = [error_node(start, pos)]
+                    continue
+            if reported or pos > start:
+                # 继续展开 top，跳过的 token 作为第一个子节点
+                children = list(map(Node, bodies[k]))
+                top_node.children = [error_node(start, pos)] + children
+                stack_sym.extend(pushes[k])
+                stack_node.extend(node for node in reversed(children) if node.label != 'ε')
+                continue
+
+        children = list(map(Node, bodies[k]))
+        top_node.children = children
+        push = pushes[k]
+        stack_sym.extend(push)
+        if len(push) == len(children):
+            stack_node.extend(reversed(children))
+        else:
+            stack_node.extend(node for node in reversed(children) if node.label != 'ε')
+
+    return root
+
+
 def build_grammar() -> Grammar:
     """
     构造并返回用于示例的 C 语言子集文法。
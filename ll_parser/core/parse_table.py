@@ -1,81 +1,212 @@
 # parse_table.py
-from typing import Dict, List, Tuple, Set, Any
-from Compilers.ll_parser.core.grammar_oop import Grammar, Production
-from Compilers.ll_parser.core.first_follow import compute_first, compute_follow
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Set, Any, Mapping, Optional, Sequence
+from Compilers.ll_parser.core.grammar_oop import Grammar, Production, SymbolIndex
+from Compilers.ll_parser.core.first_follow import GrammarSets, build_grammar_sets, EPS_BIT
+from Compilers.lexer.token_kinds import CODE_TO_TERMINAL
+
+@dataclass
+class Conflict:
+    """分析表中一格的冲突：同一 (非终结符, 终结符) 有多条产生式可选"""
+    nonterminal: str
+    terminal: str
+    productions: List[Production]  # 竞争的产生式，按填表顺序；第一条为表中保留的那条
+    via: List[str]                 # 每条产生式进入该格的途径：'FIRST'（终结符属于右部的 FIRST 集）或 'FOLLOW'（右部可推出 ε）
+
+    @property
+    def kind(self) -> str:
+        """冲突类别：'FIRST/FIRST'、'FIRST/FOLLOW' 或 'FOLLOW/FOLLOW'（两条右部都可推出 ε）"""
+        n_first = self.via.count('FIRST')
+        if n_first >= 2:
+            return 'FIRST/FIRST'
+        return 'FIRST/FOLLOW' if n_first else 'FOLLOW/FOLLOW'
+
+    def __str__(self):
+        alternatives = ' | '.join(f"{p!r} ({via})" for p, via in zip(self.productions, self.via))
+        return f"{self.kind} 冲突 M[{self.nonterminal}, {self.terminal}]: {alternatives}"
+
+
+@dataclass
+class TableReport:
+    """分析表的诊断信息：冲突列表与表格规模"""
+    conflicts: List[Conflict]
+    n_nonterminals: int
+    n_terminals: int   # 含 '$'
+    filled: int        # 非空格数
+
+    @property
+    def cells(self) -> int:
+        """表格总格数（非终结符数 × 终结符数）"""
+        return self.n_nonterminals * self.n_terminals
+
+    @property
+    def density(self) -> float:
+        """非空格所占比例"""
+        return self.filled / self.cells if self.cells else 0.0
+
+    @property
+    def is_ll1(self) -> bool:
+        return not self.conflicts
+
+    def count_by_kind(self) -> Dict[str, int]:
+        """按冲突类别计数"""
+        counts: Dict[str, int] = {}
+        for conflict in self.conflicts:
+            counts[conflict.kind] = counts.get(conflict.kind, 0) + 1
+        return counts
+
+
+def _table_entries(grammar: Grammar, start_symbol: str, sets: Optional[GrammarSets]):
+    """
+    按填表顺序逐条产生式给出 (产生式, FIRST 途径的终结符, FOLLOW 途径的终结符)，
+    后者只在右部可推出 ε 时非空。FIRST / FOLLOW 以 finalize 分配的整数编号与终结符位集表示；
+    每条右部的 FIRST 即 (产生式, 点位置 0) 的后缀 FIRST，已在 sets 中预先算好。
+    """
+    index = grammar.index_symbols()
+    if sets is None:
+        sets = build_grammar_sets(grammar, start_symbol)
+    follows, item_first, offsets = sets.follow, sets.item_first, sets.offsets
+    names = index.terminal_names
+    # k 为产生式在 all_prods 中的下标
+    k = 0
+    for prods in grammar.productions.values():  # 遍历每个非终结符（如 E）及其所有产生式
+        for prod in prods:  # 循环每个产生式（如 E → T E'）
+            # 产生式右部的 FIRST 集（比如 T E' 的 FIRST）
+            first_set = item_first[offsets[k]]
+            k += 1
+            # 规则一：FIRST 集中的终结符（除 ε 外），表格坐标如 (E, id)
+            # 规则二：产生式可以推导出空时，FOLLOW(head) 中的终结符，如 (E', $)
+            follow = names(follows[prod.head_id]) if first_set & EPS_BIT else ()
+            yield prod, names(first_set & ~EPS_BIT), follow
+
 
 def build_parse_table(
     grammar: Grammar,
-    start_symbol: str
+    start_symbol: str,
+    sets: Optional[GrammarSets] = None
 ) -> Tuple[Dict[Tuple[str, str], Production], bool, List[str]]:
     """
     构建给定文法的 LL(1) 预测分析表。
+    冲突格保留最先填入的产生式，只记录文法是否为 LL(1)；需要冲突详情时使用 build_parse_table_report。
+    sets 为 build_grammar_sets 预先算好的 FIRST / FOLLOW，省略时现场计算。
 
     返回值：
         table: 字典映射 (非终结符, 终结符) -> 对应的产生式 Production
         is_LL1: 如果文法是 LL(1) 无冲突，则为 True；否则为 False
         terminals: 包含所有终结符及结束标记 '$' 的列表
     """
-    # 1. 计算 FIRST 和 FOLLOW 集
-    firsts: Dict[str, Set[str]] = compute_first(grammar)
-    follows: Dict[str, Set[str]] = compute_follow(grammar, firsts, start_symbol)
-
-    # 2. 获取所有非终结符和终结符列表，终结符列表末尾添加 '$'
-    nonterminals: List[str] = list(grammar.nonterminals)
+    # 终结符列表，末尾添加 '$'
     terminals: List[str] = list(grammar.terminals) + ['$']
 
-    # 初始化预测分析表和 LL(1) 标志
     table: Dict[Tuple[str, str], Production] = {}
+    fill = table.setdefault
     is_LL1 = True
+    for prod, first_terms, follow_terms in _table_entries(grammar, start_symbol, sets):
+        head = prod.head
+        for terminal in first_terms:
+            if fill((head, terminal), prod) is not prod:  # 格子已被其他产生式占用 → 冲突！
+                is_LL1 = False
+        for terminal in follow_terms:
+            if fill((head, terminal), prod) is not prod:
+                is_LL1 = False
+    return table, is_LL1, terminals
 
-    # 辅助函数：计算符号序列的 FIRST 集合
-    def first_of_sequence(seq: List[str]) -> Set[str]:
-        """
-        对于符号序列 X1 X2 ... Xn，返回其 FIRST 集合。
-        包括：
-          - 若 X1 能推导出终结符 t，则 t ∈ FIRST(seq)
-          - 若所有 Xi 均能推出 ε，则 ε ∈ FIRST(seq)
-        """
-        result: Set[str] = set()
-        for symbol in seq:
-            # 如果是空串 ε，则包含 ε 并结束
-            if symbol == 'ε':
-                result.add('ε')
-                break
-            # 如果是终结符，加入并结束
-            if symbol in grammar.terminals:
-                result.add(symbol)
-                break
-            # 否则为非终结符，将 FIRST(symbol) \ {ε} 并入结果
-            result |= (firsts[symbol] - {'ε'})
-            # 如果该非终结符不能推导 ε，结束；否则继续下一个符号
-            if 'ε' not in firsts[symbol]:
-                break
-        else:
-            # 如果循环完整执行，说明所有符号都能推出 ε
-            result.add('ε')
-        return result
-
-    # 3. 填充预测分析表
-    for head, prods in grammar.productions.items():  # 遍历每个非终结符（如 E）及其所有产生式
-        for prod in prods:  # 循环每个产生式（如 E → T E'）
-            # 计算产生式右部的 FIRST 集（比如 T E' 的 FIRST）
-            first_set = first_of_sequence(prod.body)
-
-            # 规则一：处理 FIRST 集中的终结符（除 ε 外）
-            for terminal in (first_set - {'ε'}):  # 比如当 FIRST={id} 时
-                key = (head, terminal)  # 表格坐标：如 (E, id)
-                if key in table:  # 如果格子已有内容 → 冲突！
-                    is_LL1 = False
-                else:
-                    table[key] = prod  # 填入产生式
-
-            # 规则二：处理 ε 情况
-            if 'ε' in first_set:  # 如果产生式可以推导出空
-                for terminal in follows[head]:  # 遍历 FOLLOW 集合（如 FOLLOW(E')={$}）
-                    key = (head, terminal)  # 对应坐标：如 (E', $)
-                    if key in table:  # 格子已被占用 → 冲突！
-                        is_LL1 = False
-                    else:
-                        table[key] = prod  # 填入产生式
-
-    return table, is_LL1, terminals
\ No newline at end of file
+
+def build_parse_table_report(
+    grammar: Grammar,
+    start_symbol: str,
+    sets: Optional[GrammarSets] = None
+) -> Tuple[Dict[Tuple[str, str], Production], TableReport, List[str]]:
+    """
+    构建 LL(1) 预测分析表，同时记录每个冲突格中竞争的产生式及其来源。
+    同一条产生式经 FIRST 与 FOLLOW 两条途径落入同一格不算冲突。
+    表格内容与 build_parse_table 相同，只是多了逐格的来源记录，供 table_report 诊断使用。
+
+    返回值：
+        table: 同 build_parse_table
+        report: TableReport，冲突按非终结符编号与终结符名称排序
+        terminals: 同 build_parse_table
+    """
+    terminals: List[str] = list(grammar.terminals) + ['$']
+
+    # 初始化预测分析表；via 记录每格产生式的来源，conflicts 记录冲突格
+    table: Dict[Tuple[str, str], Production] = {}
+    via: Dict[Tuple[str, str], str] = {}
+    conflicts: Dict[Tuple[str, str], Conflict] = {}
+
+    def fill(key: Tuple[str, str], prod: Production, source: str):
+        current = table.get(key)
+        if current is None:
+            table[key] = prod  # 填入产生式
+            via[key] = source
+        elif current is not prod:  # 格子已被其他产生式占用 → 冲突！
+            conflict = conflicts.get(key)
+            if conflict is None:
+                conflict = conflicts[key] = Conflict(key[0], key[1], [current], [via[key]])
+            if prod not in conflict.productions:
+                conflict.productions.append(prod)
+                conflict.via.append(source)
+
+    for prod, first_terms, follow_terms in _table_entries(grammar, start_symbol, sets):
+        for terminal in first_terms:
+            fill((prod.head, terminal), prod, 'FIRST')
+        for terminal in follow_terms:
+            fill((prod.head, terminal), prod, 'FOLLOW')
+
+    # 冲突按非终结符编号、终结符名称排序，输出与集合的遍历顺序无关
+    ids = grammar.index_symbols().ids
+    ordered = sorted(conflicts.values(), key=lambda c: (ids[c.nonterminal], c.terminal))
+    report = TableReport(ordered, len(grammar.productions), len(terminals), len(table))
+    return table, report, terminals
+
+
+class DenseParseTable:
+    """
+    稠密的 LL(1) 分析表：cells 为平铺的二维 array('h')，
+    第 nt_id * n_terms + t_id 格存放产生式下标，-1 表示出错（无产生式）。
+
+      nt_id:      非终结符编号（SymbolIndex 中的 0 .. n_nonterminals - 1）
+      t_id:       终结符编号减去 n_nonterminals，即该终结符在 FIRST/FOLLOW 位集中的位（'ε' 为 0，'$' 为 1）
+      prods:      产生式下标 -> Production（按 all_prods 的顺序）
+      pushes:     产生式下标 -> 右部去掉 'ε' 后逆序的符号编号，解析时依次压栈
+      code_terms: 词法分析种别码 -> t_id（按 CODE_TO_TERMINAL），没有对应文法终结符的种别码为 -1
+    """
+    __slots__ = ('index', 'n_terms', 'cells', 'prods', 'pushes', 'code_terms')
+
+    ERROR = -1
+
+    def __init__(self, index: SymbolIndex, prods: Sequence[Production],
+                 table: Mapping[Tuple[str, str], Production],
+                 code_terminals: Sequence[Optional[str]] = CODE_TO_TERMINAL):
+        self.index = index
+        self.n_terms = n_terms = index.n_terminals
+        n, ids = index.n_nonterminals, index.ids
+        self.prods: Tuple[Production, ...] = tuple(prods)
+        self.pushes: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(sid for sid in reversed(p.body_ids) if sid != n) for p in self.prods)
+        prod_index = {id(p): k for k, p in enumerate(self.prods)}
+        self.cells = array('h', [self.ERROR]) * (n * n_terms)
+        for (head, term), prod in table.items():
+            self.cells[ids[head] * n_terms + ids[term] - n] = prod_index[id(prod)]
+        self.code_terms = array('h', [self.terminal_id(name) for name in code_terminals])
+
+    def terminal_id(self, name: Optional[str]) -> int:
+        """终结符名称 -> t_id，不是本文法终结符（或为 None）时返回 -1"""
+        t_id = self.index.ids.get(name, -1) - self.index.n_nonterminals
+        return t_id if t_id >= 0 else self.ERROR
+
+    def lookup(self, nt_id: int, t_id: int) -> int:
+        """(非终结符编号, 终结符编号) 对应的产生式下标，无产生式时为 -1"""
+        return self.cells[nt_id * self.n_terms + t_id]
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def build_dense_table(grammar: Grammar, table: Mapping[Tuple[str, str], Production]) -> DenseParseTable:
+    """
+    把 build_parse_table 得到的字典形式分析表转换为 DenseParseTable。
+    grammar 须已 finalize（符号已编号），table 中的产生式须是 grammar 中的同一批对象。
+    """
+    return DenseParseTable(grammar.index_symbols(), grammar.all_prods(), table)
@@ -0,0 +1,306 @@
+# rd_codegen.py
+# 由 LL(1) 分析表生成专用的递归下降语法分析模块：每个非终结符一个函数，按整数编号的前看符号 if/elif 分派，
+# 运行时不再查表，也没有符号栈。生成的源代码按 CFG 文件、生成器代码与种别码登记表的哈希缓存在 CFG 文件旁的 __pycache__ 中。
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+import types
+from typing import Dict, List, Optional, Tuple
+
+from Compilers.ll_parser.core.compiled_grammar import CompiledGrammar, DEFAULT_CFG_PATH, get_compiled_grammar
+from Compilers.ll_parser.core.grammar_cache import grammar_cache_key
+from Compilers.ll_parser.core.ll_main import parse_with_tree
+from Compilers.ll_parser.core.parse_tree import Node, without_gc
+from Compilers.lexer.line_index import TokenPositions
+from Compilers.lexer.manual_lexer import token_terminal, CODE_TO_TERMINAL
+from Compilers.lexer.token_spans import SpanTokens
+from Compilers.lexer.auto_lexer import TokenBuffer
+
+GENERATED_SUFFIX = '.rd.py'
+
+
+def _function_name(nt_id: int, name: str) -> str:
+    return f"p{nt_id}_{re.sub(r'[^0-9A-Za-z_]', '_', name)}"
+
+
+def _test(t_ids: List[int]) -> str:
+    """前看符号属于 t_ids 的判断表达式；多个编号时用集合字面量（编译为 frozenset 常量）"""
+    if len(t_ids) == 1:
+        return f"t == {t_ids[0]}"
+    return f"t in {{{', '.join(map(str, t_ids))}}}"
+
+
+def _emit_functions(compiled: CompiledGrammar, with_pos: bool) -> List[str]:
+    """生成 parse 内部的各非终结符函数（缩进 4 格）"""
+    dense = compiled.dense_table
+    index = dense.index
+    n, n_terms = index.n_nonterminals, dense.n_terms
+    names = index.names
+    lines: List[str] = []
+    for nt_id in range(n):
+        head = names[nt_id]
+        # 按产生式分组本行的非空格，保持产生式顺序
+        row = dense.cells[nt_id * n_terms:(nt_id + 1) * n_terms]
+        by_prod: Dict[int, List[int]] = {}
+        for t_id, k in enumerate(row):
+            if k >= 0:
+                by_prod.setdefault(k, []).append(t_id)
+        self_tail = any(dense.prods[k].body_ids[-1:] == (nt_id,) for k in by_prod)
+
+        lines.append(f"    def {_function_name(nt_id, head)}(node):")
+        lines.append(f"        # {head}")
+        lines.append("        nonlocal pos")
+        indent = "        "
+        if self_tail:
+            lines.append("        while True:")
+            indent += "    "
+        if with_pos:
+            lines.append(f"{indent}node.pos = offsets[pos]")
+        lines.append(f"{indent}t = las[pos]")
+        keyword = 'if'
+        for k in sorted(by_prod):
+            prod = dense.prods[k]
+            lines.append(f"{indent}{keyword} {_test(by_prod[k])}:  # {prod!r}")
+            keyword = 'elif'
+            body = indent + "    "
+            children = [f"c{j}" for j in range(len(prod.body))]
+            for child, sym in zip(children, prod.body):
+                lines.append(f"{body}{child} = Node({sym!r})")
+            lines.append(f"{body}node.children = [{', '.join(children)}]")
+            tail = None
+            for j, (child, sym_id) in enumerate(zip(children, prod.body_ids)):
+                if sym_id == n:  # ε
+                    continue
+                if sym_id < n:
+                    if self_tail and sym_id == nt_id and j == len(children) - 1:
+                        tail = child
+                    else:
+                        lines.append(f"{body}{_function_name(sym_id, names[sym_id])}({child})")
+                    continue
+                # 右部以终结符开头时，选中该产生式就说明前看符号正是它，不必再比较
+                if j > 0:
+                    lines.append(f"{body}if las[pos] != {sym_id - n}:")
+                    lines.append(f"{body}    fail_token(pos)")
+                if with_pos:
+                    lines.append(f"{body}{child}.pos = offsets[pos]")
+                lines.append(f"{body}{child}.value = values[pos]")
+                lines.append(f"{body}pos += 1")
+            if tail is not None:
+                lines.append(f"{body}node = {tail}")
+                lines.append(f"{body}continue")
+            elif self_tail:
+                lines.append(f"{body}return")
+        if by_prod:
+            lines.append(f"{indent}else:")
+            indent += "    "
+        lines.append(f"{indent}fail_rule({head!r}, pos)")
+        lines.append("")
+    return lines
+
+
+def generate_parser_source(compiled: CompiledGrammar, key: str = '') -> str:
+    """
+    由冻结的文法与分析表生成递归下降语法分析模块的源代码。
+
+    生成的模块不依赖文法与分析表，只导入 Node，提供：
+      START / END / TERMINAL_IDS / CODE_TERMS: 开始符号、结束符编号、终结符名称 -> 编号、种别码 -> 编号（-1 为无）
+      parse(las, values, fail_rule, fail_token) 与 parse_positions(las, values, offsets, fail_rule, fail_token):
+        las 为各 token 的终结符编号并以 END 结尾，values 为词素序列，offsets 为各 token 的起始偏移量（多一项结束位置）；
+        出错时调用 fail_rule(非终结符, 下标) 或 fail_token(下标)，二者负责抛出异常。
+    每个非终结符对应一个函数，按前看编号 if/elif 选择产生式（冲突格与分析表相同，保留最先填入的产生式）；
+    产生式以自身结尾时（如 StmtList → Stmt StmtList）改为循环，避免长列表导致递归过深。
+    """
+    dense = compiled.dense_table
+    index = dense.index
+    n = index.n_nonterminals
+    start = compiled.start_symbol
+    terminal_ids = {index.names[sid]: sid - n for sid in range(n + 1, len(index.names))}
+    lines = [
+        "# 由 Compilers.ll_parser.core.rd_codegen 根据 LL(1) 分析表自动生成，请勿手动修改",
+        f"# 文法哈希: {key}",
+        "from Compilers.ll_parser.core.parse_tree import Node",
+        "",
+        f"START = {start!r}",
+        f"END = {index.ids['$'] - n}",
+        f"TERMINAL_IDS = {terminal_ids!r}",
+        f"CODE_TERMS = {list(dense.code_terms)!r}",
+        "",
+    ]
+    for func, with_pos in (('parse', False), ('parse_positions', True)):
+        params = "las, values, offsets, fail_rule, fail_token" if with_pos else "las, values, fail_rule, fail_token"
+        lines.append("")
+        lines.append(f"def {func}({params}):")
+        lines.append("    pos = 0")
+        lines.append("")
+        lines.extend(_emit_functions(compiled, with_pos))
+        lines.append(f"    root = Node({start!r})")
+        lines.append(f"    {_function_name(index.ids[start], start)}(root)")
+        lines.append("    if las[pos] != END:")
+        lines.append("        fail_token(pos)")
+        lines.append("    return root")
+        lines.append("")
+    return '\n'.join(lines)
+
+
+_generator_fingerprint: Optional[str] = None
+
+
+def generated_parser_key(cfg_bytes: bytes, start_symbol: str) -> str:
+    """
+    缓存键：文法缓存键（CFG 内容、开始符号、文法处理代码）、本生成器的源代码，
+    再加上写入生成模块 CODE_TERMS 的种别码 -> 终结符表（token_kinds 的登记表改动后重新生成）
+    """
+    global _generator_fingerprint
+    if _generator_fingerprint is None:
+        with open(os.path.abspath(__file__), 'rb') as f:
+            _generator_fingerprint = hashlib.sha256(f.read()).hexdigest()
+    parts = (grammar_cache_key(cfg_bytes, start_symbol), _generator_fingerprint, repr(CODE_TO_TERMINAL))
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+# (CFG 路径, 开始符号) -> 已导入的生成模块
+_loaded: Dict[Tuple[str, str], object] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_generated_parser(cfg_path: str = DEFAULT_CFG_PATH, start_symbol: str = 'Program',
+                          cache_dir: Optional[str] = None):
+    """
+    返回 CFG 文件对应的递归下降语法分析模块。磁盘上已有同一哈希的生成文件时直接导入，
+    否则生成并写入（同一 CFG 的旧文件随之删除）；缓存目录不可写时在内存中执行生成的源代码。
+    每个进程对同一 (CFG, 开始符号) 只导入一次。模块的 CFG_PATH 属性记录来源 CFG 文件（绝对路径）。
+    """
+    cfg_path = os.path.abspath(cfg_path)
+    loaded_key = (os.path.normcase(cfg_path), start_symbol)
+    module = _loaded.get(loaded_key)
+    if module is not None:
+        return module
+    with _loaded_lock:
+        module = _loaded.get(loaded_key)
+        if module is not None:
+            return module
+        with open(cfg_path, 'rb') as f:
+            key = generated_parser_key(f.read(), start_symbol)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(cfg_path), '__pycache__')
+        stem = f"{os.path.basename(cfg_path)}.{start_symbol}."
+        path = os.path.join(cache_dir, f"{stem}{key[:16]}{GENERATED_SUFFIX}")
+        module_name = f"_rd_parser_{key[:16]}"
+        if not os.path.exists(path):
+            source = generate_parser_source(get_compiled_grammar(cfg_path, start_symbol), key)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(source)
+                os.replace(tmp, path)
+                for old in glob.glob(os.path.join(cache_dir, f"{glob.escape(stem)}*{GENERATED_SUFFIX}")):
+                    if old != path:
+                        os.remove(old)
+            except OSError:
+                module = types.ModuleType(module_name)
+                exec(compile(source, f"<{module_name}>", 'exec'), module.__dict__)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        module.CFG_PATH = cfg_path
+        _loaded[loaded_key] = module
+        return module
+
+
+class _SpanLexemes:
+    """按下标从 SpanTokens / TokenBuffer 中切出词素，供生成的模块当作 values 序列使用"""
+    __slots__ = ('lexeme',)
+
+    def __init__(self, spans):
+        self.lexeme = spans.lexeme
+
+    def __getitem__(self, k: int) -> str:
+        return self.lexeme(k)
+
+
+@without_gc
+def parse_generated(tokens, module=None, positions: Optional[TokenPositions] = None,
+                    token_codes: bool = False) -> Node:
+    """
+    用生成的递归下降模块解析 tokens，参数含义与 parse_with_tree 相同，得到的语法树与报错信息也相同。
+    生成的模块每层非终结符占一个 Python 栈帧，嵌套过深（如上百层括号）超出递归深度限制时，
+    改由 parse_with_tree（显式符号栈，没有深度限制）重新解析。
+
+    参数:
+        tokens: (终结符, 词素) 列表；token_codes=True 时为 (种别码, 词素)；也可以是 SpanTokens / TokenBuffer
+        module: load_generated_parser 的返回值，默认为 examples/CFG.txt 对应的模块
+        positions: 可选的 token 位置信息，提供时节点带有 pos，错误信息给出行列号
+    """
+    if module is None:
+        module = load_generated_parser()
+    spans = tokens if isinstance(tokens, (SpanTokens, TokenBuffer)) else None
+    if positions is None and spans is not None:
+        positions = spans.positions
+    n_tokens = len(tokens)
+
+    def text_at(k: int) -> str:
+        if k >= n_tokens:
+            return '$'
+        return spans.lexeme(k) if spans is not None else tokens[k][1]
+
+    def lookahead(k: int) -> str:
+        # 与 parse_with_tree 相同的终结符换算（种别码查不到时按词素兜底，兜底失败时抛出 SyntaxError）
+        if k >= n_tokens:
+            return '$'
+        if spans is None and not token_codes:
+            return tokens[k][0]
+        code = spans.codes[k] if spans is not None else tokens[k][0]
+        term = CODE_TO_TERMINAL[code] if 0 <= code < len(CODE_TO_TERMINAL) else None
+        if term is None:
+            try:
+                term = token_terminal(code, text_at(k))
+            except KeyError:
+                raise SyntaxError(f"Unexpected token '{text_at(k)}' at {where(k)}") from None
+        return term
+
+    def where(k: int) -> str:
+        if positions is not None:
+            return positions.describe(k)
+        return f"position {k}"
+
+    terminal_ids = module.TERMINAL_IDS
+    if spans is not None or token_codes:
+        code_terms = module.CODE_TERMS
+        n_codes = len(code_terms)
+        codes = spans.codes if spans is not None else [code for code, _ in tokens]
+        las = [code_terms[code] if 0 <= code < n_codes else -1 for code in codes]
+        for k, t_id in enumerate(las):
+            if t_id < 0:
+                # 兜底换算出错的 token 保持 -1：解析到这里必然失败，失败时再次换算以抛出同样的 SyntaxError
+                try:
+                    las[k] = terminal_ids.get(lookahead(k), -1)
+                except SyntaxError:
+                    pass
+    else:
+        las = [terminal_ids.get(term, -1) for term, _ in tokens]
+    las.append(module.END)
+    values = _SpanLexemes(spans) if spans is not None else [lexeme for _, lexeme in tokens]
+
+    def fail_rule(head: str, k: int):
+        term = lookahead(k)
+        if positions is not None:
+            raise SyntaxError(f"No rule for ({head}, '{term}') at {where(k)}")
+        raise SyntaxError(f"No rule for ({head}, '{term}')")
+
+    def fail_token(k: int):
+        lookahead(k)
+        raise SyntaxError(f"Unexpected token '{text_at(k)}' at {where(k)}")
+
+    try:
+        if positions is not None:
+            offsets = [positions.offset(k) for k in range(n_tokens + 1)]
+            return module.parse_positions(las, values, offsets, fail_rule, fail_token)
+        return module.parse(las, values, fail_rule, fail_token)
+    except RecursionError:
+        compiled = get_compiled_grammar(module.CFG_PATH, module.START)
+        return parse_with_tree(tokens, compiled, compiled.table, module.START, positions, token_codes)
@@ -0,0 +1,55 @@
+# table_report.py
+# LL(1) 分析表诊断：打印表格规模、密度与冲突明细。
+#   python -m Compilers.ll_parser.core.table_report [CFG 文件] [--start Program] [--summary] [--strict]
+import argparse
+import sys
+from typing import List, Optional
+
+from Compilers.ll_parser.core.grammar_oop import Grammar, load_grammar_from_file
+from Compilers.ll_parser.core.parse_table import TableReport, build_parse_table_report, build_dense_table
+from Compilers.ll_parser.core.compiled_grammar import DEFAULT_CFG_PATH
+
+
+def format_report(report: TableReport, dense_bytes: Optional[int] = None) -> List[str]:
+    """把 TableReport 整理为若干行文本：规模与密度、按类别的冲突数，以及每个冲突格"""
+    lines = [
+        f"非终结符 {report.n_nonterminals}  终结符 {report.n_terminals}（含 $）",
+        f"分析表 {report.cells} 格  非空 {report.filled} 格  密度 {report.density:.1%}",
+    ]
+    if dense_bytes is not None:
+        lines.append(f"稠密表 {dense_bytes} 字节")
+    if report.is_ll1:
+        lines.append("冲突 0 格：文法是 LL(1) 的")
+        return lines
+    kinds = '  '.join(f"{kind} {count}" for kind, count in sorted(report.count_by_kind().items()))
+    lines.append(f"冲突 {len(report.conflicts)} 格：{kinds}")
+    lines.extend(f"  {conflict}" for conflict in report.conflicts)
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="LL(1) 分析表统计与冲突报告")
+    parser.add_argument('cfg', nargs='?', default=DEFAULT_CFG_PATH, help="CFG 文件，默认为 examples/CFG.txt")
+    parser.add_argument('--start', default='Program', help="开始符号")
+    parser.add_argument('--no-lr', action='store_true', help="不消除左递归")
+    parser.add_argument('--no-factor', action='store_true', help="不提取左公因子")
+    parser.add_argument('--summary', action='store_true', help="只打印统计，不列出冲突明细")
+    parser.add_argument('--strict', action='store_true', help="有冲突时以退出码 1 结束")
+    args = parser.parse_args(argv)
+
+    grammar = Grammar()
+    load_grammar_from_file(args.cfg, grammar)
+    grammar.finalize(eliminate_lr=not args.no_lr, left_fact=not args.no_factor, start_symbol=args.start)
+    table, report, _ = build_parse_table_report(grammar, args.start)
+    dense = build_dense_table(grammar, table)
+
+    lines = format_report(report, len(dense) * dense.cells.itemsize)
+    if args.summary:
+        lines = [line for line in lines if not line.startswith('  ')]
+    print(f"文法 {args.cfg}（开始符号 {args.start}）")
+    print('\n'.join(lines))
+    return 1 if args.strict and not report.is_ll1 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,10 @@
-from typing import Dict, List, Tuple, Any
-import os
+from typing import Dict, List, Optional, Tuple, Any
 
-from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals
+from Compilers.lexer.manual_lexer import lexical_analysis
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+from Compilers.lexer.line_index import TokenPositions
 from Compilers.ll_parser.core.ll_main import parse_with_tree
-from Compilers.ll_parser.core.grammar_oop import Grammar, load_grammar_from_file
-from Compilers.ll_parser.core.parse_table import build_parse_table
+from Compilers.ll_parser.core.compiled_grammar import get_compiled_grammar
 from Compilers.ll_parser.core.parse_tree import cst_to_ast
 from Compilers.semantic.semantic_analyzer import run_semantic_analysis
 from Compilers.middle_code.ir_generator import IRBuilder
@@ -15,51 +15,54 @@ class Compiler:
     编译器类，集成词法分析、语法分析、语义分析和中间代码生成
     """
     def __init__(self):
-        # 初始化语法分析相关组件
-        self.grammar = Grammar()
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        cfg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'll_parser', 'examples', 'CFG.txt')
-        load_grammar_from_file(cfg_path, self.grammar)
-        self.grammar.finalize(eliminate_lr=True, left_fact=True)
-        self.table, self.is_ll1, self.terminals = build_parse_table(self.grammar, start_symbol='Program')
+        # 初始化语法分析相关组件：与 Compilers.compiler.Compiler 共用本进程内同一个只读文法与分析表
+        self.compiled = get_compiled_grammar(start_symbol='Program')
+        self.grammar = self.compiled
+        self.table = self.compiled.table
+        self.is_ll1 = self.compiled.is_ll1
+        self.terminals = self.compiled.terminal_list
         
-    def run_lexical_analysis(self, source_code: str, mode: str = '手动') -> Tuple[List, List[str]]:
+    def run_lexical_analysis(self, source_code: str, mode: str = '手动',
+                             with_positions: bool = False) -> Tuple:
         """
         运行词法分析
         
         参数:
             source_code: 源代码
-            mode: 分析模式，'手动'或'自动'
+            mode: 分析模式，'手动'、'DFA'或'自动'
+            with_positions: 是否额外返回 token 位置信息
             
         返回:
             tokens: 词法单元列表
             errors: 错误信息列表
+            positions: 仅当 with_positions 为 True 时返回
         """
         if mode == '手动':
-            return lexical_analysis(source_code)
+            return lexical_analysis(source_code, with_positions)
+        elif mode == 'DFA':
+            return dfa_lexical_analysis(source_code, with_positions)
         else:
-            # 如果需要自动模式，可以在这里添加
-            from Compilers.lexer.auto_lexer import analyze
-            return analyze(source_code)
+            # 自动模式：TokenBuffer 的种别码与手写实现同属 token_kinds 登记表，直接交给语法分析
+            from Compilers.lexer.auto_lexer import LexerWrapper
+            lexer = LexerWrapper()
+            lexer.input(source_code)
+            tokens = lexer.tokens
+            return (tokens, lexer.errors, tokens.positions) if with_positions else (tokens, lexer.errors)
     
-    def run_syntax_analysis(self, tokens: List) -> Tuple[Any, Any]:
+    def run_syntax_analysis(self, tokens: List, positions: Optional[TokenPositions] = None) -> Tuple[Any, Any]:
         """
         运行语法分析
         
         参数:
             tokens: 词法分析得到的词法单元列表
+            positions: 可选的 token 位置信息
             
         返回:
             cst: 具体语法树
             ast: 抽象语法树
         """
-        # 把 tokens 拆成两并行数组
-        terms_only = tokens_to_terminals(tokens)
-        lexemes_only = [lexeme for (_, lexeme) in tokens]
-        term_pairs = list(zip(terms_only, lexemes_only))
-        
-        # 语法分析
-        cst = parse_with_tree(term_pairs, self.grammar, self.table, 'Program')
+        # 语法分析：直接使用 (种别码, 词素)，由解析器按种别码查终结符
+        cst = parse_with_tree(tokens, self.grammar, self.table, 'Program', positions, token_codes=True)
         ast = cst_to_ast(cst)
         
         return cst, ast
@@ -105,8 +108,9 @@ class Compiler:
         result = {}
         
         # 词法分析
-        tokens, lex_errors = self.run_lexical_analysis(source_code, mode)
+        tokens, lex_errors, positions = self.run_lexical_analysis(source_code, mode, with_positions=True)
         result['tokens'] = tokens
+        result['positions'] = positions
         result['lex_errors'] = lex_errors
         
         if lex_errors:
@@ -116,7 +120,7 @@ class Compiler:
         
         try:
             # 语法分析
-            cst, ast = self.run_syntax_analysis(tokens)
+            cst, ast = self.run_syntax_analysis(tokens, positions)
             result['cst'] = cst
             result['ast'] = ast
             
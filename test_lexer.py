@@ -0,0 +1,342 @@
+#test_lexer.py
+import glob
+import io
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from Compilers.lexer.manual_lexer import lexical_analysis, iter_tokens
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+from Compilers.lexer.line_index import LineIndex
+from Compilers.lexer.parallel_lexer import parallel_lexical_analysis, find_split_points
+from Compilers.lexer.incremental_lexer import LexedSource, edit_between
+from Compilers.lexer.batch_lexer import lex_many
+from Compilers.lexer import auto_lexer
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test', 'example')
+
+
+def read_examples():
+    """读取 test/example 下的全部用例源码"""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(EXAMPLE_DIR, '*.txt'))):
+        with open(path, encoding='utf-8') as f:
+            sources.append((os.path.basename(path), f.read()))
+    return sources
+
+
+# 各类边界输入（非法操作符串、未闭合注释/字符串、非 ASCII 字符等）
+EDGE_CASES = [
+    '', 'a', '0x', '0xg', '0x1F', '0912', '00.1e+4', '1+2', '12a_b', '1.2.3',
+    '>==3', 'a=-b', '|&x', '*/', '=/*c*/', 'x /* never closed\n y',
+    "'a'", "'\\n'", "'ab'", "'", "'\\", '"abc"', '""', '"abc\n', '"a\\\nb"',
+    "'\n' /* x", 'é² ½ 中文 x²', '\ufeffint main(){return 0;}', '@#?:',
+]
+
+
+def test_dfa_matches_manual_on_examples():
+    """
+    测试用例：DFA 扫描器与手写词法分析器在 test/example 全部用例上的 token 与错误信息完全一致
+    """
+    for name, source in read_examples():
+        assert dfa_lexical_analysis(source) == lexical_analysis(source), name
+
+
+def test_dfa_matches_manual_on_edge_cases():
+    """
+    测试用例：各类边界输入上 DFA 扫描器与手写词法分析器结果一致
+    """
+    for source in EDGE_CASES:
+        assert dfa_lexical_analysis(source) == lexical_analysis(source), repr(source)
+
+
+def test_line_index():
+    """
+    测试用例：LineIndex 的行列定位与逐次 count 换行的结果一致，且 offset_of 为其逆运算
+    """
+    source = "int a;\n\n  b = 1;\nc\n"
+    index = LineIndex(source)
+    for pos in range(len(source) + 1):
+        line = source.count('\n', 0, pos) + 1
+        col = pos - (source.rfind('\n', 0, pos) + 1) + 1
+        assert index.line_col(pos) == (line, col)
+        assert index.line_of(pos) == line
+        assert index.offset_of(line, col) == pos
+    assert index.line_count() == 5
+
+
+def test_error_lines_with_many_errors():
+    """
+    测试用例：大量错误时每条错误的行号仍然正确
+    """
+    source = "@\n" * 2000
+    for lex in (lexical_analysis, dfa_lexical_analysis):
+        _, errors = lex(source)
+        assert len(errors) == 2000
+        assert errors[0] == '第1行：未识别的符号 "@"'
+        assert errors[-1] == '第2000行：未识别的符号 "@"'
+
+
+def test_iter_tokens_matches_whole_file():
+    """
+    测试用例：流式分块词法分析在任意块大小下与整文件分析的 token 和错误信息一致
+    （单词、字符串、多行注释被块边界切开时状态正确延续）
+    """
+    sources = [source for _, source in read_examples()] + EDGE_CASES
+    sources.append('int a; /* ' + 'long comment\n' * 50 + '*/ a = 0x1F;\n"x\n /* open')
+    for source in sources:
+        expected = lexical_analysis(source)
+        for chunk_size in (1, 2, 3, 7, 64, 1 << 16):
+            errors = []
+            tokens = list(iter_tokens(io.StringIO(source), chunk_size=chunk_size, errors=errors))
+            assert (tokens, errors) == expected, (source[:40], chunk_size)
+        # 二进制文件按 UTF-8 增量解码，多字节字符可能被切开
+        errors = []
+        tokens = list(iter_tokens(io.BytesIO(source.encode('utf-8')), chunk_size=5, errors=errors))
+        assert (tokens, errors) == expected
+
+
+def test_iter_tokens_long_line_in_small_chunks(monkeypatch):
+    """
+    测试用例：1 MB 的单行（长字符串、长单行注释、长标识符、普通语句）按小块读入，
+    结果与整文件分析相同，且重新扫描的总长度与输入长度成正比
+    """
+    from Compilers.lexer import dfa_lexer
+    scan = dfa_lexer._scan
+    scanned = [0]
+
+    def counting_scan(source_code, i, n, *args, **kwargs):
+        scanned[0] += n - i
+        return scan(source_code, i, n, *args, **kwargs)
+
+    monkeypatch.setattr(dfa_lexer, '_scan', counting_scan)
+    size = 1 << 20
+    for line in ('s = "' + 'x' * size + '";', 'a; // ' + 'x' * size, 'v' * size + ' = 1;',
+                 'a = b + 1; ' * (size // 11)):
+        source = 'int a;\n' + line + '\n"x\n'
+        scanned[0] = 0
+        errors = []
+        tokens = list(iter_tokens(io.StringIO(source), chunk_size=256, errors=errors))
+        assert scanned[0] < 4 * len(source)
+        assert (tokens, errors) == lexical_analysis(source)
+
+
+def test_auto_master_regex():
+    """
+    测试用例：自动词法分析的主正则 finditer 扫描与 re.Scanner 结果一致，
+    且占有型量词不再把合法的浮点数/字符串/字符常量切碎
+    """
+    for name, source in read_examples():
+        legacy, rest = auto_lexer.scanner.scan(source)
+        assert not rest and list(auto_lexer.scan(source)) == legacy, name
+
+    tokens, errors = auto_lexer.analyze('x = 1e5 + 2.5e-3; s = "abc"; c = \'a\';')
+    assert not errors
+    assert [(code, lexeme) for code, lexeme, _ in tokens if code in (47, 48, 49)] == [
+        (47, '1e5'), (47, '2.5e-3'), (48, '"abc"'), (49, "'a'")]
+
+    tokens, errors = auto_lexer.analyze('a /* b /* c')
+    assert [lexeme for _, lexeme, _ in tokens] == ['a']
+    assert errors == ["多行注释未闭合 '/*'"]
+
+
+def test_auto_analyze_is_reentrant():
+    """
+    测试用例：多线程并发调用 analyze，每次调用的 token 与错误信息互不干扰，
+    且先前返回的错误列表不会被之后的调用改写
+    """
+    sources = [source for _, source in read_examples()]
+    sources += [f"int v{k} = {k}a; x = @{'+' * (k % 5)};" for k in range(40)]
+    expected = [auto_lexer.analyze(source) for source in sources]
+
+    jobs = sources * 20
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(auto_lexer.analyze, jobs))
+    for k, result in enumerate(results):
+        assert result == expected[k % len(sources)]
+
+    _, first_errors = auto_lexer.analyze('@')
+    auto_lexer.analyze('x = 1;')
+    assert first_errors == ["非法字符 '@'"]
+
+
+def test_auto_token_buffer():
+    """
+    测试用例：自动词法分析的列式 token 缓冲与 analyze 结果一致，token() 逐个返回视图对象
+    """
+    source = 'int main() { x = 0x1F + 2.5; s = "hi"; @ }'
+    lexer = auto_lexer.LexerWrapper()
+    lexer.input(source)
+    buffer = lexer.tokens
+    assert (buffer.codes.typecode, buffer.starts.typecode, buffer.lengths.typecode) == ('H', 'I', 'I')
+
+    tokens, _ = auto_lexer.analyze(source)
+    assert buffer.as_tuples() == tokens
+    views = []
+    while True:
+        tok = lexer.token()
+        if tok is None:
+            break
+        views.append(tok)
+    assert [(t.type_code, t.value, t.type) for t in views] == tokens
+    assert all(source[t.start:t.start + len(t.value)] == t.value for t in views)
+    assert not hasattr(views[0], '__dict__')
+
+
+def test_span_tokens_materialize_lazily():
+    """
+    测试用例：spans 模式只保存种别码与区间，按需切出的词素与普通模式完全一致
+    """
+    for source in [source for _, source in read_examples()] + EDGE_CASES:
+        tokens, errors, positions = lexical_analysis(source, with_positions=True)
+        spans, span_errors = dfa_lexical_analysis(source, spans=True)
+        assert span_errors == errors
+        assert len(spans) == len(tokens)
+        assert list(spans.positions.starts) == list(positions.starts)
+        assert spans.materialize() == tokens, repr(source[:40])
+
+
+def test_lex_mmap_file(tmp_path):
+    """
+    测试用例：mmap 映射的文件无需读成 str 即可词法分析（自动分析器直接扫描字节，手写分析器流式解码）
+    """
+    source = 'int main() { char c = \'é\'; s = "中文"; x = 1.5e3 @ ² }\n/* 注释'
+    path = tmp_path / 'source.c'
+    path.write_bytes(source.encode('utf-8'))
+
+    tokens, errors = auto_lexer.analyze_file(str(path))
+    assert not isinstance(tokens.source, str)
+    assert (tokens.as_tuples(), errors) == auto_lexer.analyze(source)
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        errors = []
+        assert list(iter_tokens(mapped, chunk_size=16, errors=errors)) == lexical_analysis(source)[0]
+        assert errors == lexical_analysis(source)[1]
+
+
+def test_keyword_table():
+    """关键字改为切出标识符后查表：手写与自动词法分析的种别码均保持不变"""
+    from Compilers.lexer.manual_lexer import keywords, identifier_code
+    source = ' '.join(keywords) + ' mainx _int intx'
+    tokens, errors = lexical_analysis(source)
+    assert not errors
+    assert tokens == [(keywords[w], w) for w in keywords] + [
+        (identifier_code, 'mainx'), (identifier_code, '_int'), (identifier_code, 'intx')]
+
+    tokens, errors = auto_lexer.analyze('int main intx if 0xgfor 0xgdo do')
+    assert tokens == [
+        (keywords['int'], 'int', 'KEYWORD'), (identifier_code, 'main', 'IDENTIFIER'),
+        (identifier_code, 'intx', 'IDENTIFIER'), (keywords['if'], 'if', 'KEYWORD'),
+        (0, '0xg', 'INVALID_HEX'), (keywords['for'], 'for', 'KEYWORD'),
+        (0, '0xg', 'INVALID_HEX'), (identifier_code, 'do', 'IDENTIFIER'), (64, 'do', 'KEYWORD')]
+    assert errors == ["INVALID_HEX 错误: '0xg'"] * 2
+    assert 'int' in auto_lexer.KEYWORD_TABLE and 'intx' not in auto_lexer.KEYWORD_TABLE
+    # 两个词法分析器各有一张表：extra_keywords 只在自动词法分析中是关键字
+    from Compilers.lexer.manual_lexer import KEYWORD_TABLE
+    assert 'do' in auto_lexer.KEYWORD_TABLE and 'do' not in KEYWORD_TABLE
+
+
+def test_auto_codes_match_manual():
+    """自动与手写词法分析共用 token_kinds 的种别码，自动模式的 TokenBuffer 可直接交给语法分析"""
+    from Compilers.compiler import Compiler
+    from Compilers.lexer import token_kinds as kinds
+    by_kind = {'KEYWORD': kinds.keywords, 'OPERATOR': kinds.operators, 'DELIMITER': kinds.delimiter}
+    fixed = {'IDENTIFIER': kinds.identifier_code, 'INTEGER': kinds.integer_code, 'FLOAT': kinds.float_code,
+             'STRING': kinds.string_code, 'CHAR': kinds.char_code}
+    for _, source in read_examples():
+        for code, lexeme, kind in auto_lexer.analyze(source)[0]:
+            if kind in by_kind:
+                assert code == by_kind[kind].get(lexeme, 0) or code == kinds.extra_keywords.get(lexeme)
+            elif kind in fixed:
+                assert code == fixed[kind]
+
+    compiler = Compiler()
+    for name, source in read_examples():
+        if '语法' not in name:
+            continue
+        tokens, errors, positions = compiler.run_lexical_analysis(source, '自动', with_positions=True)
+        assert isinstance(tokens, auto_lexer.TokenBuffer) and not errors
+        assert [tuple(token) for token in tokens] == lexical_analysis(source)[0]
+        assert list(positions.starts) == list(lexical_analysis(source, with_positions=True)[2].starts)
+        assert compiler.compile(source, '自动')['quads'] == compiler.compile(source)['quads']
+
+
+def test_parallel_matches_serial():
+    """并行词法分析在任意切分下与串行结果一致（含切分点落在注释、字符串内的回退）"""
+    sources = [src for _, src in read_examples()] + EDGE_CASES
+    sources.append("x = '\n';\n" + "int a;\n" * 10 + "/* 未闭合\n注释\n")
+    sources.append("a */* b\n*/ c;\n" * 20)
+    with ThreadPoolExecutor(4) as executor:
+        for source in sources:
+            expected = lexical_analysis(source)
+            for workers in (2, 3, 8):
+                for min_chunk in (1, 16):
+                    assert parallel_lexical_analysis(source, workers, executor, min_chunk) == expected, source
+
+    # 字符串遇到未转义的换行即结束，反斜杠续行的换行不能作为切分点
+    source = "/* a\nb */ s = \"x\\\ny\";\n// c\nint z;\n"
+    for point in find_split_points(source, 4, 1):
+        assert source[point - 1] == '\n'
+    assert find_split_points(source, 4, 1) == [22, 27]
+
+    big = "\n".join(src for _, src in read_examples()) * 20
+    assert parallel_lexical_analysis(big, workers=2, min_chunk=1 << 12) == lexical_analysis(big)
+
+
+def test_incremental_edit_matches_full_relex():
+    """增量词法分析：每次修改后的 token、位置与错误信息都与对全文重新分析相同"""
+    edits = ['', 'x', ' ', '\n', '/*', '*/', '"', "'", '+', '=', '1e', '//', 'int ']
+    for _, source in read_examples()[:3]:
+        lexed = LexedSource.from_source(source)
+        for k in range(60):
+            start = (k * 7919) % (len(lexed.source) + 1)
+            old_len = min(k % 3, len(lexed.source) - start)
+            lexed = lexed.edit(start, old_len, edits[k % len(edits)])
+            tokens, errors, positions = lexical_analysis(lexed.source, with_positions=True)
+            assert lexed.tokens == tokens and lexed.errors == errors
+            assert lexed.positions.starts == positions.starts and lexed.positions.ends == positions.ends
+
+    # 修改点位于可延续 token 词尾之后 0、1、2 个字符处（如 'a<' -> 'a<='、'&<' -> '&<|'）
+    for source in ("a<", "a&<", "b & <", "x+-", "y / *", "z<<", "1.5e"):
+        for start in range(len(source) + 1):
+            for text in ('=', '|', '*', '-', '5'):
+                lexed = LexedSource.from_source(source).edit(start, 0, text)
+                tokens, errors, positions = lexical_analysis(lexed.source, with_positions=True)
+                assert lexed.tokens == tokens and lexed.errors == errors
+                assert lexed.positions.ends == positions.ends
+
+    # 修改之后的错误保持原偏移量平移，行号按新的源代码计算
+    lexed = LexedSource.from_source("int a;\nx = 12a;\n")
+    lexed = lexed.edit(0, 0, "\n\n")
+    assert lexed.errors == ['第4行：数字格式无效 "12a"']
+    assert edit_between("int a = 1;", "int ab = 12;") == (5, 4, "b = 12")
+
+
+def test_lex_many_matches_per_call():
+    """批量词法分析：每段的 tokens 与错误信息都与逐段调用 lexical_analysis 相同"""
+    snippets = [line for _, source in read_examples() for line in source.splitlines()]
+    snippets += ['', '\ufeffint a;', 'x = 12a;', '/* 未闭合', '"abc', "'a"]
+    expected = [lexical_analysis(snippet) for snippet in snippets]
+    batch = lex_many(snippets)
+    assert len(batch) == len(snippets) and list(batch) == expected
+    with ThreadPoolExecutor(2) as executor:
+        pooled = lex_many(snippets, executor, batch_size=7)
+    assert list(pooled) == expected and pooled.token_offsets == batch.token_offsets
+
+
+if __name__ == "__main__":
+    test_dfa_matches_manual_on_examples()
+    test_dfa_matches_manual_on_edge_cases()
+    test_line_index()
+    test_error_lines_with_many_errors()
+    test_iter_tokens_matches_whole_file()
+    test_auto_master_regex()
+    test_auto_analyze_is_reentrant()
+    test_auto_token_buffer()
+    test_span_tokens_materialize_lazily()
+    test_keyword_table()
+    test_auto_codes_match_manual()
+    test_parallel_matches_serial()
+    test_incremental_edit_matches_full_relex()
+    test_lex_many_matches_per_call()
+    print("ok")
@@ -0,0 +1,516 @@
+#test_parser.py
+import multiprocessing
+import os
+import random
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from Compilers.compiler import Compiler
+from Compilers.lexer.manual_lexer import lexical_analysis, tokens_to_terminals
+from Compilers.lexer.dfa_lexer import dfa_lexical_analysis
+from Compilers.lexer import auto_lexer
+from Compilers.ll_parser.core.ll_main import parse_with_tree
+from Compilers.ll_parser.core.parse_tree import print_tree, ERROR_LABEL
+from Compilers.ll_parser.core.grammar_cache import (
+    load_or_build, build_compiled, grammar_cache_key, CACHE_SUFFIX,
+)
+from Compilers.ll_parser.core.compiled_grammar import get_compiled_grammar, DEFAULT_CFG_PATH
+from Compilers.ll_parser.core.grammar_oop import Grammar, clear_transform_cache
+from Compilers.ll_parser.core.parse_table import build_dense_table, build_parse_table, build_parse_table_report
+from Compilers.ll_parser.core import table_report, rd_codegen
+from Compilers.ll_parser.core.rd_codegen import load_generated_parser, parse_generated, GENERATED_SUFFIX
+from Compilers.ll_parser.core.first_follow import (
+    compute_first, compute_follow, compute_first_fixpoint, compute_follow_fixpoint, build_grammar_sets,
+)
+from Compilers.bench_parser import synthetic_grammar
+
+compiler = Compiler()
+
+
+def test_syntax_error_reports_line_and_column():
+    """
+    测试用例：语法错误信息给出真实的行列号，而不是 token 序号
+    """
+    source = "int main()\n{\n    int x = 1\n    return x;\n}\n"
+    result = compiler.compile(source)
+    assert result['status'] == 'failed'
+    assert 'line 4, column 5' in result['error']
+    assert result['error'].splitlines()[1:] == result['syntax_errors']
+
+
+def test_nodes_carry_source_offsets():
+    """
+    测试用例：CST/AST 节点携带源代码偏移量，可换算为行列
+    """
+    source = "int main()\n{\n    int x = 1;\n    return x;\n}\n"
+    tokens, errors, positions = lexical_analysis(source, with_positions=True)
+    assert not errors and len(positions) == len(tokens)
+    cst, ast = compiler.run_syntax_analysis(tokens, positions)
+
+    leaves = []
+    def collect(node):
+        if node.is_leaf() and node.value is not None:
+            leaves.append(node)
+        for child in node.children:
+            collect(child)
+    collect(cst)
+    assert [leaf.value for leaf in leaves] == [lexeme for _, lexeme in tokens]
+    for leaf in leaves:
+        assert source[leaf.pos:leaf.pos + len(leaf.value)] == leaf.value
+    assert ast.pos == 0
+    x_decl = next(leaf for leaf in leaves if leaf.value == 'x')
+    assert positions.line_index.line_col(x_decl.pos) == (3, 9)
+
+
+def test_token_codes_mode_matches_terminal_pairs(capsys):
+    """
+    测试用例：解析器直接接收 (种别码, 词素) 时，得到的语法树与先转换为 (终结符, 词素) 时相同
+    """
+    source = "int main()\n{\n    int i;\n    for (i = 0; i < 10; i++) { write(i % 3); }\n    return 0;\n}\n"
+    tokens, errors = lexical_analysis(source)
+    assert not errors
+    pairs = list(zip(tokens_to_terminals(tokens), [lexeme for _, lexeme in tokens]))
+
+    print_tree(parse_with_tree(pairs, compiler.grammar, compiler.table, 'Program'))
+    expected = capsys.readouterr().out
+    print_tree(parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', token_codes=True))
+    assert capsys.readouterr().out == expected
+
+    # 区间 token：词素在写入 Node.value 时才切出
+    spans, _ = dfa_lexical_analysis(source, spans=True)
+    print_tree(parse_with_tree(spans, compiler.grammar, compiler.table, 'Program'))
+    assert capsys.readouterr().out == expected
+
+
+def test_grammar_cache_round_trip(tmp_path):
+    """
+    测试用例：文法与分析表写入磁盘缓存后再读出，与直接构建的结果完全相同
+    """
+    cfg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'll_parser', 'examples', 'CFG.txt')
+    built = build_compiled(cfg_path, 'Program')
+    first = load_or_build(cfg_path, cache_dir=str(tmp_path))
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith(CACHE_SUFFIX)
+    cached = load_or_build(cfg_path, cache_dir=str(tmp_path))
+
+    for grammar, table, is_ll1, terminals, sets in (first, cached):
+        assert repr(grammar) == repr(built[0])
+        assert list(grammar.productions) == list(built[0].productions)
+        assert grammar.nonterminals == built[0].nonterminals and grammar.terminals == built[0].terminals
+        assert {key: repr(prod) for key, prod in table.items()} == {key: repr(prod) for key, prod in built[1].items()}
+        assert is_ll1 == built[2] and terminals == built[3]
+        assert (sets.first, sets.follow, sets.item_first) == (built[4].first, built[4].follow, built[4].item_first)
+        assert sets.offsets == built[4].offsets
+    # 分析表中的产生式就是文法中的产生式对象
+    grammar, table = cached[0], cached[1]
+    assert all(any(prod is p for p in grammar.productions[head]) for (head, _), prod in table.items())
+
+    # 选项不同则缓存键不同；损坏的缓存文件视为未命中
+    with open(cfg_path, 'rb') as f:
+        cfg_bytes = f.read()
+    assert grammar_cache_key(cfg_bytes, 'Program') != grammar_cache_key(cfg_bytes, 'Program', left_fact=False)
+    (tmp_path / files[0]).write_bytes(b'broken')
+    assert repr(load_or_build(cfg_path, cache_dir=str(tmp_path))[0]) == repr(built[0])
+
+    # 其他选项的缓存与之共存；写入新缓存只清理同一配置的旧版本
+    load_or_build(cfg_path, left_fact=False, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2
+    outdated = files[0].replace(CACHE_SUFFIX, '0' + CACHE_SUFFIX)
+    os.replace(tmp_path / files[0], tmp_path / outdated)
+    load_or_build(cfg_path, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2 and files[0] in os.listdir(tmp_path)
+
+    # 旧格式（文件名只有 CFG 文件名与哈希）的缓存在写入新缓存时删除
+    (tmp_path / f"CFG.txt.{'0' * 16}{CACHE_SUFFIX}").write_bytes(b'old')
+    os.remove(tmp_path / files[0])
+    load_or_build(cfg_path, cache_dir=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 2 and files[0] in os.listdir(tmp_path)
+
+
+def _shared_grammar_id(_):
+    # 在 fork 出的子进程中执行：返回子进程看到的共享文法对象的地址
+    from Compilers.ll_parser.core.compiled_grammar import get_compiled_grammar
+    return id(get_compiled_grammar())
+
+
+def test_compiled_grammar_is_shared_and_frozen():
+    """
+    测试用例：所有 Compiler 实例共用同一个只读 CompiledGrammar，fork 出的子进程直接继承而不重新构建
+    """
+    from Compilers.object_code.compiler import Compiler as ObjectCompiler
+    shared = get_compiled_grammar()
+    assert Compiler().grammar is shared and ObjectCompiler().grammar is shared
+    assert compiler.table is shared.table
+
+    assert isinstance(shared.nonterminals, frozenset) and isinstance(shared.terminal_list, tuple)
+    assert all(isinstance(p.body, tuple) for p in shared.all_prods())
+    prod = shared.productions['Program'][0]
+    index, dense, sets = shared.symbol_index, shared.dense_table, shared.sets
+    assert dense.index is index and sets.index is index and all(p is q for p, q in zip(dense.prods, shared.all_prods()))
+    for mutate in (lambda: setattr(shared, 'is_ll1', False),
+                   lambda: shared.table.__setitem__(('Program', '$'), None),
+                   lambda: shared.productions.pop('Program'),
+                   # 嵌套对象同样只读：产生式、符号编号、稠密表与 FIRST/FOLLOW
+                   lambda: setattr(prod, 'body', ()),
+                   lambda: setattr(prod, 'head_id', 0),
+                   lambda: delattr(prod, 'head'),
+                   lambda: index.names.append('x'),
+                   lambda: index.ids.__setitem__('x', 0),
+                   lambda: setattr(index, 'n_nonterminals', 0),
+                   lambda: dense.cells.__setitem__(0, 0),
+                   lambda: dense.code_terms.__setitem__(0, 0),
+                   lambda: setattr(dense, 'pushes', ()),
+                   lambda: sets.offsets.__setitem__(0, 0),
+                   lambda: setattr(sets, 'first', ())):
+        try:
+            mutate()
+        except (AttributeError, TypeError):
+            pass
+        else:
+            raise AssertionError("CompiledGrammar 被修改")
+    built = build_compiled(DEFAULT_CFG_PATH, 'Program')
+    assert repr(shared) == repr(built[0])
+    assert list(dense.cells) == list(build_dense_table(built[0], built[1]).cells)
+    assert sets.names(sets.follow[index.ids['Program']]) == built[4].names(built[4].follow[index.ids['Program']])
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            assert set(pool.map(_shared_grammar_id, range(4))) == {id(shared)}
+
+
+def test_first_follow_matches_fixpoint():
+    """
+    测试用例：依赖图 + 位集的 FIRST/FOLLOW 与朴素固定点迭代结果相同（含左递归、ε 产生式与环）
+    """
+    grammars = [build_compiled(DEFAULT_CFG_PATH, 'Program')[0], synthetic_grammar(500, seed=1)]
+    rng = random.Random(0)
+    for _ in range(200):
+        g = Grammar()
+        heads = [f'N{k}' for k in range(rng.randint(1, 6))]
+        for head in heads:
+            for _ in range(rng.randint(1, 3)):
+                g.add_prod(head, [rng.choice(heads + ['a', 'b', 'ε']) for _ in range(rng.randint(0, 3))])
+        g.finalize(eliminate_lr=False, left_fact=False)
+        grammars.append(g)
+    for g in grammars:
+        start = next(iter(g.productions))
+        first = compute_first(g)
+        assert first == compute_first_fixpoint(g)
+        assert compute_follow(g, first, start) == compute_follow_fixpoint(g, first, start)
+
+
+def test_symbol_index_after_finalize():
+    """
+    测试用例：finalize 为符号分配稠密整数编号，产生式同时保存整数形式，名称仍可用于打印
+    """
+    grammar = build_compiled(DEFAULT_CFG_PATH, 'Program')[0]
+    index = grammar.symbol_index
+    n = index.n_nonterminals
+    assert index.names[:n] == list(grammar.productions) and index.names[n:n + 2] == ['ε', '$']
+    assert set(index.names[n + 2:]) == grammar.terminals
+    for prod in grammar.all_prods():
+        assert index.names[prod.head_id] == prod.head
+        assert isinstance(prod.body_ids, tuple) and [index.names[sid] for sid in prod.body_ids] == prod.body
+    assert index.terminal_names(index.terminal_mask({'ID', ';', '$'})) == {'ID', ';', '$'}
+
+    # 共享的 CompiledGrammar 保留同样的编号；之后再添加产生式则重新编号
+    shared = get_compiled_grammar()
+    assert list(shared.symbol_index.names) == index.names
+    assert [p.body_ids for p in shared.all_prods()] == [p.body_ids for p in grammar.all_prods()]
+    grammar.add_prod('Extra', ['ID'])
+    assert grammar.symbol_index is None and grammar.index_symbols().ids['Extra'] == n
+
+
+def test_dense_table_matches_dict_table(capsys):
+    """
+    测试用例：稠密分析表的每一格与字典分析表一致，整数快速路径得到的语法树与报错信息与字典查表相同
+    """
+    grammar, table, _, _, _ = build_compiled(DEFAULT_CFG_PATH, 'Program')
+    dense = build_dense_table(grammar, table)
+    index = dense.index
+    n = index.n_nonterminals
+    assert len(dense) == n * dense.n_terms
+    for nt_id in range(n):
+        for t_id in range(dense.n_terms):
+            prod = table.get((index.names[nt_id], index.names[n + t_id]))
+            k = dense.lookup(nt_id, t_id)
+            assert (dense.prods[k] if k >= 0 else None) is prod
+
+    source = "int main()\n{\n    int i;\n    while (i < 10) { i = i + 1; }\n    return 0;\n}\n"
+    tokens, _, positions = lexical_analysis(source, with_positions=True)
+    slow = dict(compiler.table)
+    print_tree(parse_with_tree(tokens, compiler.grammar, slow, 'Program', positions, token_codes=True))
+    expected = capsys.readouterr().out
+    print_tree(parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True))
+    assert capsys.readouterr().out == expected
+
+    broken = tokens[:9] + tokens[10:]
+    messages = []
+    for table_arg in (slow, compiler.grammar.dense_table):
+        try:
+            parse_with_tree(broken, compiler.grammar, table_arg, 'Program', token_codes=True)
+        except SyntaxError as e:
+            messages.append(str(e))
+    assert len(messages) == 2 and messages[0] == messages[1]
+
+
+def test_left_factoring_extracts_longest_prefix():
+    """
+    测试用例：左公因子一次提取整组的最长公共前缀，只在前缀之后仍有分叉时才再引入新的非终结符；
+    空右部与 ε 右部原样保留
+    """
+    g = Grammar()
+    for body in (['a', 'b', 'c', 'X'], ['d'], ['a', 'b', 'c', 'Y'], ['a', 'b', 'Z'], [], ['ε']):
+        g.add_prod('A', body)
+    g.finalize(eliminate_lr=False)
+    assert {head: [p.body for p in prods] for head, prods in g.productions.items()} == {
+        'A': [['a', 'b', "A'"], ['d'], [], ['ε']],
+        "A'": [['c', "A''"], ['Z']],
+        "A''": [['X'], ['Y']],
+    }
+    assert g.nonterminals == {'A', "A'", "A''"} and g.terminals == {'a', 'b', 'c', 'd', 'X', 'Y', 'Z'}
+
+
+def test_indirect_left_recursion_and_useless_symbols():
+    """
+    测试用例：间接左递归按非终结符顺序代入后消除；推导不出终结符串与不可达的非终结符被删除；
+    同一文法再次 finalize 时命中变换缓存，结果相同
+    """
+    def build():
+        g = Grammar()
+        for head, body in (('S', ['A', 'a']), ('S', ['b']), ('A', ['A', 'c']), ('A', ['S', 'd']), ('A', ['e']),
+                           ('S', ['D', 'a']), ('D', ['D', 'x']), ('B', ['y'])):
+            g.add_prod(head, body)
+        return g
+
+    expected = {
+        'S': [['A', 'a'], ['b']],
+        'A': [['b', 'd', "A'"], ['e', "A'"]],
+        "A'": [['c', "A'"], ['a', 'd', "A'"], ['ε']],
+    }
+    clear_transform_cache()
+    for _ in range(2):
+        g = build()
+        g.finalize(left_fact=False)
+        assert {head: [p.body for p in prods] for head, prods in g.productions.items()} == expected
+        assert g.nonterminals == {'S', 'A', "A'"} and g.terminals == {'a', 'b', 'c', 'd', 'e'}
+
+
+def test_conflict_report_classifies_conflicts(capsys):
+    """
+    测试用例：分析表冲突报告列出非终结符、终结符与竞争的产生式，并区分 FIRST/FIRST 与 FIRST/FOLLOW；
+    表中保留最先填入的产生式，与 build_parse_table 相同
+    """
+    g = Grammar()
+    for head, body in (('S', ['A', 'b']), ('S', ['a', 'c']), ('A', ['a']), ('A', ['b', 'A']), ('A', ['ε'])):
+        g.add_prod(head, body)
+    g.finalize(left_fact=False)
+    table, report, _ = build_parse_table_report(g, 'S')
+    assert not report.is_ll1 and report.filled == len(table) and report.cells == 2 * 4
+    summary = [(c.nonterminal, c.terminal, [repr(p) for p in c.productions], c.kind) for c in report.conflicts]
+    assert summary == [
+        ('S', 'a', ['S → A b', 'S → a c'], 'FIRST/FIRST'),
+        ('A', 'b', ['A → b A', 'A → ε'], 'FIRST/FOLLOW'),
+    ]
+    assert repr(table[('S', 'a')]) == 'S → A b'
+    # 不带诊断的 build_parse_table 填出同一张表，冲突时只给出 is_ll1 = False
+    plain, is_ll1, _ = build_parse_table(g, 'S')
+    assert list(plain.items()) == list(table.items()) and is_ll1 is False
+
+    # 命令行：打印规模、密度与冲突数，--strict 时有冲突返回 1
+    assert table_report.main(['--summary']) == 0
+    out = capsys.readouterr().out
+    assert '密度' in out and '冲突' in out
+    assert table_report.main([DEFAULT_CFG_PATH, '--strict']) == (0 if compiler.is_ll1 else 1)
+
+
+def test_generated_parser_matches_table_parser(tmp_path, capsys, monkeypatch):
+    """
+    测试用例：由分析表生成的递归下降模块写入 CFG 旁的缓存目录；它得到的语法树（含 pos）与报错信息
+    都与 parse_with_tree 相同
+    """
+    cfg_path = str(tmp_path / 'CFG.txt')
+    shutil.copy(DEFAULT_CFG_PATH, cfg_path)
+    module = load_generated_parser(cfg_path)
+    assert load_generated_parser(cfg_path) is module
+    generated = [name for name in os.listdir(tmp_path / '__pycache__') if name.endswith(GENERATED_SUFFIX)]
+    assert len(generated) == 1 and module.START == 'Program'
+    # 生成模块写入了 CODE_TERMS，种别码登记表变化时缓存键随之变化
+    with open(cfg_path, 'rb') as f:
+        cfg_bytes = f.read()
+    key = rd_codegen.generated_parser_key(cfg_bytes, 'Program')
+    monkeypatch.setattr(rd_codegen, 'CODE_TO_TERMINAL', rd_codegen.CODE_TO_TERMINAL + ['ID'])
+    assert rd_codegen.generated_parser_key(cfg_bytes, 'Program') != key
+    monkeypatch.undo()
+
+    source = "int main()\n{\n    int i;\n    while (i < 10) { i = i + 1; write(i); }\n    return 0;\n}\n"
+    tokens, _, positions = lexical_analysis(source, with_positions=True)
+    expected = parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True)
+    tree = parse_generated(tokens, module, positions, token_codes=True)
+    print_tree(expected)
+    printed = capsys.readouterr().out
+    print_tree(tree)
+    assert capsys.readouterr().out == printed
+    assert [leaf.pos for leaf in _leaves(tree)] == [leaf.pos for leaf in _leaves(expected)]
+
+    broken = tokens[:9] + tokens[10:]
+    messages = []
+    for parse in (lambda: parse_with_tree(broken, compiler.grammar, compiler.table, 'Program', token_codes=True),
+                  lambda: parse_generated(broken, module, token_codes=True)):
+        try:
+            parse()
+        except SyntaxError as e:
+            messages.append(str(e))
+    assert len(messages) == 2 and messages[0] == messages[1]
+
+    # 嵌套过深超出递归深度限制时改由表驱动解析，得到的语法树与错误信息仍然相同
+    for body in ("a = " + "(" * 200 + "1" + ")" * 200 + ";", "a = " + "(" * 200 + "1" + ")" * 199 + ";"):
+        source = "int main()\n{\n    int a;\n    " + body + "\n}\n"
+        tokens, _, positions = lexical_analysis(source, with_positions=True)
+        outputs = []
+        for parse in (lambda: parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions,
+                                              token_codes=True),
+                      lambda: parse_generated(tokens, module, positions, token_codes=True)):
+            try:
+                outputs.append(_preorder(parse()))
+            except SyntaxError as e:
+                outputs.append(str(e))
+        assert outputs[0] == outputs[1]
+
+
+def _preorder(root):
+    # 非递归的先序遍历：(标签, 值, pos, 子节点数) 序列，用于比较很深的语法树
+    result, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        result.append((node.label, node.value, node.pos, len(node.children)))
+        stack.extend(reversed(node.children))
+    return result
+
+
+def test_item_first_matches_sequence_first():
+    """
+    测试用例：每个 (产生式, 点位置) 预先算好的后缀 FIRST / 可空性 / 向前看集合，
+    与按字符串集合逐符号求后缀 FIRST 的结果相同；共享文法中的 GrammarSets 与 dense_table 的产生式下标一致
+    """
+    for grammar, start in ((build_compiled(DEFAULT_CFG_PATH, 'Program')[0], 'Program'),
+                           (synthetic_grammar(500, seed=2), 'N0')):
+        sets = build_grammar_sets(grammar, start)
+        firsts = compute_first_fixpoint(grammar)
+        follows = compute_follow_fixpoint(grammar, firsts, start)
+        for k, prod in enumerate(grammar.all_prods()):
+            for dot in range(len(prod.body) + 1):
+                expected = _sequence_first(prod.body[dot:], grammar, firsts)
+                assert sets.names(sets.first_at(k, dot)) == expected
+                assert sets.nullable_at(k, dot) == ('ε' in expected)
+                lookahead = (expected - {'ε'}) | follows[prod.head] if 'ε' in expected else expected
+                assert sets.names(sets.lookahead_at(k, prod.head_id, dot)) == lookahead
+
+    shared = get_compiled_grammar()
+    sets = shared.sets
+    assert len(sets.offsets) == len(shared.dense_table.prods) + 1
+    for k, prod in enumerate(shared.dense_table.prods):
+        assert sets.offsets[k + 1] - sets.offsets[k] == len(prod.body) + 1
+
+
+def _sequence_first(seq, grammar, firsts):
+    result = set()
+    for sym in seq:
+        if sym == 'ε':
+            continue
+        if sym not in grammar.nonterminals:
+            return result | {sym}
+        result |= firsts[sym] - {'ε'}
+        if 'ε' not in firsts[sym]:
+            return result
+    return result | {'ε'}
+
+
+def test_error_recovery_reports_all_errors(capsys):
+    """
+    测试用例：传入 errors 列表时一遍报告全部语法错误（第一个与抛出的 SyntaxError 相同），
+    返回的 CST 在出错处带有 error 节点且保留全部 token；正确输入的结果与不做错误恢复时相同
+    """
+    source = ("int main()\n{\n    int n;\n    n = read()\n    int i, j;\n    i = i + * 2;\n"
+              "    while (i < ) { i = i + 1; }\n    return 0\n}\n")
+    tokens, _, positions = lexical_analysis(source, with_positions=True)
+    errors = []
+    cst = parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True,
+                          errors=errors)
+    assert [e.split(' at ')[-1] for e in errors] == [
+        'line 5, column 5', 'line 6, column 13', 'line 7, column 16', 'line 9, column 1']
+    try:
+        parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True)
+        assert False
+    except SyntaxError as e:
+        assert str(e) == errors[0]
+    leaves = _leaves(cst)
+    assert [leaf.value for leaf in leaves if leaf.value is not None] == [lexeme for _, lexeme in tokens]
+    assert sum(leaf.label == ERROR_LABEL for leaf in leaves) >= 1
+    assert any(node.label == ERROR_LABEL and node.children for node in _nodes(cst))
+
+    # 字典分析表与 (终结符, 词素) 形式的输入走同一套恢复逻辑
+    pairs = list(zip(tokens_to_terminals(tokens), [lexeme for _, lexeme in tokens]))
+    slow_errors = []
+    parse_with_tree(pairs, compiler.grammar, dict(compiler.table), 'Program', positions, errors=slow_errors)
+    assert slow_errors == errors
+
+    result = compiler.compile(source)
+    assert result['status'] == 'failed' and result['syntax_errors'] == errors
+
+    clean = "int main()\n{\n    int i;\n    while (i < 10) { i = i + 1; }\n    return 0;\n}\n"
+    tokens, _, positions = lexical_analysis(clean, with_positions=True)
+    print_tree(parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True))
+    expected = capsys.readouterr().out
+    errors = []
+    print_tree(parse_with_tree(tokens, compiler.grammar, compiler.table, 'Program', positions, token_codes=True,
+                               errors=errors))
+    assert not errors and capsys.readouterr().out == expected
+
+
+def test_unmapped_token_is_a_syntax_error():
+    """
+    测试用例：没有对应文法终结符的 token（自动词法分析的预处理指令）在抛出与错误恢复两种模式下
+    都报告为同一条 SyntaxError，而不是 KeyError；只有自动词法分析识别的关键字（如 'do'）与手写词法分析一样按标识符解析
+    """
+    source = "int main()\n{\n    int i;\n    #define;\n    i = 1;\n}\n"
+    lexer = auto_lexer.LexerWrapper()
+    lexer.input(source)
+    tokens = lexer.tokens
+    expected = "Unexpected token '#define' at line 4, column 5"
+    for table in (compiler.table, dict(compiler.table)):
+        try:
+            parse_with_tree(tokens, compiler.grammar, table, 'Program')
+            assert False
+        except SyntaxError as e:
+            assert str(e) == expected
+        errors = []
+        parse_with_tree(tokens, compiler.grammar, table, 'Program', errors=errors)
+        assert errors == [expected]
+    try:
+        parse_generated(tokens)
+        assert False
+    except SyntaxError as e:
+        assert str(e) == expected
+    assert compiler.compile(source, '自动')['syntax_errors'] == [expected]
+
+    keywords_as_ids = "int main()\n{\n    int do, break;\n    do = 1;\n    break = do;\n    return 0;\n}\n"
+    auto, manual = compiler.compile(keywords_as_ids, '自动'), compiler.compile(keywords_as_ids)
+    assert auto['status'] == manual['status'] == 'success' and auto['quads'] == manual['quads']
+
+
+def _nodes(node):
+    return [node] + [sub for child in node.children for sub in _nodes(child)]
+
+
+def _leaves(node):
+    if not node.children:
+        return [node]
+    return [leaf for child in node.children for leaf in _leaves(child)]
+
+
+if __name__ == "__main__":
+    test_syntax_error_reports_line_and_column()
+    test_nodes_carry_source_offsets()
+    print("ok")
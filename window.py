@@ -7,8 +7,8 @@ from PyQt5.QtGui import QFont  # 用于创建并设置字体
 from PyQt5.QtCore import Qt, QRect, QSize
 from PyQt5.QtGui import QPainter, QColor, QFontMetricsF
 from Compilers.lexer.manual_lexer import lexical_analysis as manual_lexical_analysis
-from Compilers.lexer.manual_lexer import tokens_to_terminals
-from Compilers.lexer.auto_lexer import lexer, analyze
+from Compilers.lexer.incremental_lexer import LexedSource, edit_between
+from Compilers.lexer.auto_lexer import LexerWrapper
 
 # 导入编译器组件
 from Compilers.ll_parser.core.ll_main import parse_with_tree
@@ -103,6 +103,7 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.analysis_mode = '手动'
         self.compiler = Compiler()
+        self.lexed = None  # 上一次 DFA 词法分析的结果，再次分析时只重新扫描修改过的区域
         self.initUI()
 
     def initUI(self):
@@ -139,6 +140,9 @@ class MainWindow(QMainWindow):
         manual_action = QAction('手动分析', self)
         manual_action.triggered.connect(lambda: self.set_analysis_mode('手动'))
         mode_menu.addAction(manual_action)
+        dfa_action = QAction('DFA 表驱动分析', self)
+        dfa_action.triggered.connect(lambda: self.set_analysis_mode('DFA'))
+        mode_menu.addAction(dfa_action)
         auto_action = QAction('自动分析（PLY）', self)
         auto_action.triggered.connect(lambda: self.set_analysis_mode('自动'))
         mode_menu.addAction(auto_action)
@@ -190,8 +194,15 @@ class MainWindow(QMainWindow):
     def lexical_analysis(self):
         source = self.source_text_edit.toPlainText()
         try:
-            if self.analysis_mode == '手动':
-                tokens, errs = manual_lexical_analysis(source)
+            if self.analysis_mode in ('手动', 'DFA'):
+                if self.analysis_mode == '手动':
+                    tokens, errs = manual_lexical_analysis(source)
+                else:
+                    if self.lexed is None:
+                        self.lexed = LexedSource.from_source(source)
+                    else:
+                        self.lexed = self.lexed.edit(*edit_between(self.lexed.source, source.lstrip('\ufeff')))
+                    tokens, errs = self.lexed.tokens, self.lexed.errors
                 lines = ["序号\t单词\t种别码", "-"*40]
                 for i, (syn, tok) in enumerate(tokens, start=1):
                     if syn == 0: continue
@@ -215,8 +226,9 @@ class MainWindow(QMainWindow):
                 self.output_text_edit.setPlainText("\n".join(lines))
                 self.error_text_edit.setPlainText("无词法错误" if not errs else "词法错误:\n" + "\n".join(errs))
             else:
-                tokens, errs = analyze(source)
+                lexer = LexerWrapper()
                 lexer.input(source)
+                errs = lexer.errors
                 lines = ["序号\t单词\t类型", "-"*40]
                 idx = 1
                 while True:
@@ -231,54 +243,48 @@ class MainWindow(QMainWindow):
 
     def syntax_analysis(self):
         source = self.source_text_edit.toPlainText()
-        tokens, lex_errs = manual_lexical_analysis(source)
+        tokens, lex_errs, positions = manual_lexical_analysis(source, with_positions=True)
         if lex_errs:
             self.error_text_edit.setPlainText(
                 "词法错误，无法进行语法分析:\n" + "\n".join(lex_errs)
             )
             return
 
-        terms_only = tokens_to_terminals(tokens)
-        lexemes_only = [lexeme for (_, lexeme) in tokens]
-        term_pairs = list(zip(terms_only, lexemes_only))
-
-        try:
-            cst = parse_with_tree(term_pairs, self.compiler.grammar, self.compiler.table, 'Program')
-            ast = cst_to_ast(cst)
-            out = []
-            def recurse(n, pref='', last=True):
-                conn = '└─ ' if last else '├─ '
-                if n.value is not None and n.is_leaf():
-                    out.append(f"{pref}{conn}{n.label}: {n.value}")
-                else:
-                    out.append(f"{pref}{conn}{n.label}")
-                newp = pref + ('   ' if last else '│  ')
-                for i, ch in enumerate(n.children):
-                    recurse(ch, newp, i == len(n.children) - 1)
-            recurse(ast)
-            self.output_text_edit.setPlainText("\n".join(out))
+        # 错误恢复：一遍报告全部语法错误，出错时仍显示带 error 节点的部分语法树
+        syntax_errs = []
+        cst = parse_with_tree(tokens, self.compiler.grammar, self.compiler.table, 'Program', positions,
+                              token_codes=True, errors=syntax_errs)
+        ast = cst_to_ast(cst)
+        out = []
+        def recurse(n, pref='', last=True):
+            conn = '└─ ' if last else '├─ '
+            if n.value is not None and n.is_leaf():
+                out.append(f"{pref}{conn}{n.label}: {n.value}")
+            else:
+                out.append(f"{pref}{conn}{n.label}")
+            newp = pref + ('   ' if last else '│  ')
+            for i, ch in enumerate(n.children):
+                recurse(ch, newp, i == len(n.children) - 1)
+        recurse(ast)
+        self.output_text_edit.setPlainText("\n".join(out))
+        if syntax_errs:
+            self.error_text_edit.setPlainText(f"语法错误（共 {len(syntax_errs)} 处）:\n" + "\n".join(syntax_errs))
+        else:
             self.error_text_edit.setPlainText("语法分析成功，无错误。")
-        except SyntaxError as e:
-            msg = e.args[0] if e.args else str(e)
-            self.output_text_edit.clear()
-            self.error_text_edit.setPlainText(f"语法错误，原因: {msg}")
 
     def semantic_analysis(self):
         try:
             source = self.source_text_edit.toPlainText()
-            tokens, lex_errs = manual_lexical_analysis(source)
+            tokens, lex_errs, positions = manual_lexical_analysis(source, with_positions=True)
             if lex_errs:
                 self.error_text_edit.setPlainText(
                     "词法错误，无法进行语义分析:\n" + "\n".join(lex_errs)
                 )
                 return
 
-            terms_only = tokens_to_terminals(tokens)
-            lexemes_only = [lexeme for (_, lexeme) in tokens]
-            term_pairs = list(zip(terms_only, lexemes_only))
-
             try:
-                cst = parse_with_tree(term_pairs, self.compiler.grammar, self.compiler.table, 'Program')
+                cst = parse_with_tree(tokens, self.compiler.grammar, self.compiler.table, 'Program', positions,
+                                      token_codes=True)
                 ast = cst_to_ast(cst)
             except SyntaxError as e:
                 msg = e.args[0] if e.args else str(e)
@@ -311,19 +317,16 @@ class MainWindow(QMainWindow):
     def ir_generation(self):
         try:
             source = self.source_text_edit.toPlainText()
-            tokens, lex_errs = manual_lexical_analysis(source)
+            tokens, lex_errs, positions = manual_lexical_analysis(source, with_positions=True)
             if lex_errs:
                 self.error_text_edit.setPlainText(
                     "词法错误，无法进行中间代码生成:\n" + "\n".join(lex_errs)
                 )
                 return
 
-            terms_only = tokens_to_terminals(tokens)
-            lexemes_only = [lexeme for (_, lexeme) in tokens]
-            term_pairs = list(zip(terms_only, lexemes_only))
-
             try:
-                cst = parse_with_tree(term_pairs, self.compiler.grammar, self.compiler.table, 'Program')
+                cst = parse_with_tree(tokens, self.compiler.grammar, self.compiler.table, 'Program', positions,
+                                      token_codes=True)
                 ast = cst_to_ast(cst)
             except SyntaxError as e:
                 msg = e.args[0] if e.args else str(e)